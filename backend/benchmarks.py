@@ -0,0 +1,1174 @@
+"""
+Benchmarks de rendimiento de la calculadora.
+
+Uso:
+    cd backend
+    python benchmarks.py            # corre todos
+    python benchmarks.py lote       # corre solo los indicados
+
+Cada benchmark imprime sus mediciones y falla (exit code 1) si no cumple
+el objetivo de rendimiento definido.
+"""
+import asyncio
+import contextlib
+import io
+import random
+import re
+import statistics
+import sys
+import time
+
+from calculator import CalculadoraGanancias
+
+
+BENCHMARKS = {}
+
+
+def benchmark(nombre):
+    """Registra una función como benchmark bajo el nombre dado."""
+    def registrar(funcion):
+        BENCHMARKS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def medir(funcion, repeticiones: int = 5) -> float:
+    """Devuelve el mejor tiempo (en segundos) de varias ejecuciones."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def generar_empleados(cantidad: int, semilla: int = 42):
+    """Genera datos sintéticos de empleados en formato columnar."""
+    rnd = random.Random(semilla)
+    tipos = ["alquiler_inquilino", "medicina_prepaga", "gastos_educativos", "seguro_vida"]
+    return {
+        "sueldos_brutos": [rnd.uniform(500_000, 30_000_000) for _ in range(cantidad)],
+        "estados_civiles": [rnd.choice(["soltero", "casado"]) for _ in range(cantidad)],
+        "cantidad_hijos": [rnd.randint(0, 3) for _ in range(cantidad)],
+        "otras_cargas": [rnd.randint(0, 1) for _ in range(cantidad)],
+        "deducciones_opcionales": [
+            [{"concepto": tipo, "tipo": tipo, "monto": rnd.uniform(10_000, 500_000)}
+             for tipo in rnd.sample(tipos, rnd.randint(0, 2))]
+            for _ in range(cantidad)
+        ],
+    }
+
+
+@benchmark("lote")
+def bench_lote() -> bool:
+    """calcular_lote: 100.000 empleados en menos de 0,5 s."""
+    objetivo_segundos = 0.5
+    calculadora = CalculadoraGanancias()
+    empleados = generar_empleados(100_000)
+
+    tiempo_lote = medir(lambda: calculadora.calcular_lote(**empleados))
+
+    muestra = 10_000
+    tiempo_escalar = medir(lambda: [
+        calculadora.calcular(
+            empleados["sueldos_brutos"][i], empleados["estados_civiles"][i],
+            empleados["cantidad_hijos"][i], empleados["deducciones_opcionales"][i],
+            empleados["otras_cargas"][i]
+        )
+        for i in range(muestra)
+    ], repeticiones=1) * (100_000 / muestra)
+
+    print(f"  calcular_lote (100k):          {tiempo_lote * 1000:8.1f} ms "
+          f"({100_000 / tiempo_lote:,.0f} filas/s)")
+    print(f"  calcular x 100k (estimado):    {tiempo_escalar * 1000:8.1f} ms")
+    print(f"  objetivo:                      < {objetivo_segundos * 1000:.0f} ms")
+    return tiempo_lote < objetivo_segundos
+
+
+def _impuesto_mensual_decimal(tablas, escalas, sueldo_bruto, estado_civil, hijos, cargas, deducciones):
+    """
+    Impuesto mensual con Decimal sobre los montos tal como se escribieron, redondeando
+    al centavo (medio centavo hacia arriba) en los mismos puntos que el motor en centavos.
+    """
+    from decimal import ROUND_HALF_UP, Decimal
+
+    centavo = Decimal("0.01")
+    redondear = lambda valor: valor.quantize(centavo, ROUND_HALF_UP)
+    decimal = lambda valor: Decimal(repr(valor))
+
+    bruto = redondear(decimal(sueldo_bruto))
+    neto = bruto - redondear(bruto * decimal(tablas["descuentos_obligatorios"]["total"]))
+    personales = (decimal(tablas["gni_mensual"]) + decimal(tablas["deduccion_especial_mensual"]) +
+                  (decimal(tablas["conyuge_mensual"]) if estado_civil == "casado" else 0) +
+                  hijos * decimal(tablas["hijo_mensual"]) + cargas * decimal(tablas["otras_cargas_mensual"]))
+    opcionales = sum((
+        redondear(redondear(decimal(d["monto"])) *
+                  decimal(tablas["deducciones_opcionales"].get(d["tipo"], {}).get("porcentaje_deducible", 1.0)))
+        for d in deducciones
+    ), Decimal(0))
+    ganancia_anual = (neto - personales - opcionales) * 12
+    if ganancia_anual <= 0:
+        return 0.0
+    for tramo in escalas:
+        if tramo["hasta"] is None or ganancia_anual <= tramo["hasta"]:
+            impuesto = (ganancia_anual - decimal(tramo["desde"])) * decimal(tramo["porcentaje"]) + decimal(tramo["fijo"])
+            return float(redondear(impuesto / 12))
+
+
+@benchmark("centavos")
+def bench_centavos() -> bool:
+    """Motor en centavos enteros: exactitud contra Decimal y velocidad contra el motor float."""
+    flotante = CalculadoraGanancias(motor="float")
+    centavos = CalculadoraGanancias(motor="centavos")
+    empleados = generar_empleados(100_000)
+    empleados["sueldos_brutos"] = [round(sueldo, 2) for sueldo in empleados["sueldos_brutos"]]
+    for deducciones in empleados["deducciones_opcionales"]:
+        for deduccion in deducciones:
+            deduccion["monto"] = round(deduccion["monto"], 2)
+
+    # Exactitud: impuesto mensual de cada motor contra la referencia con Decimal
+    muestra = 20_000
+    filas = [
+        (empleados["sueldos_brutos"][i], empleados["estados_civiles"][i], empleados["cantidad_hijos"][i],
+         empleados["otras_cargas"][i], empleados["deducciones_opcionales"][i])
+        for i in range(muestra)
+    ]
+    referencia = [
+        _impuesto_mensual_decimal(flotante.deducciones, flotante.escalas["escalas"], s, e, h, c, d)
+        for s, e, h, c, d in filas
+    ]
+    distintos = {}
+    for nombre, calculadora in (("float", flotante), ("centavos", centavos)):
+        lote = calculadora.calcular_lote(**empleados)["impuesto_mensual"][:muestra]
+        escalar = [calculadora.calcular(s, e, h, d, c).impuesto_mensual for s, e, h, c, d in filas]
+        distintos[nombre] = (
+            sum(valor != esperado for valor, esperado in zip(escalar, referencia)),
+            sum(valor != esperado for valor, esperado in zip(lote.tolist(), referencia))
+        )
+
+    # Velocidad
+    tiempos = {}
+    for nombre, calculadora in (("float", flotante), ("centavos", centavos)):
+        tiempos[nombre] = (
+            medir(lambda: [calculadora.calcular(s, e, h, d, c) for s, e, h, c, d in filas], repeticiones=3) / muestra,
+            medir(lambda: calculadora.calcular_lote(**empleados), repeticiones=3)
+        )
+
+    print(f"  {'motor':9s} {'calcular':>11s} {'lote 100k':>10s}  distintos de Decimal (calcular / lote, de {muestra})")
+    for nombre in ("float", "centavos"):
+        (t_escalar, t_lote), (d_escalar, d_lote) = tiempos[nombre], distintos[nombre]
+        print(f"  {nombre:9s} {t_escalar * 1e6:8.2f} us {t_lote * 1000:7.1f} ms  {d_escalar} / {d_lote}")
+    return distintos["centavos"] == (0, 0) and tiempos["centavos"][1] < 0.5
+
+
+def _escala_lineal(escalas, ganancia_anual):
+    """Recorrido lineal de la escala tal como se hacía antes de EscalaCompilada."""
+    impuesto = 0
+    for escala in escalas:
+        desde = escala["desde"]
+        hasta = escala["hasta"] if escala["hasta"] else float('inf')
+        if ganancia_anual > desde:
+            impuesto = (min(ganancia_anual, hasta) - desde) * escala["porcentaje"] + escala["fijo"]
+            if ganancia_anual <= hasta:
+                break
+    return impuesto
+
+
+@benchmark("escala")
+def bench_escala() -> bool:
+    """EscalaCompilada: búsqueda de tramo más rápida que el recorrido lineal."""
+    calculadora = CalculadoraGanancias()
+    escalas = calculadora.escalas["escalas"]
+    escala = calculadora.escala_compilada
+    rnd = random.Random(42)
+    ganancias = [rnd.uniform(0, 60_000_000) for _ in range(100_000)]
+
+    tiempo_lineal = medir(lambda: [_escala_lineal(escalas, g) for g in ganancias])
+    tiempo_compilada = medir(lambda: [escala.impuesto(g) for g in ganancias])
+    tiempo_detalle = medir(lambda: [escala.calcular(g) for g in ganancias])
+
+    por_llamada = lambda tiempo: tiempo / len(ganancias) * 1e9
+    print(f"  recorrido lineal:              {por_llamada(tiempo_lineal):8.0f} ns/llamada")
+    print(f"  EscalaCompilada.impuesto:      {por_llamada(tiempo_compilada):8.0f} ns/llamada "
+          f"({tiempo_lineal / tiempo_compilada:.1f}x)")
+    print(f"  EscalaCompilada con detalle:   {por_llamada(tiempo_detalle):8.0f} ns/llamada")
+    return tiempo_compilada < tiempo_lineal
+
+
+@benchmark("upload_concurrente")
+def bench_upload_concurrente() -> bool:
+    """/calcular mantiene su latencia mientras se parsean varios F.572 en paralelo."""
+    import httpx
+    import main as api
+    from generador_f572 import generar_pdf_f572
+
+    pdf = generar_pdf_f572(secciones_por_concepto=20)
+    request = {"sueldo_bruto": 5_000_000, "estado_civil": "casado", "cantidad_hijos": 1}
+
+    async def latencias_calcular(cliente, cantidad):
+        latencias = []
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            respuesta = await cliente.post("/calcular", json=request)
+            latencias.append(time.perf_counter() - inicio)
+            assert respuesta.status_code == 200
+            await asyncio.sleep(0.01)
+        return latencias
+
+    async def escenario():
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            en_reposo = await latencias_calcular(cliente, 50)
+
+            uploads = [
+                asyncio.create_task(cliente.post("/upload-f572", files={"file": ("f572.pdf", pdf, "application/pdf")}))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.05)
+            durante_uploads = await latencias_calcular(cliente, 50)
+            respuestas = await asyncio.gather(*uploads)
+            assert all(r.status_code == 200 for r in respuestas)
+            return en_reposo, durante_uploads
+
+    api.pool_f572.iniciar()
+    try:
+        inicio = time.perf_counter()
+        en_reposo, durante_uploads = asyncio.run(escenario())
+        total = time.perf_counter() - inicio
+    finally:
+        api.pool_f572.detener()
+
+    ms = lambda valores: f"p50 {statistics.median(valores) * 1000:6.2f} ms  max {max(valores) * 1000:6.2f} ms"
+    print(f"  /calcular en reposo:           {ms(en_reposo)}")
+    print(f"  /calcular con 4 uploads:       {ms(durante_uploads)}")
+    print(f"  duración total del escenario:  {total:.2f} s")
+    return max(durante_uploads) < 0.05
+
+
+@benchmark("limite_upload")
+def bench_limite_upload() -> bool:
+    """Un PDF de más de F572_MAX_UPLOAD_BYTES se rechaza con 413 sin recibirlo entero, con headers CORS."""
+    import os
+
+    import httpx
+    import main as api
+
+    limite = int(os.environ.get("F572_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+    bloque = b"%PDF" * (64 * 1024)
+    bloques_totales = limite * 4 // len(bloque)
+    origen = {"Origin": "http://localhost:8080"}
+
+    async def escenario():
+        enviados = 0
+
+        async def cuerpo():
+            nonlocal enviados
+            yield (b'--limite\r\nContent-Disposition: form-data; name="file"; filename="f572.pdf"\r\n'
+                   b"Content-Type: application/pdf\r\n\r\n")
+            for _ in range(bloques_totales):
+                enviados += len(bloque)
+                yield bloque
+
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            # Con Content-Length declarado: se rechaza sin leer el cuerpo
+            declarado = await cliente.post(
+                "/upload-f572", content=bloque * bloques_totales,
+                headers={**origen, "Content-Type": "multipart/form-data; boundary=limite"}
+            )
+            # Sin Content-Length (chunked): se corta al pasar el límite
+            inicio = time.perf_counter()
+            streaming = await cliente.post(
+                "/upload-f572", content=cuerpo(),
+                headers={**origen, "Content-Type": "multipart/form-data; boundary=limite"}
+            )
+            return declarado, streaming, enviados, time.perf_counter() - inicio
+
+    declarado, streaming, enviados, tiempo = asyncio.run(escenario())
+    cors = [r.headers.get("access-control-allow-origin") for r in (declarado, streaming)]
+    print(f"  Content-Length declarado: {declarado.status_code}; chunked: {streaming.status_code} en {tiempo * 1000:.1f} ms "
+          f"después de recibir {enviados / 1024 / 1024:.1f} de {bloques_totales * len(bloque) / 1024 / 1024:.0f} MB")
+    print(f"  Access-Control-Allow-Origin en los 413: {cors}")
+    return (declarado.status_code == streaming.status_code == 413 and cors == ["*", "*"]
+            and enviados <= limite + 2 * len(bloque))
+
+
+@benchmark("cache_calculo")
+def bench_cache_calculo() -> bool:
+    """CacheCalculo: tráfico de /calcular con requests repetidas (200 distintas en 5000)."""
+    from cache_calculo import CacheCalculo
+    from tablas import RegistroTablas
+
+    registro = RegistroTablas()
+    calculadora = registro.calculadora()
+    tipos = list(calculadora.deducciones["deducciones_opcionales"])
+    rnd = random.Random(7)
+    distintas = [
+        dict(
+            sueldo_bruto=rnd.choice(range(1_000_000, 8_000_000, 50_000)),
+            estado_civil=rnd.choice(["soltero", "casado"]),
+            cantidad_hijos=rnd.randint(0, 3),
+            deducciones_opcionales=[
+                {"concepto": tipo, "tipo": tipo, "monto": 50_000} for tipo in rnd.sample(tipos, rnd.randint(0, 3))
+            ]
+        )
+        for _ in range(200)
+    ]
+    trafico = [rnd.choice(distintas) for _ in range(5000)]
+
+    tiempo_directo = medir(lambda: [calculadora.calcular(**r).a_dict() for r in trafico], repeticiones=3)
+    cache = CacheCalculo(registro)
+    tiempo_cache = medir(lambda: [cache.calcular(**r) for r in trafico], repeticiones=3)
+    estadisticas = cache.estadisticas()
+
+    print(f"  sin cache:  {tiempo_directo * 1000:7.1f} ms")
+    print(f"  con cache:  {tiempo_cache * 1000:7.1f} ms  ({tiempo_directo / tiempo_cache:.1f}x)")
+    print(f"  tasa de hits {estadisticas['tasa_hits']:.2%}, latencia cálculo {estadisticas['latencia_calculo_ms']:.4f} ms, "
+          f"hit {estadisticas['latencia_hit_ms']:.4f} ms")
+    return tiempo_cache < tiempo_directo
+
+@benchmark("recarga_tablas")
+def bench_recarga_tablas() -> bool:
+    """RegistroTablas: la latencia de los cálculos no se dispara mientras se recargan períodos."""
+    import json
+    import shutil
+    import tempfile
+    import threading
+    from pathlib import Path
+    from tablas import RegistroTablas
+
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        for archivo in Path(__file__).parent.joinpath("data").glob("*.json"):
+            shutil.copy(archivo, directorio)
+        registro = RegistroTablas(str(directorio))
+        deducciones = json.loads((directorio / "deducciones_2026.json").read_text(encoding="utf-8"))
+
+        def latencias(cantidad):
+            resultado = []
+            for i in range(cantidad):
+                inicio = time.perf_counter()
+                registro.calculadora("2026-09").calcular(3_000_000 + i, "casado", 1)
+                resultado.append(time.perf_counter() - inicio)
+            return resultado
+
+        en_reposo = latencias(20_000)
+
+        # Simular 50 "drops" del segundo semestre (archivos nuevos o modificados) mientras se calcula
+        recargas = []
+
+        def publicar_periodos():
+            for i in range(50):
+                deducciones["gni_mensual"] += 1
+                (directorio / "deducciones_2026-07.json").write_text(json.dumps(deducciones), encoding="utf-8")
+                shutil.copy(directorio / "escalas_2026.json", directorio / "escalas_2026-07.json")
+                inicio = time.perf_counter()
+                registro.recargar()
+                recargas.append(time.perf_counter() - inicio)
+                time.sleep(0.002)
+
+        hilo = threading.Thread(target=publicar_periodos)
+        hilo.start()
+        durante_recargas = latencias(20_000)
+        hilo.join()
+        periodo_nuevo = registro.calculadora("2026-09").deducciones["gni_mensual"] == deducciones["gni_mensual"]
+
+    p99 = lambda valores: statistics.quantiles(valores, n=100)[98] * 1000
+    print(f"  cálculo en reposo:         p99 {p99(en_reposo):6.3f} ms")
+    print(f"  cálculo durante recargas:  p99 {p99(durante_recargas):6.3f} ms")
+    print(f"  recarga de un período:     p50 {statistics.median(recargas) * 1000:6.2f} ms")
+    return periodo_nuevo and p99(durante_recargas) < max(5 * p99(en_reposo), 1.0)
+
+def _bruto_por_biseccion(calculadora, neto_objetivo, estado_civil, hijos):
+    """Lo que se hacía a mano: bisección llamando a `calcular` hasta llegar al neto."""
+    bajo, alto = 0.0, neto_objetivo * 3 + 1
+    while alto - bajo > 0.005:
+        medio = (bajo + alto) / 2
+        if round(calculadora.calcular(medio, estado_civil, hijos).sueldo_neto_final, 2) < neto_objetivo:
+            bajo = medio
+        else:
+            alto = medio
+    return round(alto, 2)
+
+
+@benchmark("inverso")
+def bench_inverso() -> bool:
+    """calcular_inverso_lote: grilla de 100.000 netos objetivo en menos de 0,5 s."""
+    import numpy as np
+
+    calculadora = CalculadoraGanancias()
+    rnd = np.random.default_rng(11)
+    n = 100_000
+    netos = np.round(rnd.uniform(200_000, 40_000_000, n), 2)
+    estados = rnd.choice(["soltero", "casado"], n)
+    hijos = rnd.integers(0, 4, n)
+
+    tiempo = medir(lambda: calculadora.calcular_inverso_lote(netos, estados, hijos), repeticiones=3)
+    resultado = calculadora.calcular_inverso_lote(netos, estados, hijos)
+    fuera_de_centavo = int((np.abs(resultado["diferencia"]) > 0.01).sum())
+
+    muestra = range(100)
+    inicio = time.perf_counter()
+    biseccion = [_bruto_por_biseccion(calculadora, netos[i], estados[i], int(hijos[i])) for i in muestra]
+    tiempo_biseccion = (time.perf_counter() - inicio) / len(muestra)
+    distintos = sum(abs(biseccion[i] - resultado["sueldo_bruto"][i]) > 0.02 for i in muestra)
+
+    print(f"  inversión cerrada:   {tiempo:.3f} s para {n} netos ({tiempo / n * 1e6:.2f} us por neto)")
+    print(f"  bisección con calcular: {tiempo_biseccion * 1e6:.0f} us por neto")
+    print(f"  fuera de un centavo: {fuera_de_centavo}, distintos de la bisección: {distintos}/100")
+    return tiempo < 0.5 and fuera_de_centavo == 0 and distintos == 0
+
+@benchmark("curva")
+def bench_curva() -> bool:
+    """/curva: 10.000 puntos (cálculo + JSON) en menos de 100 ms."""
+    import httpx
+    import numpy as np
+    import main as api
+
+    perfil = {
+        "estado_civil": "casado", "cantidad_hijos": 2,
+        "deducciones_opcionales": [{"concepto": "Alquiler", "monto": 400_000, "tipo": "alquiler_inquilino"}]
+    }
+    request = {**perfil, "desde": 500_000, "hasta": 50_000_000, "paso": 4950}
+    sueldos = np.round(np.arange(500_000, 50_000_000 + 1, 4950.0), 2)
+    calculadora = api.registro_tablas.calculadora()
+
+    async def pedir_curva():
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            tiempos = []
+            for _ in range(5):
+                inicio = time.perf_counter()
+                respuesta = await cliente.post("/curva", json=request)
+                tiempos.append(time.perf_counter() - inicio)
+            return min(tiempos), respuesta.json()
+
+    tiempo_endpoint, respuesta = asyncio.run(pedir_curva())
+    tiempo_calculo = medir(lambda: calculadora.calcular_curva(sueldos, "casado", 2, 0, perfil["deducciones_opcionales"]))
+    tiempo_punto_a_punto = medir(lambda: [
+        calculadora.calcular(s, "casado", 2, perfil["deducciones_opcionales"]) for s in sueldos.tolist()
+    ], repeticiones=1)
+
+    print(f"  {respuesta['cantidad']} puntos")
+    print(f"  calcular_curva:            {tiempo_calculo * 1000:7.1f} ms")
+    print(f"  /curva (con JSON):         {tiempo_endpoint * 1000:7.1f} ms")
+    print(f"  calcular punto a punto:    {tiempo_punto_a_punto * 1000:7.1f} ms")
+    return respuesta["cantidad"] == len(sueldos) and tiempo_endpoint < 0.1
+
+
+@benchmark("detalle")
+def bench_detalle() -> bool:
+    """/calcular y /calcular-anual: bytes y CPU por request según `detalle`, y costo del JSON."""
+    import httpx
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    import main as api
+    from cache_calculo import a_json
+
+    cantidad = 2000
+    deducciones = [
+        {"concepto": "Alquiler", "monto": 400_000, "tipo": "alquiler_inquilino"},
+        {"concepto": "Prepaga", "monto": 150_000, "tipo": "medicina_prepaga"},
+    ]
+
+    def request_calcular(i, detalle):
+        return {"sueldo_bruto": 2_000_000 + i * 1000, "estado_civil": "casado", "cantidad_hijos": 2,
+                "deducciones_opcionales": deducciones, "detalle": detalle}
+
+    def request_anual(i, detalle):
+        return {"mes_actual": request_calcular(i, "completo"), "mes_actual_numero": 6, "detalle": detalle,
+                "datos_acumulados": {"ingresos_acumulados": 15_000_000, "deducciones_acumuladas": 2_000_000}}
+
+    async def cpu_por_request(cliente, ruta, requests):
+        inicio = time.process_time()
+        for request in requests:
+            respuesta = await cliente.post(ruta, json=request)
+            assert respuesta.status_code == 200
+        return (time.process_time() - inicio) / len(requests), len(respuesta.content)
+
+    async def escenario():
+        filas = {}
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            for ruta, armar in (("/calcular", request_calcular), ("/calcular-anual", request_anual)):
+                for detalle in ("completo", "resumen", "none"):
+                    requests = [armar(i, detalle) for i in range(cantidad)]
+                    cpu_calculo, bytes_respuesta = await cpu_por_request(cliente, ruta, requests)  # misses
+                    cpu_cache, _ = await cpu_por_request(cliente, ruta, requests)  # hits
+                    filas[ruta, detalle] = (bytes_respuesta, cpu_calculo, cpu_cache)
+        return filas
+
+    filas = asyncio.run(escenario())
+    print(f"  {'':16s} {'detalle':9s} {'bytes':>6s} {'CPU cálculo':>12s} {'CPU hit':>9s}")
+    for (ruta, detalle), (bytes_respuesta, cpu_calculo, cpu_cache) in filas.items():
+        print(f"  {ruta:16s} {detalle:9s} {bytes_respuesta:6d} {cpu_calculo * 1e6:9.0f} us {cpu_cache * 1e6:6.0f} us")
+
+    # Serialización sola de un resultado completo de /calcular-anual
+    resultado = api.registro_tablas.calculadora().calcular_anual_con_acumulados(
+        request_anual(0, "completo")["mes_actual"], request_anual(0, "completo")["datos_acumulados"], 6
+    ).a_dict()
+    veces = 1000
+    tiempo_fastapi = medir(lambda: [JSONResponse(jsonable_encoder(resultado)) for _ in range(veces)]) / veces
+    tiempo_directo = medir(lambda: [a_json(resultado) for _ in range(veces)]) / veces
+    print(f"  JSON de /calcular-anual completo: jsonable_encoder + JSONResponse {tiempo_fastapi * 1e6:6.1f} us, "
+          f"json.dumps directo {tiempo_directo * 1e6:6.1f} us ({tiempo_fastapi / tiempo_directo:.1f}x); "
+          f"en un hit se reutiliza el JSON cacheado")
+
+    return all(
+        filas[ruta, "none"][0] * 5 < filas[ruta, "completo"][0] and filas[ruta, "none"][1] < filas[ruta, "completo"][1]
+        for ruta in ("/calcular", "/calcular-anual")
+    ) and tiempo_directo < tiempo_fastapi
+
+
+@benchmark("tablas_http")
+def bench_tablas_http() -> bool:
+    """/deducciones y /escalas: JSON serializado al cargar las tablas y 304 con If-None-Match."""
+    import httpx
+    import main as api
+
+    # Los endpoints como eran antes (el dict de la calculadora serializado en cada request),
+    # agregados solo en esta app de prueba para comparar la request entera
+    async def deducciones_antes(periodo: str = None):
+        return api.registro_tablas.calculadora(periodo).obtener_deducciones()
+
+    async def escalas_antes(periodo: str = None):
+        return api.registro_tablas.calculadora(periodo).obtener_escalas()
+
+    api.app.add_api_route("/benchmark/deducciones-antes", deducciones_antes)
+    api.app.add_api_route("/benchmark/escalas-antes", escalas_antes)
+    veces = 1000
+
+    async def cpu_por_request(cliente, ruta, headers=None):
+        inicio = time.process_time()
+        for _ in range(veces):
+            respuesta = await cliente.get(ruta, headers=headers)
+        return (time.process_time() - inicio) / veces, respuesta
+
+    async def escenario():
+        filas = {}
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            for ruta, ruta_antes in (("/deducciones", "/benchmark/deducciones-antes"),
+                                     ("/escalas", "/benchmark/escalas-antes")):
+                mediciones = {"antes": [], "200": [], "304": []}
+                # Intercalados y el mejor de varias rondas: la máquina tiene mucho ruido
+                for _ in range(5):
+                    cpu, anterior = await cpu_por_request(cliente, ruta_antes)
+                    mediciones["antes"].append(cpu)
+                    cpu, respuesta = await cpu_por_request(cliente, ruta)
+                    mediciones["200"].append(cpu)
+                    cpu, revalidada = await cpu_por_request(cliente, ruta, {"If-None-Match": respuesta.headers["etag"]})
+                    mediciones["304"].append(cpu)
+                iguales = anterior.content == respuesta.content
+                filas[ruta] = ({nombre: min(valores) for nombre, valores in mediciones.items()},
+                               len(respuesta.content), revalidada.status_code, iguales)
+        return filas
+
+    filas = asyncio.run(escenario())
+    for ruta, (cpu, bytes_respuesta, estado, iguales) in filas.items():
+        print(f"  {ruta:13s} {bytes_respuesta:5d} bytes: antes {cpu['antes'] * 1e6:5.0f} us, "
+              f"ahora 200 {cpu['200'] * 1e6:5.0f} us, {estado} {cpu['304'] * 1e6:5.0f} us por request; "
+              f"mismo JSON: {'sí' if iguales else 'no'}")
+    return all(
+        estado == 304 and iguales and cpu["200"] < cpu["antes"] and cpu["304"] < cpu["antes"]
+        for cpu, _, estado, iguales in filas.values()
+    )
+
+
+@benchmark("resultados")
+def bench_resultados() -> bool:
+    """calcular: ResultadoCalculo con __slots__ contra el dict anidado completo (tiempo y memoria retenida)."""
+    import tracemalloc
+
+    calculadora = CalculadoraGanancias()
+    cantidad = 100_000
+    deducciones = [{"concepto": "Alquiler", "monto": 300_000, "tipo": "alquiler_inquilino"}]
+    sueldos = [1_500_000 + i * 50.0 for i in range(cantidad)]
+
+    def objetos():
+        return [calculadora.calcular(s, "casado", 2, deducciones) for s in sueldos]
+
+    def dicts():
+        return [calculadora.calcular(s, "casado", 2, deducciones).a_dict() for s in sueldos]
+
+    mediciones = {}
+    for nombre, funcion in (("dict completo", dicts), ("ResultadoCalculo", objetos)):
+        segundos = medir(funcion, repeticiones=3)
+        tracemalloc.start()
+        resultados = funcion()
+        retenido = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del resultados
+        mediciones[nombre] = (segundos, retenido)
+        print(f"  {nombre:17s} {segundos * 1000:7.1f} ms  {retenido / cantidad:6.0f} bytes por resultado")
+
+    (t_dict, mem_dict), (t_objeto, mem_objeto) = mediciones["dict completo"], mediciones["ResultadoCalculo"]
+    return t_objeto < t_dict and mem_objeto * 3 < mem_dict
+
+def _simular_escalar(registro, anio, sueldos, sac, opcionales, estado_civil, hijos):
+    """Simulación de un empleado mes a mes, con la escala prorrateada armada tramo por tramo."""
+    ganancia_acumulada = 0.0
+    retenido = 0.0
+    retenciones = []
+    for mes in range(1, 13):
+        calculadora = registro.calculadora(f"{anio}-{mes:02d}")
+        bruto = sueldos[mes - 1] + sac[mes - 1]
+        descuentos = round(bruto * calculadora.deducciones["descuentos_obligatorios"]["total"], 2)
+        personales = calculadora.calcular_deducciones_personales(estado_civil, hijos)["total_mensual"]
+        ganancia_acumulada += bruto - descuentos - personales - opcionales[mes - 1]
+
+        impuesto = 0.0
+        for tramo in calculadora.obtener_escalas()["escalas"]:
+            desde = tramo["desde"] * mes / 12
+            hasta = tramo["hasta"] * mes / 12 if tramo["hasta"] else float("inf")
+            if desde < ganancia_acumulada <= hasta:
+                impuesto = (ganancia_acumulada - desde) * tramo["porcentaje"] + tramo["fijo"] * mes / 12
+
+        pendiente = impuesto - retenido
+        retencion = round(min(pendiente, bruto * 0.35) if pendiente > 0 else pendiente, 2)
+        retenido += retencion
+        retenciones.append(retencion)
+    return retenciones
+
+
+@benchmark("simulacion_anual")
+def bench_simulacion_anual() -> bool:
+    """SimuladorAnual: año completo mes a mes de 100.000 empleados en menos de 2 s."""
+    import numpy as np
+    from simulacion import SimuladorAnual, calcular_sac
+    from tablas import RegistroTablas
+
+    registro = RegistroTablas()
+    simulador = SimuladorAnual(registro)
+    rnd = np.random.default_rng(3)
+
+    def generar(n):
+        sueldos = rnd.uniform(800_000, 15_000_000, (n, 1)) * rnd.uniform(0.95, 1.1, (n, 12)).cumprod(axis=1)
+        return dict(
+            anio=2026,
+            sueldos=np.round(sueldos, 2),
+            estados_civiles=rnd.choice(["soltero", "casado"], n),
+            cantidad_hijos=rnd.integers(0, 4, n),
+            deducciones_opcionales=np.round(rnd.uniform(0, 300_000, (n, 12)), 2),
+        )
+
+    # Verificación contra la simulación escalar
+    muestra = generar(2000)
+    resultado = simulador.simular(**muestra)
+    sac = calcular_sac(muestra["sueldos"])
+    diferencias = 0
+    for i in range(2000):
+        esperado = _simular_escalar(
+            registro, 2026, muestra["sueldos"][i], sac[i], muestra["deducciones_opcionales"][i],
+            muestra["estados_civiles"][i], int(muestra["cantidad_hijos"][i])
+        )
+        diferencias += int(np.abs(np.array(esperado) - resultado["retencion_mensual"][i]).max() > 0.011)
+    print(f"  diferencias contra la simulación escalar: {diferencias}/2000 empleados")
+
+    datos = generar(100_000)
+    tiempo = medir(lambda: simulador.simular(**datos), repeticiones=3)
+    print(f"  100.000 empleados × 12 meses: {tiempo:.3f} s")
+    return diferencias == 0 and tiempo < 2.0
+
+def _topes_escalar(tablas, montos, ganancia_neta):
+    """Topes de un empleado mes a mes y grupo por grupo (referencia para el motor de topes)."""
+    configuracion = tablas["deducciones_opcionales"]
+    grupos = {}
+    for tipo in montos:
+        compartido = configuracion.get(tipo, {}).get("comparte_tope_con")
+        grupos.setdefault(tuple(sorted((tipo, compartido))) if compartido else (tipo,), []).append(tipo)
+    declarado = dict.fromkeys(montos, 0.0)
+    permitido = dict.fromkeys(grupos, 0.0)
+    ganancia_acumulada = 0.0
+    por_mes = []
+    for mes in range(12):
+        ganancia_acumulada += ganancia_neta[mes]
+        for tipo in montos:
+            declarado[tipo] += montos[tipo][mes] * configuracion.get(tipo, {}).get("porcentaje_deducible", 1.0)
+        anterior = sum(permitido.values())
+        # Primero los grupos sin tope porcentual: lo que permiten se descuenta de la base
+        for porcentuales in (False, True):
+            base = ganancia_acumulada - sum(
+                acumulado for grupo, acumulado in permitido.items()
+                if configuracion.get(grupo[0], {}).get("tope_porcentaje_ganancia_neta") is None
+            )
+            for grupo, tipos in grupos.items():
+                porcentaje = configuracion.get(grupo[0], {}).get("tope_porcentaje_ganancia_neta")
+                if (porcentaje is not None) != porcentuales:
+                    continue
+                tope = float("inf")
+                if configuracion.get(grupo[0], {}).get("tope_anual") is not None:
+                    tope = configuracion[grupo[0]]["tope_anual"] * (mes + 1) / 12
+                if porcentaje is not None:
+                    tope = min(tope, max(base, 0) * porcentaje)
+                permitido[grupo] = min(sum(declarado[tipo] for tipo in tipos), tope)
+        por_mes.append(sum(permitido.values()) - anterior)
+    return por_mes
+
+
+@benchmark("topes")
+def bench_topes() -> bool:
+    """Motor de topes: año completo de 100.000 empleados con todos los conceptos en menos de 1 s."""
+    import numpy as np
+    from simulacion import SimuladorAnual
+    from tablas import RegistroTablas
+    from topes import MotorTopes
+
+    registro = RegistroTablas()
+    motor = MotorTopes.del_anio(registro, 2026)
+    tablas = registro.calculadora("2026-01").deducciones
+    rnd = np.random.default_rng(24)
+
+    def generar(n):
+        # Cada empleado declara cerca de la mitad de los conceptos
+        montos = {
+            tipo: np.round(rnd.uniform(0, 400_000, (n, 12)) * (rnd.random((n, 1)) < 0.5), 2)
+            for tipo in tablas["deducciones_opcionales"]
+        }
+        return montos, rnd.uniform(-200_000, 8_000_000, (n, 12))
+
+    # Verificación contra la referencia escalar
+    montos, ganancia_neta = generar(1000)
+    resultado = motor.aplicar_lote(montos, ganancia_neta)
+    diferencias = 0
+    for i in range(1000):
+        esperado = _topes_escalar(tablas, {tipo: valores[i] for tipo, valores in montos.items()}, ganancia_neta[i])
+        diferencias += int(np.abs(np.array(esperado) - resultado["deducciones_opcionales"][i]).max() > 0.05)
+    print(f"  diferencias contra la referencia escalar: {diferencias}/1000 empleados")
+
+    # Con los totales del año (F.572), un concepto por encima de su tope fijo vuelve con
+    # el tope exacto de las tablas, sin el ruido del prorrateo
+    topes_fijos = {tipo: deduccion["tope_anual"] for tipo, deduccion in tablas["deducciones_opcionales"].items()
+                   if deduccion.get("tope_anual") is not None and not deduccion.get("comparte_tope_con")
+                   and deduccion.get("tope_porcentaje_ganancia_neta") is None}
+    anual = MotorTopes([tablas]).aplicar_anual({tipo: tope * 1.5 + 0.37 for tipo, tope in topes_fijos.items()})
+    topes_inexactos = [tipo for tipo, tope in topes_fijos.items()
+                       if anual[tipo] != tope or type(anual[tipo]) is not type(tope)]
+    print(f"  topes fijos anuales exactos: {len(topes_fijos) - len(topes_inexactos)}/{len(topes_fijos)}")
+
+    # Un empleado por llamada (como /upload-f572 o un recibo) contra el lote
+    inicio = time.perf_counter()
+    for i in range(200):
+        motor.aplicar({tipo: valores[i] for tipo, valores in montos.items()}, ganancia_neta[i])
+    individual = (time.perf_counter() - inicio) / 200
+
+    montos, ganancia_neta = generar(100_000)
+    tiempo = medir(lambda: motor.aplicar_lote(montos, ganancia_neta), repeticiones=3)
+    print(f"  un empleado por llamada: {individual * 1e6:.0f} us; lote de 100.000: {tiempo:.3f} s "
+          f"({tiempo / 100_000 * 1e6:.1f} us por empleado-año)")
+
+    # Conciliación anual completa: la simulación con los montos por concepto
+    simulador = SimuladorAnual(registro)
+    sueldos = np.round(rnd.uniform(800_000, 15_000_000, (100_000, 12)), 2)
+    estados, hijos = rnd.choice(["soltero", "casado"], 100_000), rnd.integers(0, 4, 100_000)
+    sin_topes = medir(lambda: simulador.simular(2026, sueldos, estados, hijos), repeticiones=3)
+    con_topes = medir(lambda: simulador.simular(2026, sueldos, estados, hijos, deducciones_por_tipo=montos),
+                      repeticiones=3)
+    print(f"  simulación de 100.000 empleados: {sin_topes:.3f} s sin deducciones, {con_topes:.3f} s con topes")
+    return diferencias == 0 and not topes_inexactos and tiempo < 1.0 and con_topes < 2.0
+
+
+def _detalle_por_concepto(text):
+    """Extracción del detalle tal como se hacía antes de EscanerF572: una pasada por concepto."""
+    from f572_parser import F572Parser
+    lines = text.split('\n')
+    deducciones = {}
+    for concepto, tipo in F572Parser.MAPEO_DEDUCCIONES.items():
+        idx = next((i for i, line in enumerate(lines) if concepto in line.lower()), -1)
+        if idx == -1:
+            continue
+        total = 0.0
+        for line in lines[idx + 1:idx + 50]:
+            if any(otro in line.lower() for otro in F572Parser.MAPEO_DEDUCCIONES if otro != concepto):
+                break
+            if 'subtotal:' in line.lower():
+                montos = re.findall(r'\$\s*(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})', line)
+                if montos:
+                    total += float(montos[0].replace('.', '').replace(',', '.'))
+        if total > 0:
+            deducciones[tipo] = round(total, 2)
+    return deducciones
+
+
+def _por_mes_lineal(text):
+    """Extracción de totales por mes tal como se hacía antes de EscanerF572."""
+    from f572_parser import F572Parser
+    lines = text.split('\n')
+    idx = next((i for i, line in enumerate(lines) if 'enero' in line.lower() and 'febrero' in line.lower()), -1)
+    if idx == -1:
+        return {}
+    totales = {mes: 0.0 for mes in F572Parser.MESES}
+    for line in lines[idx + 1:]:
+        if 'subtotal' in line.lower():
+            for mes, monto in zip(F572Parser.MESES, re.findall(r'(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})', line)):
+                totales[mes] += float(monto.replace('.', '').replace(',', '.'))
+    return totales
+
+
+@benchmark("escaner_f572")
+def bench_escaner_f572() -> bool:
+    """EscanerF572: una sola pasada sobre el texto de F.572 largos."""
+    from f572_parser import F572Parser
+    from generador_f572 import generar_lineas_f572
+
+    parser = F572Parser()
+    # Con todos los conceptos presentes ambas versiones quedan dominadas por el costo
+    # por línea; la diferencia aparece cuando faltan conceptos (el caso típico) y la
+    # versión anterior recorría el documento entero una vez por cada concepto faltante
+    documentos = [
+        ("todos los conceptos", None, False),
+        ("1 concepto (típico)", ["cuotas médico asistenciales"], True),
+        ("2 conceptos", ["cuotas médico asistenciales", "alquileres"], True),
+    ]
+    ok = True
+    for descripcion, conceptos, exigir_mejora in documentos:
+        print(f"  {descripcion}:")
+        for secciones in (10, 100, 500):
+            text = "\n".join(generar_lineas_f572(secciones, items_por_seccion=6, conceptos=conceptos))
+            with contextlib.redirect_stdout(io.StringIO()):
+                tiempo_antes = medir(lambda: (_por_mes_lineal(text), _detalle_por_concepto(text)), repeticiones=3)
+                tiempo_ahora = medir(lambda: parser._extraer_deducciones(text.split('\n')), repeticiones=3)
+            print(f"    {text.count(chr(10)) + 1:6d} líneas: antes {tiempo_antes * 1000:7.1f} ms  "
+                  f"una pasada {tiempo_ahora * 1000:7.1f} ms  ({tiempo_antes / tiempo_ahora:.1f}x)")
+            if exigir_mejora and secciones == 500:
+                ok = ok and tiempo_ahora < tiempo_antes
+    return ok
+
+
+def _parsear_en_proceso_nuevo(pdf: bytes, por_paginas: bool):
+    """
+    Parsea el PDF y devuelve (segundos, memoria pico en MB, resultado). Se corre en
+    un proceso nuevo para que el pico de memoria (ru_maxrss) sea solo el de este PDF.
+    """
+    import resource
+    import pdfplumber
+    from f572_parser import F572Parser
+
+    parser = F572Parser()
+    antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if por_paginas:
+            resultado = parser.parse_pdf(io.BytesIO(pdf))
+        else:
+            # Como se hacía antes: todo el texto del documento en un string
+            with pdfplumber.open(io.BytesIO(pdf)) as documento:
+                text = ""
+                for page in documento.pages:
+                    text += page.extract_text() + "\n"
+            meses, detalle = parser._extraer_deducciones(text.split('\n'))
+            resultado = {"meses_anteriores": meses, "deducciones_detalle": detalle}
+    segundos = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - antes
+    return segundos, pico / 1024, resultado
+
+
+@benchmark("f572_paginas")
+def bench_f572_paginas() -> bool:
+    """parse_pdf por páginas: memoria acotada y corte temprano en PDFs de más de 100 páginas."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from generador_f572 import LINEAS_POR_PAGINA, generar_pdf_f572
+
+    documentos = [
+        # Deducciones en las primeras ~9 páginas y después ~110 de percepciones
+        ("deducciones al principio", generar_pdf_f572(15, lineas_otras_secciones=110 * LINEAS_POR_PAGINA), True),
+        # Sin marca de fin: hay que leer todas las páginas igual
+        ("deducciones en todo el PDF", generar_pdf_f572(200), False),
+    ]
+    contexto = multiprocessing.get_context("spawn")
+    ok = True
+    for descripcion, pdf, exigir_corte in documentos:
+        paginas = pdf.count(b"/Type /Page ")
+        mediciones = {}
+        for por_paginas in (False, True):
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                mediciones[por_paginas] = executor.submit(_parsear_en_proceso_nuevo, pdf, por_paginas).result()
+
+        (t_antes, mem_antes, res_antes), (t_ahora, mem_ahora, res_ahora) = mediciones[False], mediciones[True]
+        print(f"  {descripcion} ({paginas} páginas, {len(pdf) / 1024:.0f} KB):")
+        print(f"    texto completo: {t_antes:6.2f} s  pico +{mem_antes:6.1f} MB")
+        print(f"    por páginas:    {t_ahora:6.2f} s  pico +{mem_ahora:6.1f} MB")
+        ok = ok and res_antes == res_ahora and mem_ahora < mem_antes / 2
+        if exigir_corte:
+            ok = ok and t_ahora < t_antes / 2
+    return ok
+
+@benchmark("arranque")
+def bench_arranque() -> bool:
+    """Arranque en frío: import de main sin pdfplumber y primer /calcular con y sin INICIO_RAPIDO."""
+    import os
+    from perfil_arranque import importaciones, primer_calculo, propios
+
+    filas = importaciones("main")
+    total = max(acumulado for _, _, acumulado in filas)
+    con_pdfplumber = any(nombre.split(".")[0] in ("pdfplumber", "pdfminer") for nombre, _, _ in filas)
+    print(f"  import de main: {total * 1000:6.0f} ms ({propios(filas) * 1000:.0f} ms en módulos del backend), "
+          f"pdfplumber {'importado' if con_pdfplumber else 'diferido'}")
+
+    # Intercalados para que el ruido de la máquina afecte a los dos modos por igual
+    mediciones = {"normal": [], "rápido": []}
+    for _ in range(3):
+        for modo, valor in (("normal", "0"), ("rápido", "1")):
+            entorno = {**os.environ, "INICIO_RAPIDO": valor}
+            mediciones[modo].append(primer_calculo(entorno)["primer_calculo_s"])
+    for modo, tiempos in mediciones.items():
+        print(f"  primer /calcular, arranque {modo:6s}: mejor {min(tiempos) * 1000:6.0f} ms  "
+              f"mediana {statistics.median(tiempos) * 1000:6.0f} ms")
+    return not con_pdfplumber and propios(filas) < 0.15 and min(mediciones["rápido"]) < min(mediciones["normal"])
+
+
+@benchmark("trabajos_f572")
+def bench_trabajos_f572() -> bool:
+    """/upload-f572?asincronico=true: respuesta inmediata, 429 con la cola llena y trabajos que expiran."""
+    import httpx
+    import main as api
+    from generador_f572 import generar_pdf_f572
+
+    pdfs = [generar_pdf_f572(secciones_por_concepto=30 + i) for i in range(24)]
+    cola = api.cola_trabajos_f572
+    cola.max_en_cola, cola.ttl = 8, 2.0
+
+    async def subir(cliente, pdf, asincronico):
+        inicio = time.perf_counter()
+        respuesta = await cliente.post(
+            f"/upload-f572?asincronico={'true' if asincronico else 'false'}",
+            files={"file": ("f572.pdf", pdf, "application/pdf")}
+        )
+        return respuesta, time.perf_counter() - inicio
+
+    async def escenario():
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test", timeout=120) as cliente:
+            sincronicas = [(await subir(cliente, pdf, False))[1] for pdf in pdfs[:4]]
+
+            # Ráfaga de uploads: se aceptan hasta llenar la cola y el resto recibe 429
+            rafaga = [await subir(cliente, pdf, True) for pdf in pdfs[4:]]
+            aceptados = [respuesta.json()["id"] for respuesta, _ in rafaga if respuesta.status_code == 202]
+            rechazados = [respuesta for respuesta, _ in rafaga if respuesta.status_code == 429]
+            inicio = time.perf_counter()
+            estados = {}
+            while len(estados) < len(aceptados):
+                for id_trabajo in set(aceptados) - set(estados):
+                    trabajo = (await cliente.get(f"/jobs/{id_trabajo}")).json()
+                    if trabajo["estado"] in ("completado", "error"):
+                        estados[id_trabajo] = trabajo["estado"]
+                await asyncio.sleep(0.05)
+            duracion_cola = time.perf_counter() - inicio
+
+            await asyncio.sleep(cola.ttl)
+            expirados = all([(await cliente.get(f"/jobs/{i}")).status_code == 404 for i in aceptados])
+            return sincronicas, rafaga, aceptados, rechazados, estados, duracion_cola, expirados
+
+    api.pool_f572.iniciar()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sincronicas, rafaga, aceptados, rechazados, estados, duracion_cola, expirados = asyncio.run(escenario())
+    finally:
+        api.pool_f572.detener()
+
+    respuesta_asincronica = statistics.median(tiempo for _, tiempo in rafaga)
+    print(f"  upload sincrónico:        p50 {statistics.median(sincronicas) * 1000:7.1f} ms hasta la respuesta")
+    print(f"  upload asincrónico:       p50 {respuesta_asincronica * 1000:7.1f} ms hasta el 202")
+    print(f"  ráfaga de {len(rafaga)}: {len(aceptados)} aceptados, {len(rechazados)} con 429 "
+          f"(Retry-After {rechazados[0].headers['retry-after'] if rechazados else '-'} s), "
+          f"cola procesada en {duracion_cola:.2f} s")
+    print(f"  trabajos completados: {sum(estado == 'completado' for estado in estados.values())}/{len(aceptados)}, "
+          f"expirados después del TTL: {'sí' if expirados else 'no'}")
+    return (respuesta_asincronica * 5 < statistics.median(sincronicas) and len(rechazados) > 0
+            and all(r.headers.get("retry-after") for r in rechazados)
+            and all(estado == "completado" for estado in estados.values()) and expirados)
+
+
+def _cargar_servidor_frontend():
+    """frontend/server.py como módulo (no está en el path del backend)."""
+    import importlib.util
+    from pathlib import Path
+
+    ruta = Path(__file__).resolve().parent.parent / "frontend" / "server.py"
+    especificacion = importlib.util.spec_from_file_location("servidor_frontend", ruta)
+    modulo = importlib.util.module_from_spec(especificacion)
+    especificacion.loader.exec_module(modulo)
+    return modulo
+
+
+@benchmark("frontend_estatico")
+def bench_frontend_estatico() -> bool:
+    """frontend/server.py: requests por segundo con varios clientes y un cliente lento, antes y ahora."""
+    import http.client
+    import http.server
+    import socket
+    import socketserver
+    import threading
+
+    servidor_frontend = _cargar_servidor_frontend()
+
+    class HandlerAnterior(http.server.SimpleHTTPRequestHandler):
+        """Como era server.py: archivos leídos de disco en cada request, sin cache ni compresión."""
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=servidor_frontend.DIRECTORY, **kwargs)
+
+        def log_message(self, *args):
+            pass
+
+    class HandlerActual(servidor_frontend.MyHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    def carga(puerto, clientes=8, duracion=3.0):
+        """Cada cliente simula cargas de la página (index + assets) por una conexión persistente."""
+        conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+        conexion.request("GET", "/")
+        index = conexion.getresponse().read().decode()
+        conexion.close()
+        assets = re.findall(r'(?:src|href)="([^"]+\.(?:js|css))"', index)
+        paginas = ["/"] + [f"/{asset}" for asset in assets]
+
+        totales = []
+
+        def cliente():
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+            requests, recibidos = 0, 0
+            fin = time.perf_counter() + duracion
+            while time.perf_counter() < fin:
+                for ruta in paginas:
+                    conexion.request("GET", ruta, headers={"Accept-Encoding": "gzip, deflate, br"})
+                    respuesta = conexion.getresponse()
+                    recibidos += len(respuesta.read())
+                    requests += 1
+            conexion.close()
+            totales.append((requests, recibidos))
+
+        hilos = [threading.Thread(target=cliente) for _ in range(clientes)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+        requests = sum(r for r, _ in totales)
+        return requests / segundos, sum(b for _, b in totales) / requests
+
+    def con_cliente_lento(puerto):
+        """Latencia de una request mientras otro cliente dejó una request a medio mandar (None: no respondió)."""
+        with socket.create_connection(("127.0.0.1", puerto)) as lento:
+            lento.sendall(b"GET /index.html HTTP/1.1\r\nHost: x\r\n")
+            time.sleep(0.1)
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=2)
+            inicio = time.perf_counter()
+            try:
+                conexion.request("GET", "/style.css")
+                conexion.getresponse().read()
+                return time.perf_counter() - inicio
+            except OSError:
+                return None
+            finally:
+                conexion.close()
+
+    resultados = {}
+    for nombre, clase_servidor, handler in (
+        ("antes", socketserver.TCPServer, HandlerAnterior),
+        ("ahora", servidor_frontend.ServidorFrontend, HandlerActual),
+    ):
+        servidor = clase_servidor(("127.0.0.1", 0), handler)
+        # El cliente lento y la request que vence cierran la conexión sin esperar la respuesta
+        servidor.handle_error = lambda request, client_address: None
+        hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        hilo.start()
+        puerto = servidor.server_address[1]
+        try:
+            por_segundo, bytes_por_request = carga(puerto)
+            lento = con_cliente_lento(puerto)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+        resultados[nombre] = (por_segundo, bytes_por_request, lento)
+        latencia = f"{lento * 1000:.1f} ms" if lento is not None else "sin respuesta en 2 s"
+        print(f"  {nombre}: {por_segundo:7.0f} requests/s, {bytes_por_request / 1024:5.1f} KB por request, "
+              f"con un cliente lento: {latencia}")
+
+    (rps_antes, bytes_antes, _), (rps_ahora, bytes_ahora, lento_ahora) = resultados["antes"], resultados["ahora"]
+    return rps_ahora > rps_antes and bytes_ahora * 2 < bytes_antes and lento_ahora is not None
+
+
+@benchmark("libro_retenciones")
+def bench_libro_retenciones() -> bool:
+    """Libro de retenciones: cargar un mes cuesta lo mismo en enero que en diciembre, importación y escritores concurrentes."""
+    import os
+    import tempfile
+    import threading
+
+    from libro_retenciones import LibroRetenciones
+    from tablas import RegistroTablas
+
+    rng = random.Random(23)
+    empleados = 300
+    with tempfile.TemporaryDirectory() as directorio:
+        libro = LibroRetenciones(RegistroTablas(), os.path.join(directorio, "libro.db"))
+
+        # Mes a mes, de a una liquidación por transacción: la latencia no debe crecer con el mes
+        por_mes = []
+        for mes in range(1, 13):
+            inicio = time.perf_counter()
+            for indice in range(empleados):
+                libro.registrar(f"m{indice}", 2026, mes, rng.uniform(800_000, 15_000_000), "casado", indice % 4)
+            por_mes.append((time.perf_counter() - inicio) / empleados)
+
+        # Importación: todo el año de cada empleado en una sola transacción
+        lote = [
+            {"empleado": f"i{indice}", "anio": 2026, "mes": mes, "sueldo_bruto": rng.uniform(800_000, 15_000_000),
+             "estado_civil": "soltero", "cantidad_hijos": 0}
+            for indice in range(empleados) for mes in range(1, 13)
+        ]
+        inicio = time.perf_counter()
+        libro.importar(lote)
+        importacion = (time.perf_counter() - inicio) / len(lote)
+
+        # Escritores concurrentes (la ventana de liquidación): con WAL esperan su turno en lugar de fallar
+        errores = []
+
+        def escritor(numero):
+            try:
+                for mes in range(1, 13):
+                    for indice in range(20):
+                        libro.registrar(f"c{numero}-{indice}", 2026, mes, 3_000_000, "casado", 1)
+            except Exception as e:
+                errores.append(e)
+
+        hilos = [threading.Thread(target=escritor, args=(numero,)) for numero in range(8)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        concurrente = time.perf_counter() - inicio
+        cargadas = len(libro.exportar(2026, 12))
+        libro.cerrar()
+
+    enero, diciembre = statistics.median(por_mes[:3]), statistics.median(por_mes[-3:])
+    print(f"  registrar: {enero * 1e6:6.0f} us por liquidación en enero-marzo, {diciembre * 1e6:6.0f} us en octubre-diciembre")
+    print(f"  importar:  {importacion * 1e6:6.0f} us por liquidación ({len(lote)} en una transacción)")
+    print(f"  8 threads x 240 liquidaciones: {concurrente:.2f} s, {len(errores)} errores"
+          f"{f' ({errores[0]!r})' if errores else ''}")
+    return diciembre < enero * 2 and importacion < enero and not errores and cargadas == 2 * empleados + 8 * 20
+
+
+def main(nombres):
+    nombres = nombres or list(BENCHMARKS)
+    fallidos = []
+    for nombre in nombres:
+        funcion = BENCHMARKS[nombre]
+        print(f"[{nombre}] {funcion.__doc__.strip()}")
+        if not funcion():
+            fallidos.append(nombre)
+        print()
+
+    if fallidos:
+        print(f"✗ No cumplen el objetivo: {', '.join(fallidos)}")
+        return 1
+    print("✓ Todos los benchmarks cumplen el objetivo")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,244 @@
+"""
+Memoización de los cálculos de /calcular y /calcular-anual.
+
+Gran parte del tráfico son requests idénticas (el mismo sueldo y situación
+familiar repetidos en un equipo, o el mismo formulario reenviado desde el
+frontend). Acá se guarda el resultado por la forma canónica de la request:
+los montos como los toma el motor (`redondear_monto`) y, con el motor de
+centavos, las deducciones opcionales ordenadas, así que dos requests que solo
+difieren en el orden de las deducciones comparten entrada. Con el motor float
+el orden de la suma puede cambiar el último decimal, así que el orden es parte
+de la clave. La forma canónica es solo la clave: un miss se calcula con los
+valores de la request, igual que sin cache.
+
+Cada período fiscal tiene su calculadora (RegistroTablas) y la clave incluye la
+versión de sus tablas. El cache se vacía solo cuando el registro carga, cambia o
+quita algún período.
+
+Con `serializado=True` se devuelve el JSON ya codificado: se codifica una vez
+por entrada y los hits siguientes reutilizan los mismos bytes, sin volver a
+recorrer el dict (salvo que haya que reordenar las deducciones de la request).
+
+Configuración por variable de entorno:
+    CALCULO_CACHE_MAX_ENTRADAS   resultados guardados como máximo (default: 10000)
+
+Los resultados devueltos se comparten entre requests: no hay que modificarlos.
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from tablas import RegistroTablas
+
+
+def _campo(deduccion, nombre: str, default):
+    return deduccion.get(nombre, default) if isinstance(deduccion, dict) else getattr(deduccion, nombre)
+
+
+def _normalizar_deducciones(deducciones_opcionales: Optional[List], redondear: Callable[[float], float],
+                            ordenar: bool) -> Tuple[Tuple, List[int]]:
+    """
+    Devuelve las deducciones en forma canónica (tuplas (tipo, concepto, monto),
+    ordenadas si `ordenar`) y el orden original de cada una.
+    """
+    deducciones = [
+        (_campo(d, "tipo", ""), _campo(d, "concepto", ""), redondear(_campo(d, "monto", 0)))
+        for d in deducciones_opcionales or []
+    ]
+    orden = list(range(len(deducciones)))
+    if ordenar:
+        orden.sort(key=deducciones.__getitem__)
+    return tuple(deducciones[i] for i in orden), orden
+
+
+def _ordenar_detalle(resultado: Dict, orden: List[int]) -> Dict:
+    """
+    Inversa de `_reordenar_detalle`: el resultado calculado con la request pasa
+    a tener el detalle de deducciones opcionales en orden canónico.
+    """
+    if orden == sorted(orden):
+        return resultado
+    detalle = [resultado["deducciones_opcionales"][posicion_original] for posicion_original in orden]
+    return {**resultado, "deducciones_opcionales": detalle}
+
+
+def _reordenar_detalle(resultado: Dict, orden: List[int]) -> Dict:
+    """
+    El resultado cacheado tiene el detalle de deducciones opcionales en orden
+    canónico: lo devuelve en el orden en que vinieron en la request.
+    """
+    if orden == sorted(orden):
+        return resultado
+    detalle = [None] * len(orden)
+    for posicion_canonica, posicion_original in enumerate(orden):
+        detalle[posicion_original] = resultado["deducciones_opcionales"][posicion_canonica]
+    return {**resultado, "deducciones_opcionales": detalle}
+
+
+def a_json(resultado: Dict) -> bytes:
+    """Mismo JSON que arma JSONResponse de Starlette (compacto, UTF-8, sin NaN)."""
+    return json.dumps(resultado, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _reordenar_anual(resultado: Dict, orden: List[int], reordenar: Callable = _reordenar_detalle) -> Dict:
+    calculo_mes_actual = reordenar(resultado["calculo_mes_actual"], orden)
+    if calculo_mes_actual is resultado["calculo_mes_actual"]:
+        return resultado
+    return {**resultado, "calculo_mes_actual": calculo_mes_actual}
+
+
+def _ordenar_anual(resultado: Dict, orden: List[int]) -> Dict:
+    return _reordenar_anual(resultado, orden, _ordenar_detalle)
+
+
+def _ordenar_deducciones(calculadora) -> bool:
+    """
+    Si las deducciones se pueden ordenar en la clave: con el motor de centavos la
+    suma es entera y no depende del orden; con el float, sí.
+    """
+    return calculadora.motor_centavos is not None
+
+
+class CacheCalculo:
+    def __init__(self, registro: RegistroTablas, max_entradas: Optional[int] = None):
+        self.registro = registro
+        self.max_entradas = max_entradas or int(os.environ.get("CALCULO_CACHE_MAX_ENTRADAS", 10_000))
+        self.version_registro = registro.version
+
+        # Clave -> [resultado, JSON del resultado o None si todavía no se pidió serializado]
+        self._resultados: "OrderedDict[Tuple, List]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+        # Para estimar la latencia ahorrada: tiempo total de los cálculos hechos
+        # (misses) y de las respuestas servidas desde el cache (hits)
+        self._segundos_misses = 0.0
+        self._segundos_hits = 0.0
+
+    def calcular(self, sueldo_bruto: float, estado_civil: str, cantidad_hijos: int,
+                 deducciones_opcionales: Optional[List] = None, otras_cargas: int = 0,
+                 periodo: Optional[str] = None, detalle: str = "completo",
+                 serializado: bool = False) -> Union[Dict, bytes]:
+        """
+        CalculadoraGanancias.calcular (del período pedido) con memoización: devuelve
+        el resultado con el desglose pedido en `detalle` (ver ResultadoCalculo.a_dict),
+        o su JSON con serializado=True.
+        """
+        inicio = time.perf_counter()
+        calculadora = self.registro.calculadora(periodo)
+        deducciones, orden = _normalizar_deducciones(deducciones_opcionales, calculadora.redondear_monto,
+                                                     _ordenar_deducciones(calculadora))
+        otras_cargas = otras_cargas or 0
+        clave = ("calcular", calculadora.version_tablas, detalle, calculadora.redondear_monto(sueldo_bruto),
+                 estado_civil, cantidad_hijos, otras_cargas, deducciones)
+
+        # Solo el desglose completo tiene el detalle de cada deducción opcional
+        completo = detalle == "completo"
+        entrada = self._obtener(clave)
+        if entrada is None:
+            resultado = calculadora.calcular(
+                sueldo_bruto=sueldo_bruto,
+                estado_civil=estado_civil,
+                cantidad_hijos=cantidad_hijos,
+                deducciones_opcionales=deducciones_opcionales,
+                otras_cargas=otras_cargas
+            ).a_dict(detalle)
+            entrada = self._guardar(clave, _ordenar_detalle(resultado, orden) if completo else resultado, inicio)
+        else:
+            self._segundos_hits += time.perf_counter() - inicio
+        return self._respuesta(entrada, _reordenar_detalle if completo else None, orden, serializado)
+
+    def calcular_anual_con_acumulados(self, mes_actual: Dict, datos_acumulados: Optional[Dict],
+                                      mes_actual_numero: int, periodo: Optional[str] = None,
+                                      detalle: str = "completo", serializado: bool = False) -> Union[Dict, bytes]:
+        """
+        CalculadoraGanancias.calcular_anual_con_acumulados (del período pedido) con
+        memoización: devuelve el resultado con el desglose pedido en `detalle` (ver
+        ResultadoAnual.a_dict), o su JSON con serializado=True.
+        """
+        inicio = time.perf_counter()
+        calculadora = self.registro.calculadora(periodo)
+        deducciones, orden = _normalizar_deducciones(mes_actual.get("deducciones_opcionales"),
+                                                     calculadora.redondear_monto, _ordenar_deducciones(calculadora))
+        mes = {**mes_actual, "otras_cargas": mes_actual.get("otras_cargas") or 0}
+        acumulados = None
+        if datos_acumulados:
+            # Ningún motor redondea los acumulados: van a la clave tal cual
+            acumulados = {
+                "ingresos_acumulados": datos_acumulados["ingresos_acumulados"],
+                "deducciones_acumuladas": datos_acumulados["deducciones_acumuladas"],
+                "impuesto_retenido_acumulado": datos_acumulados.get("impuesto_retenido_acumulado") or 0
+            }
+        clave = (
+            "anual", calculadora.version_tablas, detalle, calculadora.redondear_monto(mes["sueldo_bruto"]),
+            mes["estado_civil"], mes["cantidad_hijos"], mes["otras_cargas"], deducciones,
+            tuple(acumulados.values()) if acumulados else None, mes_actual_numero
+        )
+
+        completo = detalle == "completo"
+        entrada = self._obtener(clave)
+        if entrada is None:
+            resultado = calculadora.calcular_anual_con_acumulados(mes, acumulados, mes_actual_numero).a_dict(detalle)
+            entrada = self._guardar(clave, _ordenar_anual(resultado, orden) if completo else resultado, inicio)
+        else:
+            self._segundos_hits += time.perf_counter() - inicio
+        return self._respuesta(entrada, _reordenar_anual if completo else None, orden, serializado)
+
+    @staticmethod
+    def _respuesta(entrada: List, reordenar: Optional[Callable], orden: List[int],
+                   serializado: bool) -> Union[Dict, bytes]:
+        resultado = entrada[0]
+        respuesta = reordenar(resultado, orden) if reordenar else resultado
+        if not serializado:
+            return respuesta
+        if respuesta is not resultado:
+            return a_json(respuesta)
+        if entrada[1] is None:
+            entrada[1] = a_json(resultado)
+        return entrada[1]
+
+    def _obtener(self, clave: Tuple) -> Optional[List]:
+        # Si cambiaron las tablas del registro, lo guardado ya no sirve
+        if self.registro.version != self.version_registro:
+            self.limpiar()
+            self.version_registro = self.registro.version
+            self.invalidaciones += 1
+
+        entrada = self._resultados.get(clave)
+        if entrada is None:
+            self.misses += 1
+            return None
+        self._resultados.move_to_end(clave)
+        self.hits += 1
+        return entrada
+
+    def _guardar(self, clave: Tuple, resultado: Dict, inicio: float) -> List:
+        entrada = self._resultados[clave] = [resultado, None]
+        if len(self._resultados) > self.max_entradas:
+            self._resultados.popitem(last=False)
+        self._segundos_misses += time.perf_counter() - inicio
+        return entrada
+
+    def limpiar(self):
+        self._resultados.clear()
+
+    def estadisticas(self) -> Dict:
+        consultas = self.hits + self.misses
+        latencia_calculo = self._segundos_misses / self.misses if self.misses else 0.0
+        latencia_hit = self._segundos_hits / self.hits if self.hits else 0.0
+        return {
+            "entradas": len(self._resultados),
+            "max_entradas": self.max_entradas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "tasa_hits": round(self.hits / consultas, 4) if consultas else 0.0,
+            "invalidaciones": self.invalidaciones,
+            "version_registro": self.version_registro,
+            "latencia_calculo_ms": round(latencia_calculo * 1000, 4),
+            "latencia_hit_ms": round(latencia_hit * 1000, 4),
+            # Estimado: lo que habrían tardado los hits calculándose, menos lo que tardaron
+            "tiempo_ahorrado_ms": round(max(0.0, latencia_calculo - latencia_hit) * self.hits * 1000, 2)
+        }
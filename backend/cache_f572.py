@@ -0,0 +1,134 @@
+"""
+Cache de resultados del parser F.572 direccionado por contenido.
+
+La clave es el SHA-256 de los bytes del PDF más la versión del parser, así que
+si el mismo PDF se vuelve a subir no se vuelve a extraer el texto, y si cambia
+F572Parser los resultados viejos dejan de usarse solos.
+
+Dos niveles:
+    - memoria: LRU acotado por tamaño (bytes del resultado serializado)
+    - disco (opcional): un JSON por resultado, sobrevive reinicios
+
+Configuración por variables de entorno:
+    F572_CACHE_MAX_BYTES   tamaño máximo del nivel en memoria (default: 16 MB)
+    F572_CACHE_DIR         directorio del nivel en disco (sin definir: no se usa)
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+import f572_parser
+
+
+def _version_parser() -> str:
+    """Versión del parser: hash del código fuente de f572_parser.py."""
+    codigo = Path(f572_parser.__file__).read_bytes()
+    return hashlib.sha256(codigo).hexdigest()[:12]
+
+
+VERSION_PARSER = _version_parser()
+
+
+class CacheF572:
+    def __init__(self, max_bytes: Optional[int] = None, directorio: Optional[str] = None):
+        self.max_bytes = max_bytes or int(os.environ.get("F572_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+        directorio = directorio or os.environ.get("F572_CACHE_DIR")
+        self.directorio = Path(directorio) if directorio else None
+
+        # clave -> (resultado, tamaño en bytes)
+        self._memoria: "OrderedDict[str, Tuple[Dict, int]]" = OrderedDict()
+        self.bytes_en_memoria = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.directorio is not None:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            self._limpiar_versiones_viejas()
+
+    @staticmethod
+    def clave(contenido_pdf: bytes) -> str:
+        return f"{VERSION_PARSER}-{hashlib.sha256(contenido_pdf).hexdigest()}"
+
+    @staticmethod
+    def clave_de_archivo(archivo: BinaryIO) -> str:
+        """Igual que `clave`, pero leyendo el archivo de a bloques (sin cargarlo entero)."""
+        digest = hashlib.sha256()
+        archivo.seek(0)
+        for bloque in iter(lambda: archivo.read(64 * 1024), b""):
+            digest.update(bloque)
+        return f"{VERSION_PARSER}-{digest.hexdigest()}"
+
+    def obtener(self, clave: str) -> Optional[Dict]:
+        """Busca el resultado en memoria y después en disco. None si no está."""
+        entrada = self._memoria.get(clave)
+        if entrada is not None:
+            self._memoria.move_to_end(clave)
+            self.hits += 1
+            return entrada[0]
+
+        if self.directorio is not None:
+            ruta = self.directorio / f"{clave}.json"
+            try:
+                serializado = ruta.read_bytes()
+                resultado = json.loads(serializado)
+            except (OSError, ValueError):
+                pass
+            else:
+                self._guardar_en_memoria(clave, resultado, len(serializado))
+                self.hits += 1
+                return resultado
+
+        self.misses += 1
+        return None
+
+    def guardar(self, clave: str, resultado: Dict):
+        serializado = json.dumps(resultado, ensure_ascii=False).encode("utf-8")
+        self._guardar_en_memoria(clave, resultado, len(serializado))
+
+        if self.directorio is not None:
+            # Escribir a un temporal y renombrar: nunca queda un JSON a medio escribir
+            ruta = self.directorio / f"{clave}.json"
+            temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                temporal.write_bytes(serializado)
+                os.replace(temporal, ruta)
+            except OSError:
+                pass
+
+    def _guardar_en_memoria(self, clave: str, resultado: Dict, tamanio: int):
+        if tamanio > self.max_bytes:
+            return
+        anterior = self._memoria.pop(clave, None)
+        if anterior is not None:
+            self.bytes_en_memoria -= anterior[1]
+
+        self._memoria[clave] = (resultado, tamanio)
+        self.bytes_en_memoria += tamanio
+
+        # Desalojar los menos usados hasta volver a entrar en el tamaño máximo
+        while self.bytes_en_memoria > self.max_bytes:
+            _, (_, tamanio_desalojado) = self._memoria.popitem(last=False)
+            self.bytes_en_memoria -= tamanio_desalojado
+
+    def estadisticas(self) -> Dict:
+        consultas = self.hits + self.misses
+        return {
+            "entradas": len(self._memoria),
+            "bytes_en_memoria": self.bytes_en_memoria,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "tasa_hits": round(self.hits / consultas, 4) if consultas else 0.0,
+            "version_parser": VERSION_PARSER
+        }
+
+    def _limpiar_versiones_viejas(self):
+        for ruta in self.directorio.glob("*.json"):
+            if not ruta.name.startswith(f"{VERSION_PARSER}-"):
+                try:
+                    ruta.unlink()
+                except OSError:
+                    pass
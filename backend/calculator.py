@@ -1,21 +1,107 @@
+import hashlib
 import json
+import os
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+
+from centavos import MotorCentavos, a_centavos, a_pesos
+from escala import EscalaCompilada
+from metricas import MUESTREO_ETAPAS, EtapasOperacion
+from resultados import ResultadoAnual, ResultadoCalculo, ResumenMensual
+
+# Constante de Veltkamp para partir un float64 en dos mitades de 26 bits
+_SPLIT = 134217729.0
+
+
+def _redondear(valores: np.ndarray) -> np.ndarray:
+    """
+    Equivalente vectorizado de `round(x, 2)` de Python.
+
+    `np.round` redondea `x * 100` ya redondeado a float y difiere de `round` en
+    los casos en que ese producto cae justo en ,5. Acá se calcula el error exacto
+    del producto (TwoProduct de Dekker) para desempatar sobre el valor real.
+    """
+    producto = valores * 100.0
+    t = _SPLIT * valores
+    alto = t - (t - valores)
+    bajo = valores - alto
+    error = (alto * 100.0 - producto) + bajo * 100.0
+
+    centavos = np.rint(producto)
+    resto = producto - centavos
+    centavos += ((resto == 0.5) & (error > 0)).astype(np.float64)
+    centavos -= ((resto == -0.5) & (error < 0)).astype(np.float64)
+    return centavos / 100.0
+
+
+# Niveles de desglose de los resultados (`detalle` de ResultadoCalculo.a_dict y ResultadoAnual.a_dict)
+DETALLES = ("none", "resumen", "completo")
+
+# Motores de cálculo: floats (default) o centavos enteros (centavos.py)
+MOTORES = ("float", "centavos")
+
+# Duración de cada etapa de los cálculos (histogramas de GET /metrics)
+ETAPAS_CALCULAR = EtapasOperacion(
+    "calcular", ("descuentos", "deducciones_personales", "deducciones_opcionales", "escala"), MUESTREO_ETAPAS
+)
+ETAPAS_ANUAL_ACUMULADOS = EtapasOperacion(
+    "calcular_anual_con_acumulados", ("calculo_mes_actual", "acumulados", "escala_anual", "resumen"),
+    MUESTREO_ETAPAS
+)
+ETAPAS_ANUAL_HISTORIA = EtapasOperacion(
+    "calcular_anual_con_historia", ("calculo_mes_actual", "meses_anteriores", "escala_anual", "resumen"),
+    MUESTREO_ETAPAS
+)
 
 
 class CalculadoraGanancias:
-    def __init__(self):
+    def __init__(self, deducciones: Optional[Dict] = None, escalas: Optional[Dict] = None,
+                 motor: Optional[str] = None):
+        """
+        Sin argumentos carga las tablas de 2026 de data/. Para otros períodos
+        se usa RegistroTablas (tablas.py), que pasa las tablas ya leídas.
+
+        `motor` elige cómo se hacen las cuentas de calcular y calcular_lote:
+        "float" o "centavos" (enteros, ver centavos.py). Default: variable de
+        entorno CALCULO_MOTOR, o "float".
+        """
         self.data_path = Path(__file__).parent / "data"
-        self.deducciones = self._cargar_deducciones()
-        self.escalas = self._cargar_escalas()
+        self.deducciones = deducciones if deducciones is not None else self._cargar_deducciones()
+        self.escalas = escalas if escalas is not None else self._cargar_escalas()
+        self.escala_compilada = EscalaCompilada(self.escalas["escalas"])
+        self.version_tablas = self._version_tablas()
+
+        self.motor = motor or os.environ.get("CALCULO_MOTOR", "float")
+        if self.motor not in MOTORES:
+            raise ValueError(f"Motor de cálculo desconocido: {self.motor}")
+        self.motor_centavos = MotorCentavos(self) if self.motor == "centavos" else None
+
+    @staticmethod
+    def leer_tabla(ruta: Path) -> Dict:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
 
     def _cargar_deducciones(self) -> Dict:
-        with open(self.data_path / "deducciones_2026.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.leer_tabla(self.data_path / "deducciones_2026.json")
 
     def _cargar_escalas(self) -> Dict:
-        with open(self.data_path / "escalas_2026.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.leer_tabla(self.data_path / "escalas_2026.json")
+
+    def _version_tablas(self) -> str:
+        """Hash del contenido de las tablas cargadas: cambia si cambian deducciones o escalas."""
+        contenido = json.dumps([self.deducciones, self.escalas], sort_keys=True).encode("utf-8")
+        return hashlib.sha256(contenido).hexdigest()[:12]
+
+    def redondear_monto(self, monto: float) -> float:
+        """
+        Monto de entrada como lo toma el motor: el de centavos lo redondea al
+        centavo; el float lo usa tal cual.
+        """
+        if self.motor_centavos is not None:
+            return a_pesos(a_centavos(monto))
+        return monto
 
     def obtener_deducciones(self) -> Dict:
         return self.deducciones
@@ -92,129 +178,331 @@ class CalculadoraGanancias:
 
         return deducciones_calc
 
-    def aplicar_escala_progresiva(self, ganancia_neta_sujeta: float) -> Dict[str, float]:
+    def aplicar_escala_progresiva(self, ganancia_neta_sujeta: float, con_detalle: bool = True) -> Dict[str, float]:
         """
         Aplica la escala progresiva del impuesto
         """
         # Convertir a anual
         ganancia_anual = ganancia_neta_sujeta * 12
 
-        impuesto_calculado = 0
-        detalle_escalas = []
-
-        for escala in self.escalas["escalas"]:
-            desde = escala["desde"]
-            hasta = escala["hasta"] if escala["hasta"] else float('inf')
-
-            if ganancia_anual > desde:
-                base_imponible = min(ganancia_anual, hasta) - desde
-                impuesto_tramo = (base_imponible * escala["porcentaje"]) + escala["fijo"]
-
-                detalle_escalas.append({
-                    "desde": desde,
-                    "hasta": hasta if hasta != float('inf') else "en adelante",
-                    "porcentaje": escala["porcentaje"] * 100,
-                    "fijo": escala["fijo"],
-                    "base_imponible": round(base_imponible, 2),
-                    "impuesto_tramo": round(impuesto_tramo, 2)
-                })
-
-                impuesto_calculado = impuesto_tramo
-
-                if ganancia_anual <= hasta:
-                    break
+        impuesto_calculado, detalle_escalas = self.escala_compilada.calcular(ganancia_anual, con_detalle)
 
         return {
             "ganancia_anual": round(ganancia_anual, 2),
             "impuesto_anual": round(impuesto_calculado, 2),
             "impuesto_mensual": round(impuesto_calculado / 12, 2),
-            "detalle_escalas": detalle_escalas
+            "detalle_escalas": [tramo.a_dict() for tramo in detalle_escalas] if con_detalle else []
         }
 
     def calcular(self, sueldo_bruto: float, estado_civil: str, cantidad_hijos: int,
-                 deducciones_opcionales: Optional[List] = None, otras_cargas: int = 0) -> Dict:
+                 deducciones_opcionales: Optional[List] = None, otras_cargas: int = 0) -> ResultadoCalculo:
         """
         Realiza el cálculo completo del impuesto a las ganancias
+
+        Devuelve los totales en un ResultadoCalculo; el desglose (descuentos y
+        deducciones por concepto, tramos de la escala) se arma recién con
+        `a_dict(detalle)`, con el nivel de detalle que se pida (ver DETALLES).
         """
-        if deducciones_opcionales is None:
-            deducciones_opcionales = []
+        if self.motor_centavos is not None:
+            return self.motor_centavos.calcular(sueldo_bruto, estado_civil, cantidad_hijos,
+                                                deducciones_opcionales, otras_cargas)
+        tablas = self.deducciones
+        cronometro = ETAPAS_CALCULAR.iniciar()
 
-        # 1. Calcular descuentos obligatorios
-        descuentos = self.calcular_descuentos_obligatorios(sueldo_bruto)
+        # 1. Calcular descuentos obligatorios (mismo total que calcular_descuentos_obligatorios)
+        descuentos = round(sueldo_bruto * tablas["descuentos_obligatorios"]["total"], 2)
+        cronometro.etapa("descuentos")
 
         # 2. Sueldo neto después de descuentos
-        sueldo_neto = sueldo_bruto - descuentos["total"]
-
-        # 3. Calcular deducciones personales
-        deducciones_personales = self.calcular_deducciones_personales(estado_civil, cantidad_hijos, otras_cargas=otras_cargas)
+        sueldo_neto = sueldo_bruto - descuentos
+
+        # 3. Deducciones personales (mismas sumas que calcular_deducciones_personales)
+        deducciones_personales = round(
+            tablas["gni_mensual"] +
+            tablas["deduccion_especial_mensual"] +
+            (tablas["conyuge_mensual"] if estado_civil == "casado" else 0) +
+            cantidad_hijos * tablas["hijo_mensual"] +
+            otras_cargas * tablas.get("otras_cargas_mensual", 0),
+            2
+        )
+        cronometro.etapa("deducciones_personales")
 
         # 4. Deducciones opcionales (tomar monto mensual tal cual)
+        configuracion = tablas["deducciones_opcionales"]
         total_deducciones_opcionales = 0
         deducciones_opcionales_detalle = []
 
-        for deduccion in deducciones_opcionales:
-            monto = deduccion.get("monto", 0) if isinstance(deduccion, dict) else deduccion.monto
-            concepto = deduccion.get("concepto", "") if isinstance(deduccion, dict) else deduccion.concepto
-            tipo = deduccion.get("tipo", "") if isinstance(deduccion, dict) else deduccion.tipo
+        for deduccion in deducciones_opcionales or []:
+            if isinstance(deduccion, dict):
+                tipo, concepto, monto = deduccion.get("tipo", ""), deduccion.get("concepto", ""), deduccion.get("monto", 0)
+            else:
+                tipo, concepto, monto = deduccion.tipo, deduccion.concepto, deduccion.monto
 
-            # Obtener configuración de la deducción
-            config = self.deducciones["deducciones_opcionales"].get(tipo, {})
-            porcentaje_deducible = config.get("porcentaje_deducible", 1.0)
+            # Aplicar porcentaje deducible. NO aplicar tope aquí - tomar el monto tal cual:
+            # el tope se verificará mes a mes acumulado cuando se use con datos acumulados
+            monto_deducible = monto * configuracion.get(tipo, {}).get("porcentaje_deducible", 1.0)
 
-            # Aplicar porcentaje deducible
-            monto_deducible = monto * porcentaje_deducible
+            total_deducciones_opcionales += monto_deducible
+            deducciones_opcionales_detalle.append((concepto, monto_deducible))
 
-            # NO aplicar tope aquí - tomar el monto tal cual
-            # El tope se verificará mes a mes acumulado cuando se use con datos acumulados
+        cronometro.etapa("deducciones_opcionales")
 
-            total_deducciones_opcionales += monto_deducible
-            deducciones_opcionales_detalle.append({
-                "concepto": concepto,
-                "monto": round(monto_deducible, 2)
-            })
+        # 5. Ganancia neta sujeta a impuesto (mensual)
+        ganancia_neta_sujeta = sueldo_neto - deducciones_personales - total_deducciones_opcionales
+
+        # 6. Aplicar escala progresiva (si la ganancia neta es negativa o cero, no hay impuesto)
+        impuesto_anual = impuesto_mensual = 0
+        if ganancia_neta_sujeta > 0:
+            impuesto_anual, _ = self.escala_compilada.calcular(ganancia_neta_sujeta * 12, False)
+            impuesto_mensual = round(impuesto_anual / 12, 2)
+            cronometro.etapa("escala")
+
+        # 7. Sueldo neto final
+        sueldo_neto_final = sueldo_neto - impuesto_mensual
+
+        cronometro.terminar()
+        return ResultadoCalculo(
+            self, sueldo_bruto, estado_civil, cantidad_hijos, otras_cargas, descuentos, sueldo_neto,
+            deducciones_personales, deducciones_opcionales_detalle, total_deducciones_opcionales,
+            ganancia_neta_sujeta, impuesto_anual, impuesto_mensual, sueldo_neto_final
+        )
+
+    def calcular_lote(self, sueldos_brutos: Sequence[float], estados_civiles: Sequence[str],
+                      cantidad_hijos: Sequence[int], otras_cargas: Optional[Sequence[int]] = None,
+                      deducciones_opcionales: Optional[Sequence[Optional[List]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Calcula el impuesto para N empleados a la vez con operaciones sobre arrays.
+
+        Replica paso a paso (y con el mismo redondeo) lo que hace `calcular` para
+        cada fila, pero sin recorrer los empleados en Python salvo para aplanar
+        las deducciones opcionales.
+
+        Args:
+            sueldos_brutos: sueldo bruto mensual de cada empleado
+            estados_civiles: "soltero" / "casado" de cada empleado
+            cantidad_hijos: hijos a cargo de cada empleado
+            otras_cargas: otras personas a cargo de cada empleado (default 0)
+            deducciones_opcionales: lista de deducciones opcionales por empleado
+
+        Returns:
+            Dict de arrays (uno por campo) con N elementos cada uno
+        """
+        if self.motor_centavos is not None:
+            return self.motor_centavos.calcular_lote(sueldos_brutos, estados_civiles, cantidad_hijos,
+                                                     otras_cargas, deducciones_opcionales)
+        sueldo_bruto = np.asarray(sueldos_brutos, dtype=np.float64)
+        n = sueldo_bruto.shape[0]
+        casado = np.asarray(estados_civiles, dtype=object) == "casado"
+        hijos = np.asarray(cantidad_hijos, dtype=np.int64)
+        cargas = np.zeros(n, dtype=np.int64) if otras_cargas is None else np.asarray(otras_cargas, dtype=np.int64)
+
+        return self._calcular_lote_con_deducciones(
+            sueldo_bruto,
+            self.deducciones_personales_lote(casado, hijos, cargas),
+            self.deducciones_opcionales_lote(deducciones_opcionales, n)
+        )
+
+    def _calcular_lote_con_deducciones(self, sueldo_bruto: np.ndarray, deducciones_personales: np.ndarray,
+                                       total_deducciones_opcionales: np.ndarray) -> Dict[str, np.ndarray]:
+        """Pasos de calcular_lote una vez que se conocen las deducciones de cada fila."""
+        # 1. Descuentos obligatorios
+        descuentos_total = _redondear(sueldo_bruto * self.deducciones["descuentos_obligatorios"]["total"])
+
+        # 2. Sueldo neto después de descuentos
+        sueldo_neto = sueldo_bruto - descuentos_total
+
+        # 3 y 4. Deducciones personales y opcionales (ya calculadas)
 
         # 5. Ganancia neta sujeta a impuesto (mensual)
-        ganancia_neta_sujeta = sueldo_neto - deducciones_personales["total_mensual"] - total_deducciones_opcionales
-
-        # Si la ganancia neta es negativa o cero, no hay impuesto
-        if ganancia_neta_sujeta <= 0:
-            return {
-                "sueldo_bruto": round(sueldo_bruto, 2),
-                "descuentos_obligatorios": descuentos,
-                "sueldo_neto": round(sueldo_neto, 2),
-                "deducciones_personales": deducciones_personales,
-                "deducciones_opcionales": deducciones_opcionales_detalle,
-                "total_deducciones_opcionales": round(total_deducciones_opcionales, 2),
-                "ganancia_neta_sujeta_mensual": 0,
-                "impuesto": {
-                    "impuesto_mensual": 0,
-                    "impuesto_anual": 0,
-                    "detalle_escalas": []
-                },
-                "sueldo_neto_final": round(sueldo_neto, 2),
-                "mensaje": "No alcanza el mínimo no imponible"
-            }
-
-        # 6. Aplicar escala progresiva
-        impuesto = self.aplicar_escala_progresiva(ganancia_neta_sujeta)
+        ganancia_neta_sujeta = sueldo_neto - deducciones_personales - total_deducciones_opcionales
+        sujeto = ganancia_neta_sujeta > 0
+
+        # 6. Escala progresiva: tramo i tal que desde[i] < ganancia_anual <= hasta[i]
+        escala = self.escala_compilada
+        desde = np.array(escala.desde, dtype=np.float64)
+        porcentaje = np.array(escala.porcentaje, dtype=np.float64)
+        fijo = np.array(escala.fijo, dtype=np.float64)
+
+        ganancia_anual = ganancia_neta_sujeta * 12
+        tramo = np.clip(np.searchsorted(desde, ganancia_anual, side="left") - 1, 0, len(desde) - 1)
+        impuesto_anual = np.where(sujeto, (ganancia_anual - desde[tramo]) * porcentaje[tramo] + fijo[tramo], 0.0)
+        impuesto_mensual = _redondear(impuesto_anual / 12)
 
         # 7. Sueldo neto final
-        sueldo_neto_final = sueldo_neto - impuesto["impuesto_mensual"]
+        sueldo_neto_final = sueldo_neto - impuesto_mensual
+        with np.errstate(divide="ignore", invalid="ignore"):
+            porcentaje_efectivo = np.where(sujeto, _redondear(impuesto_mensual / sueldo_bruto * 100), 0.0)
+
+        return {
+            "sueldo_bruto": _redondear(sueldo_bruto),
+            "descuentos_obligatorios": descuentos_total,
+            "sueldo_neto": _redondear(sueldo_neto),
+            "deducciones_personales": _redondear(deducciones_personales),
+            "total_deducciones_opcionales": _redondear(total_deducciones_opcionales),
+            "ganancia_neta_sujeta_mensual": np.where(sujeto, _redondear(ganancia_neta_sujeta), 0.0),
+            "impuesto_mensual": impuesto_mensual,
+            "impuesto_anual": _redondear(impuesto_anual),
+            "sueldo_neto_final": _redondear(sueldo_neto_final),
+            "porcentaje_efectivo": porcentaje_efectivo
+        }
+
+    def calcular_curva(self, sueldos_brutos: Sequence[float], estado_civil: str, cantidad_hijos: int,
+                       otras_cargas: int = 0, deducciones_opcionales: Optional[List] = None) -> Dict[str, np.ndarray]:
+        """
+        Evalúa `calcular` para un mismo perfil (situación familiar y deducciones)
+        en muchos sueldos brutos, para graficar curvas.
+
+        Returns:
+            Dict de arrays: sueldo_bruto, sueldo_neto_final, impuesto_mensual,
+            porcentaje_efectivo y tasa_marginal (% de cada peso extra de bruto que va
+            a impuesto: alícuota del tramo × fracción neta de descuentos)
+        """
+        sueldo_bruto = np.asarray(sueldos_brutos, dtype=np.float64)
+        n = sueldo_bruto.shape[0]
+        personales = self.calcular_deducciones_personales(estado_civil, cantidad_hijos, otras_cargas=otras_cargas or 0)
+        opcionales = self.deducciones_opcionales_lote([deducciones_opcionales], 1)[0]
+
+        resultado = self._calcular_lote_con_deducciones(
+            sueldo_bruto, np.full(n, float(personales["total_mensual"])), np.full(n, opcionales)
+        )
+
+        escala = self.escala_compilada
+        ganancia_anual = resultado["ganancia_neta_sujeta_mensual"] * 12
+        tramo = np.clip(np.searchsorted(escala.desde, ganancia_anual, side="left") - 1, 0, len(escala.desde) - 1)
+        alicuota = np.where(ganancia_anual > 0, np.array(escala.porcentaje)[tramo], 0.0)
+        fraccion_neta = 1 - self.deducciones["descuentos_obligatorios"]["total"]
 
         return {
-            "sueldo_bruto": round(sueldo_bruto, 2),
-            "descuentos_obligatorios": descuentos,
-            "sueldo_neto": round(sueldo_neto, 2),
-            "deducciones_personales": deducciones_personales,
-            "deducciones_opcionales": deducciones_opcionales_detalle,
-            "total_deducciones_opcionales": round(total_deducciones_opcionales, 2),
-            "ganancia_neta_sujeta_mensual": round(ganancia_neta_sujeta, 2),
-            "impuesto": impuesto,
-            "sueldo_neto_final": round(sueldo_neto_final, 2),
-            "porcentaje_efectivo": round((impuesto["impuesto_mensual"] / sueldo_bruto) * 100, 2)
+            "sueldo_bruto": resultado["sueldo_bruto"],
+            "sueldo_neto_final": resultado["sueldo_neto_final"],
+            "impuesto_mensual": resultado["impuesto_mensual"],
+            "porcentaje_efectivo": resultado["porcentaje_efectivo"],
+            "tasa_marginal": _redondear(alicuota * fraccion_neta * 100)
         }
 
-    def calcular_anual_con_acumulados(self, mes_actual: Dict, datos_acumulados: Optional[Dict], mes_actual_numero: int) -> Dict:
+    def deducciones_personales_lote(self, casado: np.ndarray, hijos: np.ndarray, cargas: np.ndarray) -> np.ndarray:
+        """
+        Total mensual de deducciones personales para N empleados (el mismo
+        `total_mensual` de calcular_deducciones_personales). Los montos son
+        enteros, así que la suma es exacta.
+        """
+        return (
+            self.deducciones["gni_mensual"] +
+            self.deducciones["deduccion_especial_mensual"] +
+            np.where(casado, self.deducciones["conyuge_mensual"], 0) +
+            hijos * self.deducciones["hijo_mensual"] +
+            cargas * self.deducciones.get("otras_cargas_mensual", 0)
+        ).astype(np.float64)
+
+    def deducciones_opcionales_lote(self, deducciones_opcionales: Optional[Sequence[Optional[List]]],
+                                    n: int) -> np.ndarray:
+        """
+        Total deducible de las deducciones opcionales de N empleados. Se aplanan
+        en (fila, monto deducible) y se suman por fila; bincount acumula en el
+        mismo orden que `calcular`.
+        """
+        if deducciones_opcionales is None:
+            return np.zeros(n, dtype=np.float64)
+        config_opcionales = self.deducciones["deducciones_opcionales"]
+        filas = []
+        montos = []
+        for fila, deducciones_fila in enumerate(deducciones_opcionales):
+            for deduccion in deducciones_fila or ():
+                monto = deduccion.get("monto", 0) if isinstance(deduccion, dict) else deduccion.monto
+                tipo = deduccion.get("tipo", "") if isinstance(deduccion, dict) else deduccion.tipo
+                filas.append(fila)
+                montos.append(monto * config_opcionales.get(tipo, {}).get("porcentaje_deducible", 1.0))
+        if not filas:
+            return np.zeros(n, dtype=np.float64)
+        return np.bincount(filas, weights=montos, minlength=n)
+
+    def calcular_inverso_lote(self, objetivos: Sequence[float], estados_civiles: Sequence[str],
+                              cantidad_hijos: Sequence[int], otras_cargas: Optional[Sequence[int]] = None,
+                              deducciones_opcionales: Optional[Sequence[Optional[List]]] = None,
+                              objetivo: str = "sueldo_neto_final",
+                              max_iteraciones: int = 4) -> Dict[str, np.ndarray]:
+        """
+        Sueldo bruto que da un sueldo neto final (o una retención mensual) dado,
+        para N casos a la vez (por ejemplo, una grilla de netos).
+
+        El neto final en función del bruto es lineal por tramos y creciente:
+        dentro del tramo k de la escala,
+            neto_final = f·B·(1 - p_k) + M·p_k + (desde_k·p_k - fijo_k) / 12
+        con f = 1 - descuentos obligatorios y M = deducciones personales +
+        opcionales. Se ubica el tramo de cada objetivo y se despeja B. Como
+        `calcular` redondea descuentos e impuesto a centavos, después se corrige
+        con hasta `max_iteraciones` pasos evaluando el cálculo real (calcular_lote).
+
+        Args:
+            objetivos: sueldo neto final (o impuesto mensual) buscado en cada caso
+            objetivo: "sueldo_neto_final" o "impuesto_mensual". Con impuesto
+                mensual 0 se devuelve el mayor bruto que no paga impuesto.
+            (el resto, igual que calcular_lote)
+
+        Returns:
+            Dict de arrays: objetivo, sueldo_bruto, sueldo_neto_final, impuesto_mensual
+            y diferencia (valor obtenido - objetivo, a lo sumo un centavo)
+        """
+        if objetivo not in ("sueldo_neto_final", "impuesto_mensual"):
+            raise ValueError(f"Objetivo desconocido: {objetivo}")
+
+        valores = np.asarray(objetivos, dtype=np.float64)
+        n = valores.shape[0]
+        casado = np.asarray(estados_civiles, dtype=object) == "casado"
+        hijos = np.asarray(cantidad_hijos, dtype=np.int64)
+        cargas = np.zeros(n, dtype=np.int64) if otras_cargas is None else np.asarray(otras_cargas, dtype=np.int64)
+
+        fraccion_neta = 1 - self.deducciones["descuentos_obligatorios"]["total"]
+        minimo = (self.deducciones_personales_lote(casado, hijos, cargas) +
+                  self.deducciones_opcionales_lote(deducciones_opcionales, n))
+
+        escala = self.escala_compilada
+        desde = np.array(escala.desde, dtype=np.float64)
+        porcentaje = np.array(escala.porcentaje, dtype=np.float64)
+        fijo = np.array(escala.fijo, dtype=np.float64)
+
+        if objetivo == "impuesto_mensual":
+            # Invertir la escala: el tramo es el último cuyo fijo no supera el impuesto anual
+            impuesto_anual = valores * 12
+            tramo = np.clip(np.searchsorted(fijo, impuesto_anual, side="right") - 1, 0, len(fijo) - 1)
+            ganancia_anual = desde[tramo] + (impuesto_anual - fijo[tramo]) / porcentaje[tramo]
+            ganancia_mensual = np.where(valores > 0, ganancia_anual / 12, 0.0)
+            sueldo_bruto = (ganancia_mensual + minimo) / fraccion_neta
+            pendiente = np.where(valores > 0, fraccion_neta * porcentaje[tramo], fraccion_neta)
+        else:
+            # Neto final al inicio de cada tramo (N × tramos): ahí la ganancia neta anual vale desde_k
+            neto_inicio_tramo = minimo[:, None] + (desde - fijo) / 12
+            tramo = (neto_inicio_tramo <= valores[:, None]).sum(axis=1) - 1
+            sin_impuesto = tramo < 0
+            tramo = np.maximum(tramo, 0)
+            p = porcentaje[tramo]
+            sueldo_bruto = np.where(
+                sin_impuesto,
+                valores / fraccion_neta,
+                (valores - minimo * p - (desde[tramo] * p - fijo[tramo]) / 12) / (fraccion_neta * (1 - p))
+            )
+            pendiente = np.where(sin_impuesto, fraccion_neta, fraccion_neta * (1 - p))
+
+        # Corrección por el redondeo a centavos de descuentos e impuesto
+        sueldo_bruto = _redondear(np.maximum(sueldo_bruto, 0))
+        for _ in range(max_iteraciones + 1):
+            resultado = self.calcular_lote(sueldo_bruto, estados_civiles, hijos, cargas, deducciones_opcionales)
+            diferencia = _redondear(resultado[objetivo] - valores)
+            ajustar = np.abs(diferencia) > 0.01
+            if not ajustar.any():
+                break
+            sueldo_bruto = np.where(ajustar, _redondear(np.maximum(sueldo_bruto - diferencia / pendiente, 0)), sueldo_bruto)
+
+        return {
+            "objetivo": valores,
+            "sueldo_bruto": sueldo_bruto,
+            "sueldo_neto_final": resultado["sueldo_neto_final"],
+            "impuesto_mensual": resultado["impuesto_mensual"],
+            "diferencia": diferencia
+        }
+
+    def calcular_anual_con_acumulados(self, mes_actual: Dict, datos_acumulados: Optional[Dict],
+                                      mes_actual_numero: int) -> ResultadoAnual:
         """
         Calcula la proyección anual del impuesto considerando totales acumulados del año.
 
@@ -224,9 +512,11 @@ class CalculadoraGanancias:
             mes_actual_numero: int (1-12) para calcular meses restantes
 
         Returns:
-            Dict con proyección anual, diferencia, sugerencia de ajuste y resumen mensual
+            ResultadoAnual con proyección anual, diferencia, sugerencia de ajuste y
+            resumen mensual (el dict de la respuesta sale de `a_dict(detalle)`)
         """
         # 1. Calcular el mes actual con el método existente
+        cronometro = ETAPAS_ANUAL_ACUMULADOS.iniciar()
         calculo_mes_actual = self.calcular(
             sueldo_bruto=mes_actual["sueldo_bruto"],
             estado_civil=mes_actual["estado_civil"],
@@ -235,7 +525,9 @@ class CalculadoraGanancias:
             otras_cargas=mes_actual.get("otras_cargas", 0)
         )
 
-        ganancia_neta_actual = calculo_mes_actual["ganancia_neta_sujeta_mensual"]
+        ganancia_neta_actual = calculo_mes_actual.ganancia_neta_sujeta_mensual
+        impuesto_mes_actual = calculo_mes_actual.impuesto_mensual
+        cronometro.etapa("calculo_mes_actual")
 
         # 2. Calcular ganancia neta acumulada de meses anteriores
         ganancia_neta_acumulada = 0
@@ -269,9 +561,11 @@ class CalculadoraGanancias:
                 impuesto_ya_retenido_estimado = impuesto_retenido_acumulado
             elif meses_anteriores_count > 0:
                 ganancia_neta_promedio_mes = ganancia_neta_acumulada / meses_anteriores_count
-                impuesto_promedio = self.aplicar_escala_progresiva(ganancia_neta_promedio_mes)["impuesto_anual"] / 12
+                impuesto_promedio = self.aplicar_escala_progresiva(ganancia_neta_promedio_mes, con_detalle=False)["impuesto_anual"] / 12
                 impuesto_ya_retenido_estimado = impuesto_promedio * meses_anteriores_count
 
+        cronometro.etapa("acumulados")
+
         # 3. Proyección de meses restantes
         meses_restantes = 12 - mes_actual_numero
         ganancia_neta_proyectada = ganancia_neta_actual * meses_restantes
@@ -280,33 +574,11 @@ class CalculadoraGanancias:
         ganancia_neta_anual_total = ganancia_neta_acumulada + ganancia_neta_actual + ganancia_neta_proyectada
 
         # Aplicar escala progresiva sobre el total anual
-        impuesto_anual_real = 0
-        detalle_escalas = []
-
-        for escala in self.escalas["escalas"]:
-            desde = escala["desde"]
-            hasta = escala["hasta"] if escala["hasta"] else float('inf')
-
-            if ganancia_neta_anual_total > desde:
-                base_imponible = min(ganancia_neta_anual_total, hasta) - desde
-                impuesto_tramo = (base_imponible * escala["porcentaje"]) + escala["fijo"]
-
-                detalle_escalas.append({
-                    "desde": desde,
-                    "hasta": hasta if hasta != float('inf') else "en adelante",
-                    "porcentaje": escala["porcentaje"] * 100,
-                    "fijo": escala["fijo"],
-                    "base_imponible": round(base_imponible, 2),
-                    "impuesto_tramo": round(impuesto_tramo, 2)
-                })
-
-                impuesto_anual_real = impuesto_tramo
-
-                if ganancia_neta_anual_total <= hasta:
-                    break
+        impuesto_anual_real, _ = self.escala_compilada.calcular(ganancia_neta_anual_total, False)
+        cronometro.etapa("escala_anual")
 
         # 5. Añadir impuesto del mes actual al ya retenido estimado
-        impuesto_ya_retenido_estimado += calculo_mes_actual["impuesto"]["impuesto_mensual"]
+        impuesto_ya_retenido_estimado += impuesto_mes_actual
 
         # 6. Calcular diferencia
         diferencia = impuesto_ya_retenido_estimado - impuesto_anual_real
@@ -320,44 +592,28 @@ class CalculadoraGanancias:
         resumen_mensual = []
 
         if meses_anteriores_count > 0 and ganancia_neta_acumulada > 0:
-            resumen_mensual.append({
-                "mes": f"Meses anteriores ({meses_anteriores_count})",
-                "ganancia_neta_sujeta": round(ganancia_neta_acumulada, 2),
-                "impuesto_estimado": round(impuesto_ya_retenido_estimado - calculo_mes_actual["impuesto"]["impuesto_mensual"], 2),
-                "tipo": "historico"
-            })
-
-        resumen_mensual.append({
-            "mes": "Mes actual",
-            "ganancia_neta_sujeta": round(ganancia_neta_actual, 2),
-            "impuesto_estimado": round(calculo_mes_actual["impuesto"]["impuesto_mensual"], 2),
-            "tipo": "actual"
-        })
+            resumen_mensual.append(ResumenMensual(
+                f"Meses anteriores ({meses_anteriores_count})", ganancia_neta_acumulada,
+                impuesto_ya_retenido_estimado - impuesto_mes_actual, "historico"
+            ))
 
-        if meses_restantes > 0:
-            resumen_mensual.append({
-                "mes": f"Proyección ({meses_restantes} meses)",
-                "ganancia_neta_sujeta": round(ganancia_neta_proyectada, 2),
-                "impuesto_estimado": round(calculo_mes_actual["impuesto"]["impuesto_mensual"] * meses_restantes, 2),
-                "tipo": "proyectado"
-            })
+        resumen_mensual.append(ResumenMensual("Mes actual", ganancia_neta_actual, impuesto_mes_actual, "actual"))
 
-        return {
-            "impuesto_anual_real": round(impuesto_anual_real, 2),
-            "impuesto_ya_retenido_estimado": round(impuesto_ya_retenido_estimado, 2),
-            "diferencia": round(diferencia, 2),
-            "diferencia_porcentual": round(diferencia_porcentual, 2),
-            "diferencia_tipo": "a_favor" if diferencia > 0 else "en_contra" if diferencia < 0 else "equilibrado",
-            "retencion_mensual_sugerida": round(retencion_mensual_sugerida, 2),
-            "retencion_mensual_actual": round(calculo_mes_actual["impuesto"]["impuesto_mensual"], 2),
-            "meses_restantes": meses_restantes,
-            "ganancia_neta_anual_total": round(ganancia_neta_anual_total, 2),
-            "resumen_mensual": resumen_mensual,
-            "detalle_escalas": detalle_escalas,
-            "calculo_mes_actual": calculo_mes_actual
-        }
+        if meses_restantes > 0:
+            resumen_mensual.append(ResumenMensual(
+                f"Proyección ({meses_restantes} meses)", ganancia_neta_proyectada,
+                impuesto_mes_actual * meses_restantes, "proyectado"
+            ))
+
+        cronometro.etapa("resumen")
+        cronometro.terminar()
+        return ResultadoAnual(
+            impuesto_anual_real, impuesto_ya_retenido_estimado, diferencia, diferencia_porcentual,
+            retencion_mensual_sugerida, impuesto_mes_actual, meses_restantes, ganancia_neta_anual_total,
+            resumen_mensual, calculo_mes_actual
+        )
 
-    def calcular_anual_con_historia(self, mes_actual: Dict, meses_anteriores: List[Dict], mes_actual_numero: int) -> Dict:
+    def calcular_anual_con_historia(self, mes_actual: Dict, meses_anteriores: List[Dict], mes_actual_numero: int) -> ResultadoAnual:
         """
         Calcula la proyección anual del impuesto considerando meses anteriores del año.
 
@@ -367,9 +623,10 @@ class CalculadoraGanancias:
             mes_actual_numero: int (1-12) para calcular meses restantes
 
         Returns:
-            Dict con proyección anual, diferencia, sugerencia de ajuste y resumen mensual
+            ResultadoAnual con proyección anual, diferencia, sugerencia de ajuste y resumen mensual
         """
         # 1. Calcular el mes actual con el método existente
+        cronometro = ETAPAS_ANUAL_HISTORIA.iniciar()
         calculo_mes_actual = self.calcular(
             sueldo_bruto=mes_actual["sueldo_bruto"],
             estado_civil=mes_actual["estado_civil"],
@@ -378,7 +635,9 @@ class CalculadoraGanancias:
             otras_cargas=mes_actual.get("otras_cargas", 0)
         )
 
-        ganancia_neta_actual = calculo_mes_actual["ganancia_neta_sujeta_mensual"]
+        ganancia_neta_actual = calculo_mes_actual.ganancia_neta_sujeta_mensual
+        impuesto_mes_actual = calculo_mes_actual.impuesto_mensual
+        cronometro.etapa("calculo_mes_actual")
 
         # 2. Calcular ganancias netas de meses anteriores
         resumen_mensual = []
@@ -408,69 +667,37 @@ class CalculadoraGanancias:
 
             # Estimar impuesto del mes (calcular como si fuera anual y dividir)
             ganancia_anual_estimada_mes = ganancia_neta_mes * 12
-            impuesto_anual_estimado = self.aplicar_escala_progresiva(ganancia_neta_mes)["impuesto_anual"]
+            impuesto_anual_estimado = self.aplicar_escala_progresiva(ganancia_neta_mes, con_detalle=False)["impuesto_anual"]
             impuesto_mensual_estimado = impuesto_anual_estimado / 12
 
             impuesto_ya_retenido_estimado += impuesto_mensual_estimado
 
-            resumen_mensual.append({
-                "mes": mes_data["mes"],
-                "ganancia_neta_sujeta": round(ganancia_neta_mes, 2),
-                "impuesto_estimado": round(impuesto_mensual_estimado, 2),
-                "tipo": "historico"
-            })
+            resumen_mensual.append(ResumenMensual(mes_data["mes"], ganancia_neta_mes, impuesto_mensual_estimado, "historico"))
+
+        cronometro.etapa("meses_anteriores")
 
         # 3. Agregar mes actual al resumen
-        resumen_mensual.append({
-            "mes": "actual",
-            "ganancia_neta_sujeta": round(ganancia_neta_actual, 2),
-            "impuesto_estimado": round(calculo_mes_actual["impuesto"]["impuesto_mensual"], 2),
-            "tipo": "actual"
-        })
+        resumen_mensual.append(ResumenMensual("actual", ganancia_neta_actual, impuesto_mes_actual, "actual"))
 
         ganancia_neta_acumulada += ganancia_neta_actual
-        impuesto_ya_retenido_estimado += calculo_mes_actual["impuesto"]["impuesto_mensual"]
+        impuesto_ya_retenido_estimado += impuesto_mes_actual
 
         # 4. Proyección de meses restantes
         meses_restantes = 12 - mes_actual_numero
         ganancia_neta_proyectada = ganancia_neta_actual * meses_restantes
 
         if meses_restantes > 0:
-            resumen_mensual.append({
-                "mes": f"proyeccion_{meses_restantes}_meses",
-                "ganancia_neta_sujeta": round(ganancia_neta_proyectada, 2),
-                "impuesto_estimado": round(calculo_mes_actual["impuesto"]["impuesto_mensual"] * meses_restantes, 2),
-                "tipo": "proyectado"
-            })
+            resumen_mensual.append(ResumenMensual(
+                f"proyeccion_{meses_restantes}_meses", ganancia_neta_proyectada,
+                impuesto_mes_actual * meses_restantes, "proyectado"
+            ))
 
         # 5. Calcular impuesto anual real sobre la ganancia total
         ganancia_neta_anual_total = ganancia_neta_acumulada + ganancia_neta_proyectada
 
         # Aplicar escala progresiva sobre el total anual
-        impuesto_anual_real = 0
-        detalle_escalas = []
-
-        for escala in self.escalas["escalas"]:
-            desde = escala["desde"]
-            hasta = escala["hasta"] if escala["hasta"] else float('inf')
-
-            if ganancia_neta_anual_total > desde:
-                base_imponible = min(ganancia_neta_anual_total, hasta) - desde
-                impuesto_tramo = (base_imponible * escala["porcentaje"]) + escala["fijo"]
-
-                detalle_escalas.append({
-                    "desde": desde,
-                    "hasta": hasta if hasta != float('inf') else "en adelante",
-                    "porcentaje": escala["porcentaje"] * 100,
-                    "fijo": escala["fijo"],
-                    "base_imponible": round(base_imponible, 2),
-                    "impuesto_tramo": round(impuesto_tramo, 2)
-                })
-
-                impuesto_anual_real = impuesto_tramo
-
-                if ganancia_neta_anual_total <= hasta:
-                    break
+        impuesto_anual_real, _ = self.escala_compilada.calcular(ganancia_neta_anual_total, False)
+        cronometro.etapa("escala_anual")
 
         # 6. Calcular diferencia
         diferencia = impuesto_ya_retenido_estimado - impuesto_anual_real
@@ -480,17 +707,10 @@ class CalculadoraGanancias:
         impuesto_pendiente = impuesto_anual_real - impuesto_ya_retenido_estimado
         retencion_mensual_sugerida = impuesto_pendiente / meses_restantes if meses_restantes > 0 else 0
 
-        return {
-            "impuesto_anual_real": round(impuesto_anual_real, 2),
-            "impuesto_ya_retenido_estimado": round(impuesto_ya_retenido_estimado, 2),
-            "diferencia": round(diferencia, 2),
-            "diferencia_porcentual": round(diferencia_porcentual, 2),
-            "diferencia_tipo": "a_favor" if diferencia > 0 else "en_contra" if diferencia < 0 else "equilibrado",
-            "retencion_mensual_sugerida": round(retencion_mensual_sugerida, 2),
-            "retencion_mensual_actual": round(calculo_mes_actual["impuesto"]["impuesto_mensual"], 2),
-            "meses_restantes": meses_restantes,
-            "ganancia_neta_anual_total": round(ganancia_neta_anual_total, 2),
-            "resumen_mensual": resumen_mensual,
-            "detalle_escalas": detalle_escalas,
-            "calculo_mes_actual": calculo_mes_actual
-        }
+        cronometro.etapa("resumen")
+        cronometro.terminar()
+        return ResultadoAnual(
+            impuesto_anual_real, impuesto_ya_retenido_estimado, diferencia, diferencia_porcentual,
+            retencion_mensual_sugerida, impuesto_mes_actual, meses_restantes, ganancia_neta_anual_total,
+            resumen_mensual, calculo_mes_actual
+        )
@@ -0,0 +1,274 @@
+"""
+Motor de cálculo en centavos enteros.
+
+El motor por defecto de CalculadoraGanancias trabaja con floats y redondea con
+`round(x, 2)` en distintos pasos, así que un resultado puede moverse un centavo
+según dónde caiga el redondeo (un medio centavo que en binario queda apenas por
+debajo, una suma de deducciones que no se redondea antes de restarse). Este
+motor hace todo en centavos enteros, con las alícuotas como fracciones exactas
+(0.17 -> 17/100), y redondea una sola vez en cada uno de estos puntos, al
+centavo y con el medio centavo hacia arriba (redondeo de ARCA):
+
+    1. montos de entrada (sueldo bruto y deducciones) con más de dos decimales
+    2. descuentos obligatorios: bruto × alícuota total
+    3. cada deducción opcional: monto × porcentaje deducible
+    4. impuesto anual e impuesto mensual (anual / 12), los dos desde el valor
+       exacto de la escala, no uno desde el otro
+    5. porcentaje efectivo, a dos decimales
+
+Todo lo demás (sueldo neto, ganancia neta sujeta, ganancia anual, sueldo neto
+final) son sumas y restas exactas de centavos. `calcular_lote` hace las mismas
+cuentas con arrays de int64.
+
+Se elige con `CalculadoraGanancias(motor="centavos")` o, para toda la API, con
+la variable de entorno CALCULO_MOTOR=centavos. Las proyecciones anuales usan
+este motor para el mes actual; el resto de la proyección sigue en floats.
+"""
+from bisect import bisect_left
+from fractions import Fraction
+from math import gcd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from resultados import ResultadoCalculo
+
+
+def _tasa(valor: float) -> Tuple[int, int]:
+    """Alícuota como fracción exacta (numerador, denominador) de su valor decimal: 0.17 -> (17, 100)."""
+    fraccion = Fraction(repr(valor))
+    return fraccion.numerator, fraccion.denominator
+
+
+def _dividir(numerador: int, denominador: int) -> int:
+    """numerador / denominador redondeado al entero, el medio hacia arriba (lejos de cero)."""
+    if numerador >= 0:
+        return (2 * numerador + denominador) // (2 * denominador)
+    return -((-2 * numerador + denominador) // (2 * denominador))
+
+
+def _dividir_lote(numerador: np.ndarray, denominador) -> np.ndarray:
+    """_dividir para arrays de int64."""
+    return np.where(
+        numerador >= 0,
+        (2 * numerador + denominador) // (2 * denominador),
+        -((-2 * numerador + denominador) // (2 * denominador))
+    )
+
+
+def a_centavos(monto: float) -> int:
+    """
+    Monto en pesos a centavos. Con más de dos decimales se redondea al centavo
+    (medio centavo hacia arriba) sobre el valor decimal escrito: 1.005 -> 101.
+    """
+    if isinstance(monto, int):
+        return monto * 100
+    producto = monto * 100
+    centavos = round(producto)
+    # Un medio centavo puede quedar en binario apenas por debajo: se decide sobre el decimal
+    if abs(producto - centavos) > 0.4999:
+        fraccion = Fraction(repr(monto)) * 100
+        return _dividir(fraccion.numerator, fraccion.denominator)
+    return int(centavos)
+
+
+def a_centavos_lote(montos: np.ndarray) -> np.ndarray:
+    """a_centavos para un array de montos en pesos (int64)."""
+    producto = np.asarray(montos, dtype=np.float64) * 100
+    centavos = np.rint(producto)
+    medios = np.flatnonzero(np.abs(producto - centavos) > 0.4999)
+    centavos = centavos.astype(np.int64)
+    for i in medios:
+        centavos[i] = a_centavos(float(montos[i]))
+    return centavos
+
+
+def a_pesos(centavos: int) -> float:
+    return centavos / 100
+
+
+class MotorCentavos:
+    """
+    Las tablas de una CalculadoraGanancias pasadas a centavos y fracciones.
+
+    Hace las veces de calculadora en los ResultadoCalculo que devuelve (para el
+    desglose de `a_dict`), así que expone los mismos métodos que usa el desglose.
+    """
+
+    def __init__(self, calculadora):
+        self.calculadora = calculadora
+        tablas = calculadora.deducciones
+
+        descuentos = tablas["descuentos_obligatorios"]
+        self.tasa_descuentos = _tasa(descuentos["total"])
+        self.tasas_descuentos = {concepto: _tasa(descuentos[concepto])
+                                 for concepto in ("jubilacion", "obra_social", "ley_19032")}
+
+        self.minimo_personal = a_centavos(tablas["gni_mensual"]) + a_centavos(tablas["deduccion_especial_mensual"])
+        self.conyuge = a_centavos(tablas["conyuge_mensual"])
+        self.hijo = a_centavos(tablas["hijo_mensual"])
+        self.otras_cargas = a_centavos(tablas.get("otras_cargas_mensual", 0))
+
+        self.tasas_deducibles = {
+            tipo: _tasa(configuracion.get("porcentaje_deducible", 1.0))
+            for tipo, configuracion in tablas["deducciones_opcionales"].items()
+        }
+
+        # Escala: impuesto × D = (ganancia - desde) × alícuota × D + fijo × D, con D el
+        # denominador común de las alícuotas, así que el impuesto exacto es un entero / D
+        escala = calculadora.escala_compilada
+        tasas = [_tasa(porcentaje) for porcentaje in escala.porcentaje]
+        self.denominador = 1
+        for _, denominador in tasas:
+            self.denominador = self.denominador * denominador // gcd(self.denominador, denominador)
+        self.desde = [a_centavos(desde) for desde in escala.desde]
+        self.alicuota = [numerador * (self.denominador // denominador) for numerador, denominador in tasas]
+        self.fijo = [a_centavos(fijo) * self.denominador for fijo in escala.fijo]
+
+    @property
+    def escala_compilada(self):
+        return self.calculadora.escala_compilada
+
+    def calcular_deducciones_personales(self, *args, **kwargs) -> Dict[str, float]:
+        # Los montos de las tablas son enteros: la suma en floats ya es exacta
+        return self.calculadora.calcular_deducciones_personales(*args, **kwargs)
+
+    def calcular_descuentos_obligatorios(self, sueldo_bruto: float) -> Dict[str, float]:
+        bruto = a_centavos(sueldo_bruto)
+        descuentos = {
+            concepto: a_pesos(_dividir(bruto * numerador, denominador))
+            for concepto, (numerador, denominador) in self.tasas_descuentos.items()
+        }
+        descuentos["total"] = a_pesos(_dividir(bruto * self.tasa_descuentos[0], self.tasa_descuentos[1]))
+        return descuentos
+
+    def _impuesto(self, ganancia_anual: int) -> int:
+        """Impuesto anual exacto, multiplicado por el denominador común de las alícuotas."""
+        i = bisect_left(self.desde, ganancia_anual) - 1
+        return (ganancia_anual - self.desde[i]) * self.alicuota[i] + self.fijo[i]
+
+    def calcular(self, sueldo_bruto: float, estado_civil: str, cantidad_hijos: int,
+                 deducciones_opcionales: Optional[List] = None, otras_cargas: int = 0) -> ResultadoCalculo:
+        """Los pasos de CalculadoraGanancias.calcular, en centavos."""
+        bruto = a_centavos(sueldo_bruto)
+
+        # 1 y 2. Descuentos obligatorios y sueldo neto
+        descuentos = _dividir(bruto * self.tasa_descuentos[0], self.tasa_descuentos[1])
+        sueldo_neto = bruto - descuentos
+
+        # 3. Deducciones personales
+        deducciones_personales = (
+            self.minimo_personal +
+            (self.conyuge if estado_civil == "casado" else 0) +
+            cantidad_hijos * self.hijo +
+            otras_cargas * self.otras_cargas
+        )
+
+        # 4. Deducciones opcionales, cada una redondeada al centavo
+        total_deducciones_opcionales = 0
+        deducciones_opcionales_detalle = []
+        for deduccion in deducciones_opcionales or []:
+            if isinstance(deduccion, dict):
+                tipo, concepto, monto = deduccion.get("tipo", ""), deduccion.get("concepto", ""), deduccion.get("monto", 0)
+            else:
+                tipo, concepto, monto = deduccion.tipo, deduccion.concepto, deduccion.monto
+            numerador, denominador = self.tasas_deducibles.get(tipo, (1, 1))
+            monto_deducible = _dividir(a_centavos(monto) * numerador, denominador)
+            total_deducciones_opcionales += monto_deducible
+            deducciones_opcionales_detalle.append((concepto, a_pesos(monto_deducible)))
+
+        # 5. Ganancia neta sujeta a impuesto (mensual)
+        ganancia_neta_sujeta = sueldo_neto - deducciones_personales - total_deducciones_opcionales
+
+        # 6. Escala progresiva sobre la ganancia anual
+        impuesto_anual = impuesto_mensual = 0
+        if ganancia_neta_sujeta > 0:
+            impuesto = self._impuesto(ganancia_neta_sujeta * 12)
+            impuesto_anual = a_pesos(_dividir(impuesto, self.denominador))
+            impuesto_mensual = _dividir(impuesto, 12 * self.denominador)
+
+        # 7. Sueldo neto final
+        sueldo_neto_final = sueldo_neto - impuesto_mensual
+
+        return ResultadoCalculo(
+            self, a_pesos(bruto), estado_civil, cantidad_hijos, otras_cargas, a_pesos(descuentos),
+            a_pesos(sueldo_neto), a_pesos(deducciones_personales), deducciones_opcionales_detalle,
+            a_pesos(total_deducciones_opcionales), a_pesos(ganancia_neta_sujeta), impuesto_anual,
+            a_pesos(impuesto_mensual) if ganancia_neta_sujeta > 0 else 0, a_pesos(sueldo_neto_final),
+            porcentaje_efectivo=a_pesos(_dividir(impuesto_mensual * 10_000, bruto)) if ganancia_neta_sujeta > 0 else 0
+        )
+
+    def calcular_lote(self, sueldos_brutos: Sequence[float], estados_civiles: Sequence[str],
+                      cantidad_hijos: Sequence[int], otras_cargas: Optional[Sequence[int]] = None,
+                      deducciones_opcionales: Optional[Sequence[Optional[List]]] = None) -> Dict[str, np.ndarray]:
+        """CalculadoraGanancias.calcular_lote con arrays de int64 en centavos (resultado en pesos)."""
+        bruto = a_centavos_lote(sueldos_brutos)
+        n = bruto.shape[0]
+        casado = np.asarray(estados_civiles, dtype=object) == "casado"
+        hijos = np.asarray(cantidad_hijos, dtype=np.int64)
+        cargas = np.zeros(n, dtype=np.int64) if otras_cargas is None else np.asarray(otras_cargas, dtype=np.int64)
+
+        # 1 y 2. Descuentos obligatorios y sueldo neto
+        descuentos = _dividir_lote(bruto * self.tasa_descuentos[0], self.tasa_descuentos[1])
+        sueldo_neto = bruto - descuentos
+
+        # 3 y 4. Deducciones personales y opcionales
+        deducciones_personales = (
+            self.minimo_personal + np.where(casado, self.conyuge, 0) + hijos * self.hijo + cargas * self.otras_cargas
+        )
+        total_deducciones_opcionales = self._deducciones_opcionales_lote(deducciones_opcionales, n)
+
+        # 5. Ganancia neta sujeta a impuesto (mensual)
+        ganancia_neta_sujeta = sueldo_neto - deducciones_personales - total_deducciones_opcionales
+        sujeto = ganancia_neta_sujeta > 0
+
+        # 6. Escala progresiva: tramo i tal que desde[i] < ganancia_anual <= hasta[i]
+        desde = np.array(self.desde, dtype=np.int64)
+        ganancia_anual = ganancia_neta_sujeta * 12
+        tramo = np.clip(np.searchsorted(desde, ganancia_anual, side="left") - 1, 0, len(desde) - 1)
+        impuesto = (ganancia_anual - desde[tramo]) * np.array(self.alicuota, dtype=np.int64)[tramo] + \
+            np.array(self.fijo, dtype=np.int64)[tramo]
+        impuesto_anual = np.where(sujeto, _dividir_lote(impuesto, self.denominador), 0)
+        impuesto_mensual = np.where(sujeto, _dividir_lote(impuesto, 12 * self.denominador), 0)
+
+        # 7. Sueldo neto final
+        sueldo_neto_final = sueldo_neto - impuesto_mensual
+        porcentaje_efectivo = np.where(sujeto, _dividir_lote(impuesto_mensual * 10_000, np.maximum(bruto, 1)), 0)
+
+        return {
+            "sueldo_bruto": bruto / 100,
+            "descuentos_obligatorios": descuentos / 100,
+            "sueldo_neto": sueldo_neto / 100,
+            "deducciones_personales": deducciones_personales / 100,
+            "total_deducciones_opcionales": total_deducciones_opcionales / 100,
+            "ganancia_neta_sujeta_mensual": np.where(sujeto, ganancia_neta_sujeta, 0) / 100,
+            "impuesto_mensual": impuesto_mensual / 100,
+            "impuesto_anual": impuesto_anual / 100,
+            "sueldo_neto_final": sueldo_neto_final / 100,
+            "porcentaje_efectivo": porcentaje_efectivo / 100
+        }
+
+    def _deducciones_opcionales_lote(self, deducciones_opcionales: Optional[Sequence[Optional[List]]],
+                                     n: int) -> np.ndarray:
+        """Total deducible por fila, con cada deducción redondeada al centavo como en `calcular`."""
+        total = np.zeros(n, dtype=np.int64)
+        if deducciones_opcionales is None:
+            return total
+        filas = []
+        montos = []
+        numeradores = []
+        denominadores = []
+        for fila, deducciones_fila in enumerate(deducciones_opcionales):
+            for deduccion in deducciones_fila or ():
+                monto = deduccion.get("monto", 0) if isinstance(deduccion, dict) else deduccion.monto
+                tipo = deduccion.get("tipo", "") if isinstance(deduccion, dict) else deduccion.tipo
+                numerador, denominador = self.tasas_deducibles.get(tipo, (1, 1))
+                filas.append(fila)
+                montos.append(monto)
+                numeradores.append(numerador)
+                denominadores.append(denominador)
+        if filas:
+            deducible = _dividir_lote(a_centavos_lote(montos) * np.array(numeradores, dtype=np.int64),
+                                      np.array(denominadores, dtype=np.int64))
+            np.add.at(total, np.array(filas, dtype=np.int64), deducible)
+        return total
@@ -0,0 +1,67 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from resultados import DetalleEscala
+
+
+class EscalaCompilada:
+    """
+    Escala progresiva del Art. 94 compilada en arrays planos.
+
+    Se construye una sola vez al cargar `escalas_*.json` y permite encontrar el
+    tramo de una ganancia anual en O(log n) con bisect, sin recorrer los dicts
+    de la escala en cada cálculo.
+    """
+
+    __slots__ = ("desde", "hasta", "porcentaje", "fijo", "_hasta_detalle", "_porcentaje_detalle")
+
+    def __init__(self, escalas: List[Dict]):
+        tramos = sorted(escalas, key=lambda escala: escala["desde"])
+        self.desde: Tuple[float, ...] = tuple(escala["desde"] for escala in tramos)
+        self.hasta: Tuple[float, ...] = tuple(
+            escala["hasta"] if escala["hasta"] else float("inf") for escala in tramos
+        )
+        self.porcentaje: Tuple[float, ...] = tuple(escala["porcentaje"] for escala in tramos)
+        self.fijo: Tuple[float, ...] = tuple(escala["fijo"] for escala in tramos)
+
+        # Valores tal como se muestran en detalle_escalas
+        self._hasta_detalle = tuple(escala["hasta"] if escala["hasta"] else "en adelante" for escala in tramos)
+        self._porcentaje_detalle = tuple(porcentaje * 100 for porcentaje in self.porcentaje)
+
+    def tramo(self, ganancia_anual: float) -> int:
+        """
+        Índice del tramo tal que desde < ganancia_anual <= hasta.
+        Devuelve -1 si la ganancia no supera el inicio de la escala.
+        """
+        return bisect_left(self.desde, ganancia_anual) - 1
+
+    def impuesto(self, ganancia_anual: float) -> float:
+        """Impuesto anual (sin redondear) correspondiente a la ganancia anual."""
+        i = bisect_left(self.desde, ganancia_anual) - 1
+        if i < 0:
+            return 0
+        return (min(ganancia_anual, self.hasta[i]) - self.desde[i]) * self.porcentaje[i] + self.fijo[i]
+
+    def calcular(self, ganancia_anual: float, con_detalle: bool = True) -> Tuple[float, Optional[List[DetalleEscala]]]:
+        """
+        Aplica la escala a una ganancia anual.
+
+        Returns:
+            (impuesto_anual sin redondear, detalle_escalas o None si con_detalle=False)
+        """
+        i = bisect_left(self.desde, ganancia_anual) - 1
+        if i < 0:
+            return 0, [] if con_detalle else None
+
+        impuesto = (min(ganancia_anual, self.hasta[i]) - self.desde[i]) * self.porcentaje[i] + self.fijo[i]
+        if not con_detalle:
+            return impuesto, None
+
+        detalle_escalas = []
+        for j in range(i + 1):
+            base_imponible = min(ganancia_anual, self.hasta[j]) - self.desde[j]
+            detalle_escalas.append(DetalleEscala(
+                self.desde[j], self._hasta_detalle[j], self._porcentaje_detalle[j], self.fijo[j],
+                base_imponible, base_imponible * self.porcentaje[j] + self.fijo[j]
+            ))
+        return impuesto, detalle_escalas
@@ -1,6 +1,17 @@
-import pdfplumber
+import os
 import re
-from typing import Dict, List, Optional
+import time
+from contextlib import closing
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from metricas import EtapasOperacion
+
+# Duración de cada etapa del parseo (histogramas de GET /metrics)
+ETAPAS_PARSE_PDF = EtapasOperacion("parse_pdf", ("apertura", "extraccion_texto", "escaneo", "resultado"))
+
+
+class DocumentoF572DemasiadoGrandeError(Exception):
+    """El PDF supera la cantidad de páginas o de caracteres por página permitida."""
 
 
 class F572Parser:
@@ -25,12 +36,25 @@ class F572Parser:
         "intereses hipotecarios": "credito_hipotecario"
     }
 
-    def __init__(self):
-        pass
+    def __init__(self, max_paginas: Optional[int] = None, max_caracteres_pagina: Optional[int] = None):
+        # Límites por documento: como se procesa una página por vez, acotar las
+        # páginas y los caracteres de cada una acota la memoria de todo el parseo
+        self.max_paginas = max_paginas or int(os.environ.get("F572_MAX_PAGINAS", 300))
+        self.max_caracteres_pagina = max_caracteres_pagina or int(
+            os.environ.get("F572_MAX_CARACTERES_PAGINA", 50_000)
+        )
 
-    def parse_pdf(self, pdf_path: str) -> Dict:
+    def parse_pdf(self, pdf: Union[str, BinaryIO], tiempos: Optional[Dict[str, float]] = None) -> Dict:
         """
         Parsea un PDF del F.572 y extrae los datos relevantes.
+        Acepta una ruta o un archivo binario ya abierto (por ejemplo io.BytesIO).
+
+        El texto se procesa página por página y se deja de leer el PDF en cuanto
+        termina la sección de deducciones (ver EscanerF572.completo).
+
+        La duración de cada etapa (apertura, extraccion_texto, escaneo,
+        resultado, total) se registra en las métricas de este proceso o, si se
+        pasa `tiempos`, se deja en ese dict (el pool la registra en el proceso principal).
 
         Returns:
             {
@@ -48,181 +72,356 @@ class F572Parser:
                     ...
                 }
             }
+
+        Raises:
+            DocumentoF572DemasiadoGrandeError: si el PDF supera `max_paginas` o
+                alguna página supera `max_caracteres_pagina`
         """
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-
-                # Debug: mostrar primeras líneas del PDF
-                print("=" * 80)
-                print("DEBUG - Primeras 50 líneas del PDF extraído:")
-                print("=" * 80)
-                lines = text.split('\n')
-                for i, line in enumerate(lines[:50]):
-                    print(f"{i+1:3d}: {line}")
-                print("=" * 80)
-
-                # Extraer deducciones por mes
-                deducciones_por_mes = self._extraer_deducciones_por_mes(text)
-
-                # Extraer detalle de deducciones por tipo
-                deducciones_detalle = self._extraer_deducciones_detalle(text)
-
-                return {
-                    "meses_anteriores": deducciones_por_mes,
-                    "deducciones_detalle": deducciones_detalle
-                }
+            inicio = time.perf_counter()
+            medidos = {"apertura": 0.0, "extraccion_texto": 0.0, "escaneo": 0.0}
+            escaner = EscanerF572()
+
+            # Debug: mostrar primeras líneas del PDF extraído
+            print("=" * 80)
+            print("DEBUG - Primeras 50 líneas del PDF extraído:")
+            print("=" * 80)
+            impresas = 0
+
+            with closing(self.iterar_paginas(pdf, medidos)) as paginas:
+                anterior = time.perf_counter()
+                for lines in paginas:
+                    desde_pagina = time.perf_counter()
+                    medidos["extraccion_texto"] += desde_pagina - anterior
+
+                    if impresas < 50:
+                        for line in lines[:50 - impresas]:
+                            impresas += 1
+                            print(f"{impresas:3d}: {line}")
+                        if impresas == 50:
+                            print("=" * 80)
+
+                    # Extraer deducciones por mes y detalle por tipo (una sola pasada)
+                    escaner.procesar_lineas(lines)
+                    anterior = time.perf_counter()
+                    medidos["escaneo"] += anterior - desde_pagina
+                    if escaner.completo:
+                        break
+
+            # La apertura se midió dentro de la primera página
+            medidos["extraccion_texto"] -= medidos["apertura"]
+            antes_resultado = time.perf_counter()
+            deducciones_por_mes, deducciones_detalle = escaner.resultado()
+            fin = time.perf_counter()
+            medidos["resultado"] = fin - antes_resultado
+            medidos["total"] = fin - inicio
+            if tiempos is None:
+                ETAPAS_PARSE_PDF.registrar(medidos)
+            else:
+                tiempos.update(medidos)
+            return {
+                "meses_anteriores": deducciones_por_mes,
+                "deducciones_detalle": deducciones_detalle
+            }
+        except DocumentoF572DemasiadoGrandeError:
+            raise
         except Exception as e:
             raise Exception(f"Error al parsear PDF: {str(e)}")
 
+    def iterar_paginas(self, pdf: Union[str, BinaryIO],
+                       tiempos: Optional[Dict[str, float]] = None) -> Iterator[List[str]]:
+        """
+        Devuelve las líneas de texto del PDF, una lista por página.
+        Si se pasa `tiempos`, deja en tiempos["apertura"] lo que tardó abrir el PDF.
+
+        Cada página libera sus objetos de layout (caracteres, mapa de texto) apenas
+        se extrae su texto, así que en memoria queda una sola página por vez en
+        lugar del documento entero. Si se deja de iterar antes del final, el resto
+        de las páginas no se procesa.
+        """
+        # pdfplumber (con pdfminer) se importa recién acá: la mayoría de los procesos
+        # que importan este módulo nunca parsean un PDF y no tienen por qué pagarlo al arrancar
+        import pdfplumber
+
+        inicio = time.perf_counter()
+        with pdfplumber.open(pdf) as documento:
+            cantidad_paginas = len(documento.pages)
+            if tiempos is not None:
+                tiempos["apertura"] = time.perf_counter() - inicio
+            if cantidad_paginas > self.max_paginas:
+                raise DocumentoF572DemasiadoGrandeError(
+                    f"El PDF tiene {cantidad_paginas} páginas (máximo {self.max_paginas})"
+                )
+            for page in documento.pages:
+                try:
+                    if len(page.chars) > self.max_caracteres_pagina:
+                        raise DocumentoF572DemasiadoGrandeError(
+                            f"La página {page.page_number} tiene {len(page.chars)} caracteres "
+                            f"(máximo {self.max_caracteres_pagina})"
+                        )
+                    text = page.extract_text()
+                finally:
+                    page.close()
+                yield text.split('\n')
+
+    def _extraer_deducciones(self, lines: Iterable[str]) -> Tuple[List[Dict], Dict[str, float]]:
+        """
+        Extrae en una sola pasada los totales por mes y el detalle por tipo.
+        """
+        escaner = EscanerF572()
+        escaner.procesar_lineas(lines)
+        return escaner.resultado()
+
     def _extraer_deducciones_por_mes(self, text: str) -> List[Dict]:
         """
         Extrae el total de deducciones opcionales por mes.
         Busca secciones con montos mensuales y los suma.
         """
-        # Inicializar totales por mes
-        totales_por_mes = {mes: 0.0 for mes in self.MESES}
-
-        # El F.572 tiene subtotales por cada tipo de deducción
-        # Buscar patrones como "Subtotal" seguido de montos mensuales
-        lines = text.split('\n')
-
-        # Buscar la línea de encabezado con meses
-        idx_header_meses = -1
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            # Buscar línea que tenga "enero", "febrero", etc.
-            if 'enero' in line_lower and 'febrero' in line_lower:
-                idx_header_meses = i
-                break
-
-        if idx_header_meses == -1:
-            # No se encontró tabla de meses, retornar vacío
-            return []
-
-        # Identificar la posición de cada mes en el header
-        header_line = lines[idx_header_meses]
-        meses_posiciones = []
-        for mes in self.MESES:
-            # Buscar posición aproximada del mes en el header
-            idx = header_line.lower().find(mes[:3])  # Buscar por primeras 3 letras
-            if idx != -1:
-                meses_posiciones.append((mes, idx))
-
-        meses_posiciones.sort(key=lambda x: x[1])  # Ordenar por posición
-
-        # Buscar líneas con "Subtotal" después del header
-        for i in range(idx_header_meses + 1, len(lines)):
-            line = lines[i]
-            if 'subtotal' in line.lower():
-                # Extraer montos de esta línea
-                montos = re.findall(r'(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})', line)
-
-                # Mapear montos a meses (asumiendo mismo orden que header)
-                for j, (mes, _) in enumerate(meses_posiciones):
-                    if j < len(montos):
-                        monto_str = montos[j].replace('.', '').replace(',', '.')
-                        try:
-                            monto = float(monto_str)
-                            if monto > 0:
-                                totales_por_mes[mes] += monto
-                        except ValueError:
-                            continue
-
-        # Convertir a formato de salida
-        meses_data = []
-        for mes in self.MESES:
-            if totales_por_mes[mes] > 0:
-                meses_data.append({
-                    "mes": mes,
-                    "sueldo_bruto": 0,  # No extraemos sueldo del F.572 (usuario lo carga)
-                    "deducciones_opcionales_total": round(totales_por_mes[mes], 2)
-                })
-
-        return meses_data
+        return self._extraer_deducciones(text.split('\n'))[0]
 
     def _extraer_deducciones_detalle(self, text: str) -> Dict[str, float]:
         """
         Extrae el detalle de deducciones por tipo.
         Busca secciones específicas del F.572 y suma los subtotales mensuales.
         """
-        deducciones = {}
-        lines = text.split('\n')
-
-        # Buscar cada tipo de deducción
-        for concepto_f572, tipo_deduccion in self.MAPEO_DEDUCCIONES.items():
-            # Buscar la línea que contiene el concepto
-            idx_concepto = -1
-            for i, line in enumerate(lines):
-                if concepto_f572 in line.lower():
-                    idx_concepto = i
-                    print(f"DEBUG - Encontrado concepto '{concepto_f572}' en línea {i}: {line}")
-                    break
-
-            if idx_concepto == -1:
-                continue
-
-            # Buscar todas las líneas con "Subtotal:" después del concepto
-            # hasta encontrar el siguiente concepto o fin de sección
-            total_deduccion = 0.0
-            for i in range(idx_concepto + 1, min(idx_concepto + 50, len(lines))):
-                line = lines[i]
-
-                # Si encontramos otro concepto, parar
-                if any(otro_concepto in line.lower() for otro_concepto in self.MAPEO_DEDUCCIONES.keys() if otro_concepto != concepto_f572):
-                    break
-
-                # Buscar líneas con "Subtotal:"
-                if 'subtotal:' in line.lower():
-                    # Extraer el monto del subtotal
-                    montos = re.findall(r'\$\s*(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})', line)
-                    if montos:
-                        monto_str = montos[0].replace('.', '').replace(',', '.')
-                        try:
-                            monto = float(monto_str)
-                            total_deduccion += monto
-                            print(f"DEBUG - Subtotal encontrado: ${monto_str} -> {monto}")
-                        except ValueError:
-                            continue
-
-            if total_deduccion > 0:
-                deducciones[tipo_deduccion] = round(total_deduccion, 2)
-                print(f"DEBUG - Total '{tipo_deduccion}': ${total_deduccion}")
-
-        return deducciones
+        return self._extraer_deducciones(text.split('\n'))[1]
 
-    def aplicar_topes(self, deducciones: Dict[str, float], calculadora) -> Dict[str, float]:
+    def aplicar_topes(self, deducciones: Dict[str, float], calculadora,
+                      ganancia_neta_anual: Optional[float] = None) -> Dict[str, float]:
         """
         Aplica los topes legales a las deducciones.
-        Si una deducción excede el tope, la limita al máximo permitido.
+        Si una deducción excede el tope, la limita al máximo permitido. Los conceptos
+        que comparten tope (medicina prepaga y gastos médicos) se limitan juntos.
 
         Args:
             deducciones: Dict con tipo_deduccion: monto
             calculadora: Instancia de CalculadoraGanancias para obtener topes
+            ganancia_neta_anual: base de los topes porcentuales (5% de la ganancia
+                neta); sin ella esos topes no se aplican
 
         Returns:
             Dict con deducciones ajustadas a los topes
         """
-        deducciones_ajustadas = {}
+        # Import diferido: los procesos del pool no aplican topes y así no cargan numpy
+        from topes import MotorTopes
 
-        # Obtener deducciones y topes de la calculadora
-        deducciones_config = calculadora.obtener_deducciones()
+        return MotorTopes([calculadora.deducciones]).aplicar_anual(deducciones, ganancia_neta_anual)
 
-        for tipo, monto in deducciones.items():
-            # Buscar el tope para este tipo de deducción en el dict
-            deduccion_config = deducciones_config["deducciones_opcionales"].get(tipo)
 
-            if deduccion_config and "tope_anual" in deduccion_config:
-                tope = deduccion_config["tope_anual"]
-                # Si excede el tope, limitar
-                if monto > tope:
-                    deducciones_ajustadas[tipo] = tope
-                else:
-                    deducciones_ajustadas[tipo] = monto
-            else:
-                # Sin tope, mantener el monto original
-                deducciones_ajustadas[tipo] = monto
+class EscanerF572:
+    """
+    Recorre las líneas del F.572 una sola vez y acumula a la vez los subtotales
+    por mes y por tipo de deducción.
+
+    Reglas (las mismas que usaba el parser recorriendo el texto por concepto):
+    - Por mes: a partir de la primera línea con "enero" y "febrero" (encabezado),
+      cada línea con "subtotal" aporta sus montos a los meses en el orden del encabezado.
+    - Por tipo: desde la primera aparición de cada concepto se suman los montos
+      "$ ..." de las líneas "Subtotal:" de las 49 líneas siguientes, hasta que
+      aparece otro concepto.
+    - La sección de deducciones termina en la primera línea con alguna de las
+      MARCAS_FIN_DEDUCCIONES: lo que sigue (retenciones, percepciones y pagos a
+      cuenta) no son deducciones y no se procesa.
+    """
+
+    VENTANA_CONCEPTO = 50
+    MARCAS_FIN_DEDUCCIONES = ("retenciones, percepciones y pagos a cuenta",)
+
+    RE_CONCEPTOS = re.compile("|".join(re.escape(concepto) for concepto in F572Parser.MAPEO_DEDUCCIONES))
+    RE_MONTO = re.compile(r'(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})')
+    RE_MONTO_PESOS = re.compile(r'\$\s*(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})')
+
+    def __init__(self):
+        self.numero_linea = 0
+        self.meses_posiciones: Optional[List[Tuple[str, int]]] = None
+        self.totales_por_mes = {mes: 0.0 for mes in F572Parser.MESES}
+
+        # concepto -> línea donde apareció por primera vez
+        self.conceptos_encontrados: Dict[str, int] = {}
+        # concepto -> última línea (exclusive) de su ventana, mientras siga abierta
+        self.conceptos_abiertos: Dict[str, int] = {}
+        self.totales_por_concepto: Dict[str, float] = {}
+        self.fin_deducciones = False
+
+    @property
+    def completo(self) -> bool:
+        """
+        True cuando ya no queda nada por extraer de las líneas que falten.
+        Sin marca de fin hay que leer todo: cualquier subtotal posterior suma a los meses.
+        """
+        return self.fin_deducciones
+
+    def procesar_linea(self, line: str):
+        self.procesar_lineas((line,))
+
+    def procesar_lineas(self, lines: Iterable[str]):
+        """
+        Procesa un bloque de líneas (por ejemplo, una página).
+
+        Cada línea se pasa a minúsculas una sola vez. Las líneas relevantes
+        (subtotales, encabezado de meses y, mientras haga falta, las que nombran
+        algún concepto) se ubican con búsquedas de C sobre el bloque entero, y
+        solo esas se procesan en Python.
+        """
+        lines = lines if isinstance(lines, list) else list(lines)
+        base = self.numero_linea
+        self.numero_linea += len(lines)
+        if self.fin_deducciones:
+            return
+        lines_lower = [line.lower() for line in lines]
+
+        fin = self._linea_fin_deducciones(lines_lower)
+        if fin is not None:
+            self.fin_deducciones = True
+            lines = lines[:fin]
+            lines_lower = lines_lower[:fin]
+
+        relevantes = {i for i, line_lower in enumerate(lines_lower) if 'subtotal' in line_lower}
+
+        if self.meses_posiciones is None:
+            for i, line_lower in enumerate(lines_lower):
+                if 'enero' in line_lower and 'febrero' in line_lower:
+                    relevantes.add(i)
+                    break
+
+        if self.conceptos_abiertos or len(self.conceptos_encontrados) < len(F572Parser.MAPEO_DEDUCCIONES):
+            relevantes.update(self._lineas_con_conceptos(base, lines_lower))
+
+        for i in sorted(relevantes):
+            self._procesar_linea_relevante(base + i, lines_lower[i], lines[i])
+
+        # Cerrar las ventanas que terminaron dentro de este bloque (o todas, si terminó la sección)
+        if self.fin_deducciones:
+            self.conceptos_abiertos.clear()
+        else:
+            self._cerrar_ventanas_vencidas(self.numero_linea)
+
+    def _linea_fin_deducciones(self, lines_lower: List[str]) -> Optional[int]:
+        """Índice (dentro del bloque) de la primera línea que cierra la sección de deducciones."""
+        texto = "\n".join(lines_lower)
+        posiciones = [p for p in (texto.find(marca) for marca in self.MARCAS_FIN_DEDUCCIONES) if p != -1]
+        if not posiciones:
+            return None
+        return texto.count("\n", 0, min(posiciones))
+
+    def _lineas_con_conceptos(self, base: int, lines_lower: List[str]) -> List[int]:
+        """
+        Índices (dentro del bloque) de las líneas que nombran algún concepto y que
+        pueden afectar el detalle: la primera aparición de cada concepto pendiente
+        y cualquier aparición dentro de una ventana abierta (porque la cierra).
+        """
+        texto = "\n".join(lines_lower)
+        pendientes = [c for c in F572Parser.MAPEO_DEDUCCIONES if c not in self.conceptos_encontrados]
+        primeras = [p for p in (texto.find(concepto) for concepto in pendientes) if p != -1]
+
+        # Hasta dónde pueden llegar las ventanas (abiertas o que se abran en este bloque)
+        horizonte = max([fin - base for fin in self.conceptos_abiertos.values()] +
+                        [linea + self.VENTANA_CONCEPTO for linea in self._numeros_de_linea(texto, primeras)],
+                        default=0)
+        horizonte = min(horizonte, len(lines_lower))
+        if horizonte <= 0:
+            return []
+
+        texto = "\n".join(lines_lower[:horizonte])
+        posiciones = []
+        for concepto in F572Parser.MAPEO_DEDUCCIONES:
+            posicion = texto.find(concepto)
+            while posicion != -1:
+                posiciones.append(posicion)
+                posicion = texto.find(concepto, posicion + len(concepto))
+        return self._numeros_de_linea(texto, posiciones)
+
+    @staticmethod
+    def _numeros_de_linea(texto: str, posiciones: List[int]) -> List[int]:
+        """Pasa posiciones dentro de `texto` a números de línea, contando saltos entre ellas."""
+        numeros = []
+        i = 0
+        anterior = 0
+        for posicion in sorted(posiciones):
+            i += texto.count("\n", anterior, posicion)
+            anterior = posicion
+            numeros.append(i)
+        return numeros
+
+    def _procesar_linea_relevante(self, i: int, line_lower: str, line: str):
+        # 1. Totales por mes
+        if self.meses_posiciones is None:
+            if 'enero' in line_lower and 'febrero' in line_lower:
+                self._leer_encabezado_meses(line_lower)
+        elif 'subtotal' in line_lower:
+            self._sumar_subtotal_meses(line_lower)
+
+        # 2. Detalle por tipo de deducción (nada que hacer si ya están todos cerrados)
+        if not self.conceptos_abiertos and len(self.conceptos_encontrados) == len(F572Parser.MAPEO_DEDUCCIONES):
+            return
+        conceptos_linea = set(self.RE_CONCEPTOS.findall(line_lower))
+        if self.conceptos_abiertos:
+            self._sumar_subtotal_conceptos(i, line_lower if 'subtotal:' in line_lower else None, conceptos_linea)
+        for concepto in conceptos_linea:
+            if concepto not in self.conceptos_encontrados:
+                print(f"DEBUG - Encontrado concepto '{concepto}' en línea {i}: {line}")
+                self.conceptos_encontrados[concepto] = i
+                self.conceptos_abiertos[concepto] = i + self.VENTANA_CONCEPTO
+                self.totales_por_concepto[concepto] = 0.0
+
+    def _leer_encabezado_meses(self, line_lower: str):
+        posiciones = []
+        for mes in F572Parser.MESES:
+            # Buscar posición aproximada del mes en el header (primeras 3 letras)
+            idx = line_lower.find(mes[:3])
+            if idx != -1:
+                posiciones.append((mes, idx))
+        posiciones.sort(key=lambda x: x[1])
+        self.meses_posiciones = posiciones
+
+    def _sumar_subtotal_meses(self, line: str):
+        # Mapear montos a meses (asumiendo mismo orden que header)
+        for (mes, _), monto_str in zip(self.meses_posiciones, self.RE_MONTO.findall(line)):
+            monto = float(monto_str.replace('.', '').replace(',', '.'))
+            if monto > 0:
+                self.totales_por_mes[mes] += monto
+
+    def _cerrar_ventanas_vencidas(self, i: int):
+        for concepto, fin in list(self.conceptos_abiertos.items()):
+            if i >= fin:
+                del self.conceptos_abiertos[concepto]
+
+    def _sumar_subtotal_conceptos(self, i: int, line_subtotal: Optional[str], conceptos_linea):
+        """
+        Suma el subtotal de la línea a los conceptos con ventana abierta.
+        Un concepto se cierra si se termina su ventana o si la línea trae otro concepto.
+        """
+        monto_subtotal = None
+        if line_subtotal is not None:
+            montos = self.RE_MONTO_PESOS.findall(line_subtotal)
+            if montos:
+                monto_str = montos[0].replace('.', '').replace(',', '.')
+                monto_subtotal = float(monto_str)
+
+        for concepto, fin in list(self.conceptos_abiertos.items()):
+            if i >= fin or any(otro != concepto for otro in conceptos_linea):
+                del self.conceptos_abiertos[concepto]
+            elif monto_subtotal is not None:
+                self.totales_por_concepto[concepto] += monto_subtotal
+                print(f"DEBUG - Subtotal encontrado: ${monto_str} -> {monto_subtotal}")
+
+    def resultado(self) -> Tuple[List[Dict], Dict[str, float]]:
+        """Devuelve (meses_anteriores, deducciones_detalle) con el formato de parse_pdf."""
+        meses_data = []
+        if self.meses_posiciones is not None:
+            for mes in F572Parser.MESES:
+                if self.totales_por_mes[mes] > 0:
+                    meses_data.append({
+                        "mes": mes,
+                        "sueldo_bruto": 0,  # No extraemos sueldo del F.572 (usuario lo carga)
+                        "deducciones_opcionales_total": round(self.totales_por_mes[mes], 2)
+                    })
+
+        deducciones = {}
+        for concepto_f572, tipo_deduccion in F572Parser.MAPEO_DEDUCCIONES.items():
+            total_deduccion = self.totales_por_concepto.get(concepto_f572, 0.0)
+            if total_deduccion > 0:
+                deducciones[tipo_deduccion] = round(total_deduccion, 2)
+                print(f"DEBUG - Total '{tipo_deduccion}': ${total_deduccion}")
 
-        return deducciones_ajustadas
+        return meses_data, deducciones
@@ -0,0 +1,114 @@
+"""
+Generador de formularios F.572 Web sintéticos en PDF.
+
+Arma PDFs mínimos (texto plano en Helvetica, sin dependencias externas) con
+la misma estructura de texto que reconoce F572Parser: encabezado de meses,
+secciones por concepto y líneas "Subtotal:" con montos. Se usa en los
+benchmarks y en las pruebas de carga, para poder trabajar sin PDFs reales.
+"""
+import random
+from typing import List, Optional
+
+from f572_parser import F572Parser
+
+
+LINEAS_POR_PAGINA = 60
+
+
+def _formatear_monto(monto: float) -> str:
+    """Formatea un monto al estilo argentino: 1.234.567,89"""
+    entero, decimales = f"{monto:,.2f}".split(".")
+    return f"{entero.replace(',', '.')},{decimales}"
+
+
+def generar_lineas_f572(secciones_por_concepto: int = 1, items_por_seccion: int = 3,
+                        semilla: int = 0, conceptos: Optional[List[str]] = None,
+                        lineas_otras_secciones: int = 0) -> List[str]:
+    """
+    Genera las líneas de texto de un F.572 sintético.
+
+    Args:
+        secciones_por_concepto: cuántas veces se repite cada concepto (simula
+            presentaciones con muchas rectificativas / documentos largos)
+        items_por_seccion: renglones de comprobantes antes de cada subtotal
+        semilla: semilla para que los montos sean reproducibles
+        conceptos: conceptos del F.572 a incluir (default: todos los de F572Parser)
+        lineas_otras_secciones: renglones de "Otras retenciones, percepciones y
+            pagos a cuenta" después de las deducciones (simula formularios largos
+            donde lo que interesa está en las primeras páginas)
+    """
+    rnd = random.Random(semilla)
+    lineas = [
+        "SiRADIG - Trabajador",
+        "F.572 Web - Formulario de deducciones y desgravaciones",
+        "Período fiscal 2026",
+        "Detalle Enero Febrero Marzo Abril Mayo Junio Julio Agosto Septiembre Octubre Noviembre Diciembre",
+    ]
+    for repeticion in range(secciones_por_concepto):
+        for concepto in conceptos or F572Parser.MAPEO_DEDUCCIONES:
+            lineas.append(f"{concepto.capitalize()} - presentación {repeticion + 1}")
+            for item in range(items_por_seccion):
+                lineas.append(
+                    f"CUIT 30-{rnd.randint(10000000, 99999999)}-{rnd.randint(0, 9)} "
+                    f"Comprobante {item + 1} $ {_formatear_monto(rnd.uniform(1_000, 90_000))}"
+                )
+            montos = [rnd.uniform(1_000, 250_000) for _ in range(3)]
+            lineas.append("Subtotal: " + " ".join(f"$ {_formatear_monto(m)}" for m in montos))
+    if lineas_otras_secciones:
+        lineas.append("Otras retenciones, percepciones y pagos a cuenta")
+        for item in range(lineas_otras_secciones):
+            lineas.append(
+                f"CUIT 30-{rnd.randint(10000000, 99999999)}-{rnd.randint(0, 9)} "
+                f"Percepción {item + 1} $ {_formatear_monto(rnd.uniform(100, 20_000))}"
+            )
+    lineas.append("Fin del formulario")
+    return lineas
+
+
+def _escapar(texto: str) -> bytes:
+    codificado = texto.encode("cp1252", errors="replace")
+    return codificado.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def generar_pdf(lineas: List[str], lineas_por_pagina: int = LINEAS_POR_PAGINA) -> bytes:
+    """Arma un PDF con las líneas dadas, paginadas de a `lineas_por_pagina`."""
+    paginas = [lineas[i:i + lineas_por_pagina] for i in range(0, len(lineas), lineas_por_pagina)] or [[]]
+
+    objetos: List[Optional[bytes]] = [None, None, None]  # catálogo, árbol de páginas, fuente
+    objetos[2] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    ids_paginas = []
+    for lineas_pagina in paginas:
+        contenido = b"BT /F1 9 Tf 11 TL 40 800 Td\n" + b"".join(
+            b"(" + _escapar(linea) + b") Tj T*\n" for linea in lineas_pagina
+        ) + b"ET"
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(contenido) + contenido + b"\nendstream")
+        id_contenido = len(objetos)
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % id_contenido
+        )
+        ids_paginas.append(len(objetos))
+
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % i for i in ids_paginas), len(ids_paginas)
+    )
+
+    salida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for numero, objeto in enumerate(objetos, start=1):
+        offsets.append(len(salida))
+        salida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return bytes(salida)
+
+
+def generar_pdf_f572(secciones_por_concepto: int = 1, items_por_seccion: int = 3, semilla: int = 0,
+                     conceptos: Optional[List[str]] = None, lineas_otras_secciones: int = 0) -> bytes:
+    """Atajo: genera las líneas de un F.572 sintético y las arma en PDF."""
+    return generar_pdf(generar_lineas_f572(
+        secciones_por_concepto, items_por_seccion, semilla, conceptos, lineas_otras_secciones
+    ))
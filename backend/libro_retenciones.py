@@ -0,0 +1,265 @@
+"""
+Libro de retenciones por empleado, persistido en SQLite.
+
+Con `calcular_anual_con_acumulados` el cliente tiene que mandar en cada request
+los totales del año y el cálculo se rehace desde esos totales. Acá el servidor
+guarda la liquidación de cada mes de cada empleado y los acumulados del año,
+así que cargar un mes nuevo es O(1): se lee la fila de acumulados del
+empleado, se calcula la retención del mes y se escriben dos filas.
+
+La retención de cada mes sigue el mismo régimen que `SimuladorAnual`
+(simulacion.py): ganancia neta acumulada, escala del mes prorrateada, retención
+igual a lo que falta para llegar al impuesto acumulado, con tope del 35% del
+bruto del mes. Cada mes usa las tablas del período vigente en ese mes.
+
+Los meses de un empleado se cargan en orden; puede haber meses sin liquidación
+(por ejemplo, si empezó a trabajar en marzo), pero no se puede cargar un mes
+anterior al último ya cargado porque cambiaría la retención de los siguientes.
+
+La base usa WAL: muchas conexiones leen mientras una escribe, y las escrituras
+concurrentes (durante la ventana de liquidación) esperan su turno (hasta
+30 s) en lugar de fallar. Cada thread usa su propia conexión.
+
+Configuración por variable de entorno:
+    LIBRO_RETENCIONES_DB   archivo de la base (default: backend/libro_retenciones.db)
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from simulacion import TOPE_RETENCION_MENSUAL
+from tablas import RegistroTablas
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS liquidaciones (
+    empleado TEXT NOT NULL,
+    anio INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    bruto REAL NOT NULL,
+    descuentos_obligatorios REAL NOT NULL,
+    deducciones_personales REAL NOT NULL,
+    deducciones_opcionales REAL NOT NULL,
+    ganancia_neta_mes REAL NOT NULL,
+    ganancia_neta_acumulada REAL NOT NULL,
+    impuesto_acumulado REAL NOT NULL,
+    retencion REAL NOT NULL,
+    retenido_acumulado REAL NOT NULL,
+    version_tablas TEXT NOT NULL,
+    registrado REAL NOT NULL,
+    PRIMARY KEY (empleado, anio, mes)
+);
+CREATE INDEX IF NOT EXISTS liquidaciones_por_periodo ON liquidaciones (anio, mes);
+
+CREATE TABLE IF NOT EXISTS acumulados (
+    empleado TEXT NOT NULL,
+    anio INTEGER NOT NULL,
+    ultimo_mes INTEGER NOT NULL,
+    ganancia_neta_acumulada REAL NOT NULL,
+    retenido_acumulado REAL NOT NULL,
+    PRIMARY KEY (empleado, anio)
+);
+"""
+
+COLUMNAS_LIQUIDACION = (
+    "empleado", "anio", "mes", "bruto", "descuentos_obligatorios", "deducciones_personales",
+    "deducciones_opcionales", "ganancia_neta_mes", "ganancia_neta_acumulada", "impuesto_acumulado",
+    "retencion", "retenido_acumulado", "version_tablas", "registrado",
+)
+
+INSERTAR_LIQUIDACION = (
+    f"INSERT INTO liquidaciones ({', '.join(COLUMNAS_LIQUIDACION)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNAS_LIQUIDACION)})"
+)
+GUARDAR_ACUMULADOS = (
+    "INSERT OR REPLACE INTO acumulados (empleado, anio, ultimo_mes, ganancia_neta_acumulada, retenido_acumulado) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _redondear_acumulados(liquidacion: Dict) -> Dict:
+    """Copia para mostrar: los acumulados se guardan sin redondear."""
+    return {
+        **liquidacion,
+        "ganancia_neta_acumulada": round(liquidacion["ganancia_neta_acumulada"], 2),
+        "retenido_acumulado": round(liquidacion["retenido_acumulado"], 2),
+    }
+
+
+class LiquidacionFueraDeOrdenError(Exception):
+    """Se intentó cargar un mes igual o anterior al último cargado para ese empleado."""
+
+
+class LibroRetenciones:
+    def __init__(self, registro: RegistroTablas, ruta: Optional[str] = None):
+        self.registro = registro
+        self.ruta = ruta or os.environ.get(
+            "LIBRO_RETENCIONES_DB", str(Path(__file__).parent / "libro_retenciones.db")
+        )
+        self._local = threading.local()
+        self._esquema_creado = False
+        self._lock_esquema = threading.Lock()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            # isolation_level=None: las transacciones se abren a mano con BEGIN IMMEDIATE
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA journal_mode=WAL")
+            # En WAL, NORMAL no pierde consistencia ante un corte; solo las últimas transacciones
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            with self._lock_esquema:
+                if not self._esquema_creado:
+                    conexion.executescript(ESQUEMA)
+                    self._esquema_creado = True
+            self._local.conexion = conexion
+        return conexion
+
+    def registrar(self, empleado: str, anio: int, mes: int, sueldo_bruto: float, estado_civil: str,
+                  cantidad_hijos: int, otras_cargas: int = 0, sac: float = 0,
+                  deducciones_opcionales: float = 0) -> Dict:
+        """
+        Carga la liquidación de un mes y actualiza los acumulados del año del empleado.
+
+        Args:
+            deducciones_opcionales: monto deducible del mes (ya con su porcentaje deducible
+                aplicado), como en SimuladorAnual
+
+        Returns:
+            La liquidación guardada: retención del mes y acumulados del año
+
+        Raises:
+            LiquidacionFueraDeOrdenError: si el mes ya está cargado o hay uno posterior
+            PeriodoDesconocidoError: si el mes no tiene tablas cargadas
+            ValueError: si el mes no está entre 1 y 12
+        """
+        return self.importar([dict(
+            empleado=empleado, anio=anio, mes=mes, sueldo_bruto=sueldo_bruto, estado_civil=estado_civil,
+            cantidad_hijos=cantidad_hijos, otras_cargas=otras_cargas, sac=sac,
+            deducciones_opcionales=deducciones_opcionales
+        )])[0]
+
+    def importar(self, liquidaciones: Iterable[Dict]) -> List[Dict]:
+        """
+        Carga muchas liquidaciones en una sola transacción (todas o ninguna). Cada
+        una tiene los mismos campos que los argumentos de `registrar`; las de un
+        mismo empleado tienen que venir en orden de mes.
+        """
+        conexion = self._conexion()
+        registradas = []
+        # (empleado, año) -> [último mes, ganancia neta acumulada, retenido acumulado]
+        acumulados: Dict[tuple, list] = {}
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            for liquidacion in liquidaciones:
+                clave = (liquidacion["empleado"], liquidacion["anio"])
+                actual = acumulados.get(clave)
+                if actual is None:
+                    fila = conexion.execute(
+                        "SELECT ultimo_mes, ganancia_neta_acumulada, retenido_acumulado FROM acumulados "
+                        "WHERE empleado = ? AND anio = ?", clave
+                    ).fetchone()
+                    actual = acumulados[clave] = list(fila) if fila is not None else [0, 0.0, 0.0]
+
+                fila = self._liquidar(liquidacion, *actual)
+                conexion.execute(INSERTAR_LIQUIDACION, [fila[columna] for columna in COLUMNAS_LIQUIDACION])
+                conexion.execute(GUARDAR_ACUMULADOS, (
+                    fila["empleado"], fila["anio"], fila["mes"], fila["ganancia_neta_acumulada"],
+                    fila["retenido_acumulado"]
+                ))
+                actual[:] = [fila["mes"], fila["ganancia_neta_acumulada"], fila["retenido_acumulado"]]
+                registradas.append(_redondear_acumulados(fila))
+            conexion.execute("COMMIT")
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        return registradas
+
+    def _liquidar(self, liquidacion: Dict, ultimo_mes: int, ganancia_acumulada: float, retenido: float) -> Dict:
+        empleado, anio, mes = liquidacion["empleado"], liquidacion["anio"], liquidacion["mes"]
+        if not 1 <= mes <= 12:
+            raise ValueError(f"Mes inválido para {empleado}: {mes}")
+        if mes <= ultimo_mes:
+            raise LiquidacionFueraDeOrdenError(
+                f"{empleado} ya tiene cargado {anio}-{ultimo_mes:02d}: no se puede cargar {anio}-{mes:02d}"
+            )
+        calculadora = self.registro.calculadora(f"{anio}-{mes:02d}")
+
+        bruto = liquidacion["sueldo_bruto"] + liquidacion.get("sac", 0)
+        descuentos = round(bruto * calculadora.deducciones["descuentos_obligatorios"]["total"], 2)
+        personales = calculadora.calcular_deducciones_personales(
+            liquidacion["estado_civil"], liquidacion["cantidad_hijos"],
+            otras_cargas=liquidacion.get("otras_cargas", 0)
+        )["total_mensual"]
+        opcionales = liquidacion.get("deducciones_opcionales", 0)
+        ganancia_mes = bruto - descuentos - personales - opcionales
+        ganancia_acumulada += ganancia_mes
+
+        # Escala prorrateada al mes: impuesto(g) = (mes/12) × escala_anual(g × 12/mes)
+        impuesto_acumulado = calculadora.escala_compilada.impuesto(max(ganancia_acumulada, 0) * 12 / mes) * mes / 12
+
+        # Retención: lo que falta para llegar al impuesto acumulado, con tope del 35% del bruto
+        pendiente = impuesto_acumulado - retenido
+        retencion = round(min(pendiente, bruto * TOPE_RETENCION_MENSUAL) if pendiente > 0 else pendiente, 2)
+        retenido += retencion
+
+        return {
+            "empleado": empleado,
+            "anio": anio,
+            "mes": mes,
+            "bruto": round(bruto, 2),
+            "descuentos_obligatorios": descuentos,
+            "deducciones_personales": personales,
+            "deducciones_opcionales": round(opcionales, 2),
+            "ganancia_neta_mes": round(ganancia_mes, 2),
+            # Los acumulados se guardan sin redondear para que el mes siguiente siga la misma cuenta
+            "ganancia_neta_acumulada": ganancia_acumulada,
+            "impuesto_acumulado": round(impuesto_acumulado, 2),
+            "retencion": retencion,
+            "retenido_acumulado": retenido,
+            "version_tablas": calculadora.version_tablas,
+            "registrado": time.time(),
+        }
+
+    def empleado(self, empleado: str, anio: int) -> Optional[Dict]:
+        """Liquidaciones del año del empleado y sus acumulados, o None si no tiene ninguna."""
+        conexion = self._conexion()
+        acumulados = conexion.execute(
+            "SELECT ultimo_mes, ganancia_neta_acumulada, retenido_acumulado FROM acumulados "
+            "WHERE empleado = ? AND anio = ?", (empleado, anio)
+        ).fetchone()
+        if acumulados is None:
+            return None
+        return {
+            "empleado": empleado,
+            "anio": anio,
+            "ultimo_mes": acumulados["ultimo_mes"],
+            "ganancia_neta_acumulada": round(acumulados["ganancia_neta_acumulada"], 2),
+            "retenido_acumulado": round(acumulados["retenido_acumulado"], 2),
+            "liquidaciones": self.exportar(anio, empleado=empleado),
+        }
+
+    def exportar(self, anio: int, mes: Optional[int] = None, empleado: Optional[str] = None) -> List[Dict]:
+        """Liquidaciones del año (opcionalmente de un mes o de un empleado), ordenadas por empleado y mes."""
+        condiciones, parametros = ["anio = ?"], [anio]
+        if mes is not None:
+            condiciones.append("mes = ?")
+            parametros.append(mes)
+        if empleado is not None:
+            condiciones.append("empleado = ?")
+            parametros.append(empleado)
+        filas = self._conexion().execute(
+            f"SELECT {', '.join(COLUMNAS_LIQUIDACION)} FROM liquidaciones "
+            f"WHERE {' AND '.join(condiciones)} ORDER BY empleado, mes", parametros
+        ).fetchall()
+        return [_redondear_acumulados(dict(fila)) for fila in filas]
+
+    def cerrar(self):
+        """Cierra la conexión del thread actual."""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            conexion.close()
+            self._local.conexion = None
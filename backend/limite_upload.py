@@ -0,0 +1,73 @@
+"""
+Middleware ASGI que limita el tamaño de los uploads mientras se reciben.
+
+Starlette lee y guarda todo el multipart antes de llamar al endpoint, así que
+validar el tamaño dentro de /upload-f572 llega tarde: el archivo ya está
+en memoria o en disco. Este middleware corta la request con 413 apenas el
+Content-Length declarado, o los bytes efectivamente recibidos, superan el límite.
+
+Configuración por variable de entorno:
+    F572_MAX_UPLOAD_BYTES   tamaño máximo del cuerpo de la request (default: 10 MB)
+"""
+import json
+import os
+from typing import Iterable, Optional
+
+
+class LimiteTamanioUpload:
+    def __init__(self, app, rutas: Iterable[str], max_bytes: Optional[int] = None):
+        self.app = app
+        self.rutas = set(rutas)
+        self.max_bytes = max_bytes or int(os.environ.get("F572_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.rutas:
+            await self.app(scope, receive, send)
+            return
+
+        # 1. Si el cliente declaró el tamaño, rechazar sin leer el cuerpo
+        for nombre, valor in scope["headers"]:
+            if nombre == b"content-length" and valor.isdigit() and int(valor) > self.max_bytes:
+                await self._responder_413(send)
+                return
+
+        # 2. Si no (o si mintió), contar los bytes a medida que llegan. Al pasarse
+        # se responde 413 y a la app se le informa que el cliente se desconectó,
+        # así deja de leer el cuerpo; lo que intente responder después se descarta.
+        recibidos = 0
+        respuesta_iniciada = False
+        rechazada = False
+
+        async def receive_limitado():
+            nonlocal recibidos, rechazada
+            if rechazada:
+                return {"type": "http.disconnect"}
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > self.max_bytes and not respuesta_iniciada:
+                    rechazada = True
+                    await self._responder_413(send)
+                    return {"type": "http.disconnect"}
+            return mensaje
+
+        async def send_registrado(mensaje):
+            nonlocal respuesta_iniciada
+            if rechazada:
+                return
+            if mensaje["type"] == "http.response.start":
+                respuesta_iniciada = True
+            await send(mensaje)
+
+        await self.app(scope, receive_limitado, send_registrado)
+
+    async def _responder_413(self, send):
+        cuerpo = json.dumps({
+            "detail": f"El archivo supera el tamaño máximo permitido ({self.max_bytes / (1024 * 1024):.1f} MB)"
+        }, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(cuerpo)).encode())],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
@@ -1,24 +1,152 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
+import asyncio
+import contextlib
+import io
 import os
-import tempfile
-from calculator import CalculadoraGanancias
-from f572_parser import F572Parser
+import numpy as np
+from calculator import DETALLES
+from tablas import RegistroTablas, PeriodoDesconocidoError
+from simulacion import SimuladorAnual, calcular_sac
+from f572_parser import F572Parser, DocumentoF572DemasiadoGrandeError
+from pool_f572 import PoolParserF572, PoolSaturadoError, TimeoutParseoError
+from cache_f572 import CacheF572
+from cache_calculo import CacheCalculo
+from libro_retenciones import LibroRetenciones, LiquidacionFueraDeOrdenError
+from trabajos_f572 import COMPLETADO, EN_COLA, ERROR, ColaLlenaError, ColaTrabajosF572
+from limite_upload import LimiteTamanioUpload
+from metricas import INTERVALO_LAG, METRICAS, EtapasOperacion, MetricasHTTP, medir_lag_event_loop
+from perfilado import BufferPerfiles, PerfiladoRequests
 
 app = FastAPI(title="Calculadora Impuesto a las Ganancias - Argentina")
 
+# Rechazar PDFs demasiado grandes mientras se reciben, antes de bufferearlos completos.
+# Va antes que CORS (queda adentro): el 413 también lleva Access-Control-Allow-Origin
+# y el frontend, que está en otro origen, puede leerlo
+app.add_middleware(LimiteTamanioUpload, rutas=["/upload-f572"])
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El frontend lee Retry-After de los 429 de /upload-f572 para reintentar
+    expose_headers=["Retry-After"],
 )
 
-calculadora = CalculadoraGanancias()
+# Perfilado de requests puntuales con `X-Perfilar: 1` (solo con PERFILADO_HABILITADO=1)
+perfiles = BufferPerfiles()
+app.add_middleware(PerfiladoRequests, buffer=perfiles)
+
+# Contadores y duración de todas las requests (el último middleware agregado es el más externo)
+app.add_middleware(MetricasHTTP)
+
+# Tablas de todos los períodos fiscales de data/ (se recargan solas, ver recargar_tablas_periodicamente)
+registro_tablas = RegistroTablas()
+cache_calculo = CacheCalculo(registro_tablas)
+simulador_anual = SimuladorAnual(registro_tablas)
 parser_f572 = F572Parser()
+pool_f572 = PoolParserF572()
+cache_f572 = CacheF572()
+# Liquidaciones mensuales por empleado en SQLite (la base se abre con la primera consulta)
+libro_retenciones = LibroRetenciones(registro_tablas)
+
+# Etapas de /upload-f572 en el proceso principal (el parseo se detalla en parse_pdf y pool_f572)
+ETAPAS_UPLOAD_F572 = EtapasOperacion("upload_f572", ("lectura", "parseo", "topes"))
+
+METRICAS.medidor_calculado(
+    "ganancias_cache_tasa_hits", "Fracción de consultas resueltas por cada cache",
+    lambda: {("calculos",): cache_calculo.estadisticas()["tasa_hits"], ("f572",): cache_f572.estadisticas()["tasa_hits"]},
+    ("cache",)
+)
+METRICAS.medidor_calculado(
+    "ganancias_cache_entradas", "Resultados guardados en cada cache",
+    lambda: {("calculos",): cache_calculo.estadisticas()["entradas"], ("f572",): cache_f572.estadisticas()["entradas"]},
+    ("cache",)
+)
+METRICAS.medidor_calculado(
+    "ganancias_f572_pool_pendientes", "PDFs en proceso o en cola en el pool de F.572",
+    lambda: pool_f572.pendientes
+)
+
+
+# Arranque rápido (INICIO_RAPIDO=1, para hosts que duermen el servicio como el plan gratuito
+# de Render): el servidor empieza a responder sin esperar a que el pool de F.572 importe
+# pdfplumber en sus workers. Ver perfil_arranque.py para medir el arranque
+INICIO_RAPIDO = os.environ.get("INICIO_RAPIDO") == "1"
+
+# Cada cuántos segundos buscar tablas nuevas o modificadas en data/ (0: nunca)
+INTERVALO_RECARGA_TABLAS = float(os.environ.get("TABLAS_INTERVALO_RECARGA", 30))
+tarea_recarga_tablas: Optional[asyncio.Task] = None
+# Medición de la demora del event loop (ganancias_event_loop_lag_segundos en /metrics)
+tarea_lag_event_loop: Optional[asyncio.Task] = None
+
+
+async def recargar_tablas_periodicamente():
+    while True:
+        await asyncio.sleep(INTERVALO_RECARGA_TABLAS)
+        # Leer y compilar los JSON fuera del event loop; el reemplazo del índice es atómico
+        cambios = await asyncio.to_thread(registro_tablas.recargar)
+        if any(cambios.values()):
+            print(f"Tablas recargadas: {cambios}")
+
+
+@app.on_event("startup")
+async def iniciar_pool_f572():
+    # Levantar los workers al inicio para que el primer PDF no pague el import de pdfplumber.
+    # En arranque rápido no se espera a los workers: el pool se crea con el primer PDF
+    if not INICIO_RAPIDO:
+        pool_f572.iniciar()
+
+
+@app.on_event("startup")
+async def iniciar_recarga_tablas():
+    global tarea_recarga_tablas
+    if INTERVALO_RECARGA_TABLAS > 0:
+        tarea_recarga_tablas = asyncio.create_task(recargar_tablas_periodicamente())
+
+
+@app.on_event("startup")
+async def iniciar_lag_event_loop():
+    global tarea_lag_event_loop
+    if INTERVALO_LAG > 0:
+        tarea_lag_event_loop = asyncio.create_task(medir_lag_event_loop())
+
+
+@app.on_event("shutdown")
+async def detener_pool_f572():
+    cola_trabajos_f572.detener()
+    pool_f572.detener()
+
+
+@app.on_event("shutdown")
+async def detener_recarga_tablas():
+    if tarea_recarga_tablas is not None:
+        tarea_recarga_tablas.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await tarea_recarga_tablas
+
+
+@app.on_event("shutdown")
+async def detener_lag_event_loop():
+    if tarea_lag_event_loop is not None:
+        tarea_lag_event_loop.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await tarea_lag_event_loop
+
+
+@app.exception_handler(LiquidacionFueraDeOrdenError)
+async def liquidacion_fuera_de_orden(request: Request, exc: LiquidacionFueraDeOrdenError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+@app.exception_handler(PeriodoDesconocidoError)
+async def periodo_desconocido(request: Request, exc: PeriodoDesconocidoError):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
 
 
 class DeduccionOpcional(BaseModel):
@@ -33,6 +161,68 @@ class CalculoRequest(BaseModel):
     cantidad_hijos: int
     otras_cargas: Optional[int] = 0  # Otras personas a cargo (padres, hermanos, etc.)
     deducciones_opcionales: Optional[List[DeduccionOpcional]] = []
+    periodo: Optional[str] = None  # "2026", "2026-07" o un mes "2026-09"; sin período: el vigente hoy
+    detalle: Optional[str] = "completo"  # "completo", "resumen" (solo totales) o "none" (solo la retención)
+
+
+class CalculoLoteRequest(BaseModel):
+    empleados: List[CalculoRequest]
+    periodo: Optional[str] = None  # Período de todo el lote (se ignora el de cada empleado)
+
+
+# Máximo de empleados por lote
+MAX_FILAS_LOTE = int(os.environ.get("CALCULO_LOTE_MAX_FILAS", 100_000))
+
+
+class CalculoInversoRequest(BaseModel):
+    objetivo: Optional[str] = "sueldo_neto_final"  # "sueldo_neto_final" o "impuesto_mensual"
+    valores: List[float]  # Montos buscados: uno o una grilla entera
+    estado_civil: str
+    cantidad_hijos: int
+    otras_cargas: Optional[int] = 0
+    deducciones_opcionales: Optional[List[DeduccionOpcional]] = []
+    periodo: Optional[str] = None
+
+
+# Máximo de valores por llamada a /calcular-inverso
+MAX_VALORES_INVERSO = int(os.environ.get("CALCULO_INVERSO_MAX_VALORES", 100_000))
+
+
+class CurvaRequest(BaseModel):
+    estado_civil: str
+    cantidad_hijos: int
+    otras_cargas: Optional[int] = 0
+    deducciones_opcionales: Optional[List[DeduccionOpcional]] = []
+    periodo: Optional[str] = None
+    # Rango de sueldos brutos (desde, hasta y paso) o lista explícita en `sueldos`
+    desde: Optional[float] = None
+    hasta: Optional[float] = None
+    paso: Optional[float] = None
+    sueldos: Optional[List[float]] = None
+
+
+# Máximo de puntos por curva
+MAX_PUNTOS_CURVA = int(os.environ.get("CURVA_MAX_PUNTOS", 100_000))
+
+
+class EmpleadoSimulacion(BaseModel):
+    sueldos: List[float]  # Sueldo bruto de enero a diciembre (12 valores)
+    estado_civil: str
+    cantidad_hijos: int
+    otras_cargas: Optional[int] = 0
+    sac: Optional[List[float]] = None  # 12 valores; sin SAC se calcula (junio y diciembre)
+    deducciones_opcionales: Optional[List[float]] = None  # Monto deducible de cada mes (12 valores)
+    # Monto pagado de cada mes por concepto (12 valores); se aplican porcentaje deducible y topes
+    deducciones_por_tipo: Optional[Dict[str, List[float]]] = None
+
+
+class SimulacionAnualRequest(BaseModel):
+    anio: int
+    empleados: List[EmpleadoSimulacion]
+
+
+# Máximo de empleados por simulación anual
+MAX_EMPLEADOS_SIMULACION = int(os.environ.get("SIMULACION_MAX_EMPLEADOS", 100_000))
 
 
 class DatosAcumulados(BaseModel):
@@ -42,9 +232,31 @@ class DatosAcumulados(BaseModel):
 
 
 class CalculoAnualRequest(BaseModel):
-    mes_actual: CalculoRequest
+    mes_actual: CalculoRequest  # Su `detalle` se ignora: se usa el de la request
     datos_acumulados: Optional[DatosAcumulados] = None
     mes_actual_numero: int  # 1-12, para calcular meses restantes
+    detalle: Optional[str] = "completo"  # "completo", "resumen" o "none"
+
+
+class LiquidacionRequest(BaseModel):
+    empleado: str  # Legajo, CUIL o cualquier identificador único del empleado
+    anio: int
+    mes: int  # 1-12; los meses de un empleado se cargan en orden
+    sueldo_bruto: float
+    sac: Optional[float] = 0
+    estado_civil: str
+    cantidad_hijos: int
+    otras_cargas: Optional[int] = 0
+    deducciones_opcionales: Optional[float] = 0  # Monto deducible del mes (como en /simular-anio)
+
+
+class ImportarLiquidacionesRequest(BaseModel):
+    liquidaciones: List[LiquidacionRequest]
+
+
+def validar_detalle(detalle: str):
+    if detalle not in DETALLES:
+        raise HTTPException(status_code=422, detail="detalle debe ser 'none', 'resumen' o 'completo'")
 
 
 @app.get("/")
@@ -52,114 +264,449 @@ async def root():
     return {
         "mensaje": "API Calculadora de Ganancias Argentina",
         "version": "1.0",
-        "endpoints": ["/calcular", "/deducciones", "/escalas"]
+        "endpoints": ["/calcular", "/calcular-lote", "/calcular-inverso", "/curva", "/simular-anio", "/deducciones", "/escalas", "/periodos", "/estadisticas-cache"]
     }
 
 
 @app.post("/calcular")
 async def calcular_ganancias(request: CalculoRequest):
-    resultado = calculadora.calcular(
+    validar_detalle(request.detalle)
+    # JSON ya serializado (y cacheado junto con el resultado): no pasa por jsonable_encoder
+    cuerpo = cache_calculo.calcular(
         sueldo_bruto=request.sueldo_bruto,
         estado_civil=request.estado_civil,
         cantidad_hijos=request.cantidad_hijos,
         deducciones_opcionales=request.deducciones_opcionales,
-        otras_cargas=request.otras_cargas
+        otras_cargas=request.otras_cargas,
+        periodo=request.periodo,
+        detalle=request.detalle,
+        serializado=True
     )
-    return resultado
+    return Response(content=cuerpo, media_type="application/json")
+
+
+@app.post("/calcular-lote")
+async def calcular_lote(request: CalculoLoteRequest):
+    """
+    Calcula el impuesto de N empleados en una sola llamada.
+    Cada fila devuelve los mismos montos que /calcular para ese empleado.
+    """
+    empleados = request.empleados
+    if len(empleados) > MAX_FILAS_LOTE:
+        raise HTTPException(status_code=422, detail=f"El lote no puede tener más de {MAX_FILAS_LOTE} empleados")
+    columnas = registro_tablas.calculadora(request.periodo).calcular_lote(
+        sueldos_brutos=[e.sueldo_bruto for e in empleados],
+        estados_civiles=[e.estado_civil for e in empleados],
+        cantidad_hijos=[e.cantidad_hijos for e in empleados],
+        otras_cargas=[e.otras_cargas or 0 for e in empleados],
+        deducciones_opcionales=[e.deducciones_opcionales for e in empleados]
+    )
+
+    campos = list(columnas.keys())
+    valores = zip(*(columnas[campo].tolist() for campo in campos))
+    return {
+        "cantidad": len(empleados),
+        "resultados": [dict(zip(campos, fila)) for fila in valores]
+    }
+
+
+@app.post("/calcular-inverso")
+async def calcular_inverso(request: CalculoInversoRequest):
+    """
+    Sueldo bruto necesario para llegar a cada sueldo neto final (o retención
+    mensual) de `valores`. Cada resultado trae el neto e impuesto que da ese
+    bruto con /calcular y la diferencia con el objetivo (a lo sumo un centavo).
+    """
+    if request.objetivo not in ("sueldo_neto_final", "impuesto_mensual"):
+        raise HTTPException(status_code=422, detail="objetivo debe ser 'sueldo_neto_final' o 'impuesto_mensual'")
+
+    n = len(request.valores)
+    if n > MAX_VALORES_INVERSO:
+        raise HTTPException(status_code=422, detail=f"No se pueden pedir más de {MAX_VALORES_INVERSO} valores")
+    columnas = registro_tablas.calculadora(request.periodo).calcular_inverso_lote(
+        objetivos=request.valores,
+        estados_civiles=[request.estado_civil] * n,
+        cantidad_hijos=[request.cantidad_hijos] * n,
+        otras_cargas=[request.otras_cargas or 0] * n,
+        deducciones_opcionales=[request.deducciones_opcionales] * n,
+        objetivo=request.objetivo
+    )
+
+    campos = list(columnas.keys())
+    valores = zip(*(columnas[campo].tolist() for campo in campos))
+    return {
+        "objetivo": request.objetivo,
+        "cantidad": n,
+        "resultados": [dict(zip(campos, fila)) for fila in valores]
+    }
+
+
+@app.post("/curva")
+async def curva(request: CurvaRequest):
+    """
+    Evalúa /calcular en muchos sueldos brutos para un mismo perfil y devuelve
+    columnas (un array por campo), listas para graficar.
+    """
+    if request.sueldos is not None:
+        sueldos = np.asarray(request.sueldos, dtype=np.float64)
+    elif request.desde is not None and request.hasta is not None and request.paso:
+        if request.paso <= 0 or request.hasta < request.desde:
+            raise HTTPException(status_code=422, detail="El rango debe tener desde <= hasta y paso > 0")
+        cantidad = int((request.hasta - request.desde) / request.paso) + 1
+        if cantidad > MAX_PUNTOS_CURVA:
+            raise HTTPException(status_code=422, detail=f"La curva no puede tener más de {MAX_PUNTOS_CURVA} puntos")
+        sueldos = np.round(request.desde + np.arange(cantidad) * request.paso, 2)
+    else:
+        raise HTTPException(status_code=422, detail="Indicar `sueldos` o `desde`, `hasta` y `paso`")
+    if len(sueldos) > MAX_PUNTOS_CURVA:
+        raise HTTPException(status_code=422, detail=f"La curva no puede tener más de {MAX_PUNTOS_CURVA} puntos")
+
+    columnas = registro_tablas.calculadora(request.periodo).calcular_curva(
+        sueldos_brutos=sueldos,
+        estado_civil=request.estado_civil,
+        cantidad_hijos=request.cantidad_hijos,
+        otras_cargas=request.otras_cargas or 0,
+        deducciones_opcionales=request.deducciones_opcionales
+    )
+    # Solo listas de floats: se serializa directo, sin pasar por jsonable_encoder
+    return JSONResponse({
+        "cantidad": len(sueldos),
+        "columnas": {campo: valores.tolist() for campo, valores in columnas.items()}
+    })
+
+
+@app.post("/simular-anio")
+async def simular_anio(request: SimulacionAnualRequest):
+    """
+    Simula mes a mes la retención de todo el año para N empleados: ganancia neta
+    acumulada, escala prorrateada y retención de cada mes (ver simulacion.py).
+    """
+    empleados = request.empleados
+    if len(empleados) > MAX_EMPLEADOS_SIMULACION:
+        raise HTTPException(status_code=422, detail=f"No se pueden simular más de {MAX_EMPLEADOS_SIMULACION} empleados")
+    if any(len(e.sueldos) != 12 for e in empleados):
+        raise HTTPException(status_code=422, detail="Cada empleado debe tener 12 sueldos (enero a diciembre)")
+
+    sueldos = np.array([e.sueldos for e in empleados], dtype=np.float64).reshape(len(empleados), 12)
+    sac = calcular_sac(sueldos)
+    opcionales = np.zeros_like(sueldos)
+    por_tipo = {}
+    try:
+        for fila, empleado in enumerate(empleados):
+            if empleado.sac is not None:
+                sac[fila] = empleado.sac
+            if empleado.deducciones_opcionales is not None:
+                opcionales[fila] = empleado.deducciones_opcionales
+            for tipo, montos in (empleado.deducciones_por_tipo or {}).items():
+                por_tipo.setdefault(tipo, np.zeros_like(sueldos))[fila] = montos
+    except ValueError:
+        raise HTTPException(status_code=422, detail="sac, deducciones_opcionales y deducciones_por_tipo deben tener 12 valores")
+
+    columnas = simulador_anual.simular(
+        anio=request.anio,
+        sueldos=sueldos,
+        estados_civiles=[e.estado_civil for e in empleados],
+        cantidad_hijos=[e.cantidad_hijos for e in empleados],
+        otras_cargas=[e.otras_cargas or 0 for e in empleados],
+        sac=sac,
+        deducciones_opcionales=opcionales,
+        deducciones_por_tipo=por_tipo
+    )
+
+    campos = list(columnas.keys())
+    valores = zip(*(columnas[campo].tolist() for campo in campos))
+    return {
+        "anio": request.anio,
+        "cantidad": len(empleados),
+        "resultados": [dict(zip(campos, fila)) for fila in valores]
+    }
+
+
+# Las tablas solo cambian al recargar data/: el navegador guarda la respuesta y la
+# revalida en cada carga con If-None-Match, que se responde 304 sin serializar nada
+CACHE_CONTROL_TABLAS = "public, no-cache"
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    etiquetas = [etiqueta.strip() for etiqueta in if_none_match.split(",")]
+    # Para If-None-Match la comparación es débil: "W/" no cambia el resultado
+    return "*" in etiquetas or any(etiqueta.replace("W/", "", 1) == etag for etiqueta in etiquetas)
+
+
+def respuesta_tabla(request: Request, cuerpo: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL_TABLAS}
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
 
 
 @app.get("/deducciones")
-async def obtener_deducciones():
-    return calculadora.obtener_deducciones()
+async def obtener_deducciones(request: Request, periodo: Optional[str] = None):
+    # JSON serializado al cargar las tablas; el ETag cambia con la versión de las tablas
+    tablas = registro_tablas.tablas(periodo)
+    return respuesta_tabla(request, tablas.json_deducciones, f'"deducciones-{tablas.calculadora.version_tablas}"')
 
 
 @app.get("/escalas")
-async def obtener_escalas():
-    return calculadora.obtener_escalas()
+async def obtener_escalas(request: Request, periodo: Optional[str] = None):
+    tablas = registro_tablas.tablas(periodo)
+    return respuesta_tabla(request, tablas.json_escalas, f'"escalas-{tablas.calculadora.version_tablas}"')
+
+
+@app.get("/periodos")
+async def obtener_periodos():
+    """Períodos fiscales con tablas cargadas y resultado de la última recarga."""
+    return {
+        "periodos": registro_tablas.periodos(),
+        "vigente": registro_tablas.id_vigente(),
+        "ultima_recarga": registro_tablas.ultima_recarga
+    }
+
+
+def _liquidacion(request: LiquidacionRequest) -> dict:
+    return {**request.dict(), "sac": request.sac or 0, "otras_cargas": request.otras_cargas or 0,
+            "deducciones_opcionales": request.deducciones_opcionales or 0}
+
+
+@app.post("/libro/liquidaciones")
+async def registrar_liquidacion(request: LiquidacionRequest):
+    """
+    Carga la liquidación de un mes de un empleado y devuelve la retención del mes
+    con los acumulados del año (ver libro_retenciones.py). 409 si el mes ya está
+    cargado o hay uno posterior.
+    """
+    try:
+        # SQLite bloquea (y con escrituras concurrentes puede esperar su turno): fuera del event loop
+        return await asyncio.to_thread(libro_retenciones.registrar, **_liquidacion(request))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/libro/importar")
+async def importar_liquidaciones(request: ImportarLiquidacionesRequest):
+    """Carga muchas liquidaciones en una sola transacción: se guardan todas o ninguna."""
+    try:
+        liquidaciones = await asyncio.to_thread(
+            libro_retenciones.importar, [_liquidacion(liquidacion) for liquidacion in request.liquidaciones]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"cantidad": len(liquidaciones), "liquidaciones": liquidaciones}
+
+
+@app.get("/libro/exportar")
+async def exportar_liquidaciones(anio: int, mes: Optional[int] = None, empleado: Optional[str] = None):
+    """Liquidaciones guardadas del año, opcionalmente de un mes o de un empleado."""
+    liquidaciones = await asyncio.to_thread(libro_retenciones.exportar, anio, mes, empleado)
+    return {"cantidad": len(liquidaciones), "liquidaciones": liquidaciones}
+
+
+@app.get("/libro/empleados/{empleado}")
+async def liquidaciones_empleado(empleado: str, anio: int):
+    """Acumulados del año del empleado y sus liquidaciones mes a mes."""
+    resultado = await asyncio.to_thread(libro_retenciones.empleado, empleado, anio)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail=f"No hay liquidaciones de {empleado} en {anio}")
+    return resultado
+
+
+@app.get("/estadisticas-cache")
+async def estadisticas_cache():
+    """Aciertos y latencia ahorrada de los caches de cálculos y de F.572."""
+    return {
+        "calculos": cache_calculo.estadisticas(),
+        "f572": cache_f572.estadisticas()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas de rendimiento en formato de texto de Prometheus."""
+    return PlainTextResponse(METRICAS.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/admin/perfiles")
+async def listar_perfiles():
+    """Requests perfiladas guardadas (las más nuevas primero)."""
+    if not perfiles.habilitado:
+        raise HTTPException(status_code=404, detail="El perfilado no está habilitado (PERFILADO_HABILITADO=1)")
+    return {"max_perfiles": perfiles.max_perfiles, "perfiles": perfiles.listar()}
+
+
+@app.get("/admin/perfiles/{id_perfil}")
+async def obtener_perfil(id_perfil: int):
+    """Perfil completo: funciones más costosas y tiempo por componente, del proceso principal y de los workers."""
+    if not perfiles.habilitado:
+        raise HTTPException(status_code=404, detail="El perfilado no está habilitado (PERFILADO_HABILITADO=1)")
+    perfil = perfiles.obtener(id_perfil)
+    if perfil is None:
+        raise HTTPException(status_code=404, detail=f"No hay un perfil con id {id_perfil} (el buffer guarda los últimos {perfiles.max_perfiles})")
+    return perfil
 
 
 @app.post("/calcular-anual")
 async def calcular_anual(request: CalculoAnualRequest):
+    validar_detalle(request.detalle)
     datos_acumulados_dict = request.datos_acumulados.dict() if request.datos_acumulados else None
-    resultado = calculadora.calcular_anual_con_acumulados(
+    cuerpo = cache_calculo.calcular_anual_con_acumulados(
         mes_actual=request.mes_actual.dict(),
         datos_acumulados=datos_acumulados_dict,
-        mes_actual_numero=request.mes_actual_numero
+        mes_actual_numero=request.mes_actual_numero,
+        periodo=request.mes_actual.periodo,
+        detalle=request.detalle,
+        serializado=True
     )
-    return resultado
+    return Response(content=cuerpo, media_type="application/json")
+
+
+async def procesar_f572(archivo, tamanio: int) -> dict:
+    """
+    Parsea el F.572 (o lo toma del cache) y aplica los topes. Lo usan /upload-f572
+    y los trabajos en segundo plano de `cola_trabajos_f572`.
+    """
+    cronometro = ETAPAS_UPLOAD_F572.iniciar()
+
+    # Si este mismo PDF ya se parseó (con esta versión del parser), no extraerlo de nuevo
+    clave_cache = cache_f572.clave_de_archivo(archivo)
+    resultado_parser = cache_f572.obtener(clave_cache)
+    cache_hit = resultado_parser is not None
+    cronometro.etapa("lectura")
+
+    if not cache_hit:
+        # Parsear el PDF en el pool de procesos (no bloquea el event loop)
+        resultado_parser = await pool_f572.parsear(archivo, tamanio)
+        cache_f572.guardar(clave_cache, resultado_parser)
+    cronometro.etapa("parseo")
+
+    # Debug: Imprimir lo que se extrajo
+    print(f"DEBUG - Meses anteriores extraídos: {resultado_parser['meses_anteriores']}")
+    print(f"DEBUG - Deducciones detalle extraídas: {resultado_parser['deducciones_detalle']}")
+
+    # Aplicar topes a las deducciones
+    deducciones_con_topes = parser_f572.aplicar_topes(
+        resultado_parser["deducciones_detalle"],
+        registro_tablas.calculadora()
+    )
+    cronometro.etapa("topes")
+
+    # Identificar qué deducciones fueron limitadas por topes
+    topes_aplicados = []
+    for tipo, monto_original in resultado_parser["deducciones_detalle"].items():
+        monto_con_tope = deducciones_con_topes.get(tipo, 0)
+        if monto_con_tope < monto_original:
+            topes_aplicados.append({
+                "tipo": tipo,
+                "monto_original": monto_original,
+                "monto_con_tope": monto_con_tope,
+                "diferencia": monto_original - monto_con_tope
+            })
+
+    cronometro.terminar()
+    return {
+        "success": True,
+        "meses_anteriores": resultado_parser["meses_anteriores"],
+        "deducciones_detalle": resultado_parser["deducciones_detalle"],
+        "deducciones_con_topes": deducciones_con_topes,
+        "topes_aplicados": topes_aplicados,
+        "cache_hit": cache_hit
+    }
+
+
+def error_f572(e: Exception) -> HTTPException:
+    """Respuesta HTTP para un error al procesar un F.572 (en la request o en un trabajo)."""
+    if isinstance(e, PoolSaturadoError):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    if isinstance(e, TimeoutParseoError):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, DocumentoF572DemasiadoGrandeError):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=500, detail=f"Error al procesar el PDF: {str(e)}")
+
+
+# Parseo en segundo plano para /upload-f572?asincronico=true (ver trabajos_f572.py)
+cola_trabajos_f572 = ColaTrabajosF572(procesar_f572)
+
+METRICAS.medidor_calculado(
+    "ganancias_f572_trabajos", "Trabajos de F.572 en segundo plano por estado",
+    lambda: {(estado,): valor for estado, valor in cola_trabajos_f572.estadisticas().items()
+             if estado in ("en_cola", "procesando", "terminados")},
+    ("estado",)
+)
 
 
 @app.post("/upload-f572")
-async def upload_f572(file: UploadFile = File(...)):
+async def upload_f572(file: UploadFile = File(...), asincronico: bool = False):
     """
     Sube y parsea un archivo PDF del formulario F.572.
     Extrae deducciones opcionales aplicadas en meses anteriores.
     Aplica topes automáticamente si las deducciones exceden los límites.
 
+    Con `asincronico=true` responde enseguida `202` con el id de un trabajo
+    (consultar en `/jobs/{id}`), o `429` con `Retry-After` si la cola está llena.
+
     Returns:
         {
             "meses_anteriores": [...],
             "deducciones_detalle": {...},
             "deducciones_con_topes": {...},
-            "topes_aplicados": [...]
+            "topes_aplicados": [...],
+            "cache_hit": true/false  # El mismo PDF ya se había parseado
         }
     """
     # Validar que sea un PDF
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="El archivo debe ser un PDF")
 
-    # Guardar archivo temporalmente
-    temp_file = None
     try:
-        # Crear archivo temporal
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        # Parsear el PDF
-        resultado_parser = parser_f572.parse_pdf(temp_file_path)
-
-        # Debug: Imprimir lo que se extrajo
-        print(f"DEBUG - Meses anteriores extraídos: {resultado_parser['meses_anteriores']}")
-        print(f"DEBUG - Deducciones detalle extraídas: {resultado_parser['deducciones_detalle']}")
-
-        # Aplicar topes a las deducciones
-        deducciones_con_topes = parser_f572.aplicar_topes(
-            resultado_parser["deducciones_detalle"],
-            calculadora
-        )
-
-        # Identificar qué deducciones fueron limitadas por topes
-        topes_aplicados = []
-        for tipo, monto_original in resultado_parser["deducciones_detalle"].items():
-            monto_con_tope = deducciones_con_topes.get(tipo, 0)
-            if monto_con_tope < monto_original:
-                topes_aplicados.append({
-                    "tipo": tipo,
-                    "monto_original": monto_original,
-                    "monto_con_tope": monto_con_tope,
-                    "diferencia": monto_original - monto_con_tope
-                })
-
-        return {
-            "success": True,
-            "meses_anteriores": resultado_parser["meses_anteriores"],
-            "deducciones_detalle": resultado_parser["deducciones_detalle"],
-            "deducciones_con_topes": deducciones_con_topes,
-            "topes_aplicados": topes_aplicados
-        }
+        # Starlette ya tiene el PDF en su buffer (SpooledTemporaryFile): se trabaja
+        # sobre ese buffer sin leerlo entero a memoria ni escribir temporales
+        archivo = file.file
+        archivo.seek(0, os.SEEK_END)
+        tamanio = archivo.tell()
+
+        if asincronico:
+            # El buffer del upload se cierra al terminar la request: el trabajo lleva su copia
+            archivo.seek(0)
+            trabajo = cola_trabajos_f572.encolar(io.BytesIO(archivo.read()), tamanio)
+            return JSONResponse(
+                status_code=202,
+                content={"id": trabajo.id, "estado": trabajo.estado, "url": f"/jobs/{trabajo.id}"},
+                headers={"Location": f"/jobs/{trabajo.id}"}
+            )
+
+        return await procesar_f572(archivo, tamanio)
+
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.reintentar_en)})
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al procesar el PDF: {str(e)}")
+        raise error_f572(e)
 
     finally:
-        # Eliminar archivo temporal
-        if temp_file and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+        await file.close()
+
+
+@app.get("/jobs/{id_trabajo}")
+async def estado_trabajo(id_trabajo: str):
+    """
+    Estado de un trabajo de /upload-f572?asincronico=true: `en_cola`, `procesando`,
+    `completado` (con `resultado`, igual a la respuesta de /upload-f572) o `error`.
+    Los trabajos terminados se guardan `F572_TRABAJOS_TTL` segundos.
+    """
+    trabajo = cola_trabajos_f572.obtener(id_trabajo)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"No hay un trabajo con id {id_trabajo} (o ya expiró)")
+    respuesta = {"id": trabajo.id, "estado": trabajo.estado}
+    if trabajo.estado == EN_COLA:
+        respuesta["posicion"] = cola_trabajos_f572.posicion(trabajo)
+    elif trabajo.estado == COMPLETADO:
+        respuesta["resultado"] = trabajo.resultado
+    elif trabajo.estado == ERROR:
+        error = error_f572(trabajo.error)
+        respuesta["error"] = {"status_code": error.status_code, "detail": error.detail}
+    return respuesta
 
 
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+"""
+Métricas de rendimiento en el formato de texto de Prometheus (GET /metrics).
+
+Contadores, medidores e histogramas propios, sin depender de prometheus_client.
+Están pensados para quedar siempre activos: registrar una observación es un
+bisect sobre los límites del histograma y dos sumas. No usan locks porque todo
+lo que se mide corre en el event loop; lo que se mide en los workers del pool
+de F.572 vuelve al proceso principal junto con el resultado y se registra acá.
+
+Las etapas de las operaciones de pocos microsegundos (calcular y las
+proyecciones anuales) se miden en una de cada METRICAS_MUESTREO_ETAPAS
+llamadas: medir todas le agrega a `calcular` cerca de un 10%. En esas
+operaciones el `_count` del histograma es la cantidad de llamadas medidas, no
+la total (las requests se cuentan aparte, en ganancias_http_requests_total).
+
+Configuración por variables de entorno:
+    METRICAS_MUESTREO_ETAPAS   medir 1 de cada N llamadas de calcular y las
+                               proyecciones anuales (default: 10; 1 = todas)
+    METRICAS_INTERVALO_LAG     cada cuántos segundos medir la demora del event
+                               loop (default: 0.1; 0 = no medir)
+
+Métricas principales:
+    ganancias_etapa_duracion_segundos{operacion, etapa}   histograma por etapa de
+        calcular, las proyecciones anuales, parse_pdf y /upload-f572
+    ganancias_http_requests_total{ruta, metodo, estado}
+    ganancias_http_requests_en_curso{ruta}
+    ganancias_http_request_duracion_segundos{ruta}
+    ganancias_event_loop_lag_segundos   cuánto tarda el event loop en retomar una
+        tarea que debía despertar: crece cuando algo bloquea el loop o hay
+        más trabajo del que el proceso llega a atender
+    más los medidores que registra main.py (tasas de hits de los caches, pool de F.572)
+"""
+import asyncio
+import os
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Límites de los buckets, en segundos: de 10 µs (una etapa de `calcular`) a 10 s (un PDF largo)
+LIMITES_SEGUNDOS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+MUESTREO_ETAPAS = max(1, int(os.environ.get("METRICAS_MUESTREO_ETAPAS", 10)))
+INTERVALO_LAG = float(os.environ.get("METRICAS_INTERVALO_LAG", 0.1))
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+
+    def exportar(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"] + self._muestras()
+
+    def _muestras(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.valores: Dict[Tuple, float] = {}
+
+    def incrementar(self, *valores_etiquetas: str, cantidad: float = 1):
+        self.valores[valores_etiquetas] = self.valores.get(valores_etiquetas, 0) + cantidad
+
+    def _muestras(self) -> List[str]:
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+                for clave, valor in self.valores.items()]
+
+
+class Medidor(Contador):
+    """Valor que sube y baja (por ejemplo, requests en curso)."""
+    tipo = "gauge"
+
+
+class MedidorCalculado(_Metrica):
+    """
+    Medidor que se lee recién al exportar. `funcion` devuelve un número, o un
+    dict {tupla de valores de etiquetas: número} si el medidor tiene etiquetas.
+    """
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def _muestras(self) -> List[str]:
+        valores = self.funcion()
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+                for clave, valor in valores.items()]
+
+
+class SerieHistograma:
+    """Los buckets de un histograma para una combinación de etiquetas."""
+
+    __slots__ = ("limites", "cuentas", "suma")
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        # cuentas[i]: observaciones en (limites[i-1], limites[i]]; la última, por encima del mayor límite
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+
+    def observar(self, valor: float):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 limites: Tuple[float, ...] = LIMITES_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+        self.series: Dict[Tuple, SerieHistograma] = {}
+
+    def serie(self, *valores_etiquetas: str) -> SerieHistograma:
+        """Serie de estas etiquetas (se puede guardar para no buscarla en cada observación)."""
+        serie = self.series.get(valores_etiquetas)
+        if serie is None:
+            serie = self.series[valores_etiquetas] = SerieHistograma(self.limites)
+        return serie
+
+    def observar(self, valor: float, *valores_etiquetas: str):
+        self.serie(*valores_etiquetas).observar(valor)
+
+    def _muestras(self) -> List[str]:
+        lineas = []
+        for clave, serie in self.series.items():
+            acumulado = 0
+            for limite, cuenta in zip(self.limites + (float("inf"),), serie.cuentas):
+                acumulado += cuenta
+                etiquetas = _etiquetas(self.etiquetas, clave, f'le="{_numero(limite)}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(serie.suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+class Cronometro:
+    """
+    Mide las etapas consecutivas de una operación. Cada `etapa(nombre)` registra
+    el tiempo desde la etapa anterior (o desde el inicio); `terminar()` registra
+    el total de la operación como etapa "total". Con `descontar` se resta del
+    tramo lo que ya se midió por otro lado (por ejemplo, en un worker del pool).
+    """
+
+    __slots__ = ("series", "inicio", "anterior")
+
+    def __init__(self, series: Dict[str, SerieHistograma]):
+        self.series = series
+        self.inicio = self.anterior = perf_counter()
+
+    def etapa(self, nombre: str, descontar: float = 0.0):
+        # SerieHistograma.observar en línea: se llama varias veces por cálculo
+        ahora = perf_counter()
+        serie = self.series[nombre]
+        duracion = ahora - self.anterior - descontar
+        serie.cuentas[bisect_left(serie.limites, duracion)] += 1
+        serie.suma += duracion
+        self.anterior = ahora
+
+    def terminar(self):
+        self.series["total"].observar(perf_counter() - self.inicio)
+
+
+class _CronometroApagado:
+    """Lo que devuelve EtapasOperacion.iniciar en las llamadas que no se miden."""
+
+    __slots__ = ()
+
+    def etapa(self, nombre: str, descontar: float = 0.0):
+        pass
+
+    def terminar(self):
+        pass
+
+
+_CRONOMETRO_APAGADO = _CronometroApagado()
+
+
+class EtapasOperacion:
+    """
+    Series de DURACION_ETAPAS de una operación, creadas una sola vez al importar.
+    Con `muestreo=N` solo se mide una de cada N llamadas.
+    """
+
+    def __init__(self, operacion: str, etapas: Iterable[str], muestreo: int = 1):
+        self.operacion = operacion
+        self.series = {etapa: DURACION_ETAPAS.serie(operacion, etapa) for etapa in (*etapas, "total")}
+        self.muestreo = muestreo
+        self._llamadas = 0
+
+    def iniciar(self) -> Cronometro:
+        self._llamadas += 1
+        if self._llamadas % self.muestreo:
+            return _CRONOMETRO_APAGADO
+        return Cronometro(self.series)
+
+    def registrar(self, tiempos: Dict[str, float]):
+        """Registra duraciones ya medidas (por ejemplo, las que devuelve un worker del pool)."""
+        for etapa, segundos in tiempos.items():
+            self.series[etapa].observar(segundos)
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self.metricas: List[_Metrica] = []
+
+    def _agregar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._agregar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Medidor:
+        return self._agregar(Medidor(nombre, ayuda, etiquetas))
+
+    def medidor_calculado(self, nombre: str, ayuda: str, funcion: Callable,
+                          etiquetas: Sequence[str] = ()) -> MedidorCalculado:
+        return self._agregar(MedidorCalculado(nombre, ayuda, funcion, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   limites: Tuple[float, ...] = LIMITES_SEGUNDOS) -> Histograma:
+        return self._agregar(Histograma(nombre, ayuda, etiquetas, limites))
+
+    def exportar(self) -> str:
+        lineas = []
+        for metrica in self.metricas:
+            lineas.extend(metrica.exportar())
+        return "\n".join(lineas) + "\n"
+
+
+METRICAS = RegistroMetricas()
+
+DURACION_ETAPAS = METRICAS.histograma(
+    "ganancias_etapa_duracion_segundos",
+    "Duración de cada etapa de los cálculos y del parseo de F.572",
+    ("operacion", "etapa")
+)
+
+REQUESTS_HTTP = METRICAS.contador(
+    "ganancias_http_requests_total", "Requests HTTP atendidas", ("ruta", "metodo", "estado")
+)
+REQUESTS_EN_CURSO = METRICAS.medidor(
+    "ganancias_http_requests_en_curso", "Requests HTTP en curso", ("ruta",)
+)
+DURACION_REQUESTS = METRICAS.histograma(
+    "ganancias_http_request_duracion_segundos", "Duración de las requests HTTP", ("ruta",)
+)
+
+LAG_EVENT_LOOP = METRICAS.histograma(
+    "ganancias_event_loop_lag_segundos",
+    "Demora del event loop en retomar una tarea que debía despertar"
+)
+
+
+async def medir_lag_event_loop(intervalo: float = INTERVALO_LAG):
+    """Duerme `intervalo` segundos una y otra vez y registra cuánto de más tardó en despertar."""
+    serie = LAG_EVENT_LOOP.serie()
+    while True:
+        esperado = perf_counter() + intervalo
+        await asyncio.sleep(intervalo)
+        serie.observar(max(0.0, perf_counter() - esperado))
+
+
+class MetricasHTTP:
+    """
+    Middleware ASGI que cuenta requests por ruta, método y estado, y mide su
+    duración. La ruta es la plantilla del endpoint ("/calcular"), no el path
+    pedido, para que paths inexistentes no creen series nuevas: todos quedan
+    como "otra".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._rutas_conocidas: Dict[str, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ruta = self._ruta(scope)
+        estado = 500
+
+        async def send_registrado(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        en_curso = REQUESTS_EN_CURSO.valores
+        clave_ruta = (ruta,)
+        en_curso[clave_ruta] = en_curso.get(clave_ruta, 0) + 1
+        inicio = perf_counter()
+        try:
+            await self.app(scope, receive, send_registrado)
+        finally:
+            DURACION_REQUESTS.observar(perf_counter() - inicio, ruta)
+            en_curso[clave_ruta] -= 1
+            REQUESTS_HTTP.incrementar(ruta, scope["method"], str(estado))
+
+    def _ruta(self, scope) -> str:
+        path = scope["path"]
+        ruta = self._rutas_conocidas.get(path)
+        if ruta is not None:
+            return ruta
+        from starlette.routing import Match
+        for route in scope["app"].routes:
+            coincidencia, _ = route.matches(scope)
+            if coincidencia == Match.FULL:
+                # Solo se guardan los paths fijos que existen: la memoria queda acotada
+                if "{" not in route.path:
+                    self._rutas_conocidas[path] = route.path
+                return route.path
+        return "otra"
+
@@ -0,0 +1,145 @@
+"""
+Perfil de arranque del backend.
+
+En el plan gratuito de Render el servicio se duerme y cada request después de
+un rato paga el arranque en frío. Este script mide:
+
+    - cuánto tarda en importarse cada módulo al cargar main.py (`python -X importtime`),
+      agrupado por paquete y con los módulos más costosos
+    - el tiempo hasta la primera respuesta de POST /calcular: desde que se lanza
+      uvicorn hasta que la primera request responde 200
+
+Uso:
+    cd backend
+    python perfil_arranque.py                    # perfil con la configuración del entorno
+    python perfil_arranque.py --modulos 30       # más módulos en el detalle
+    INICIO_RAPIDO=1 python perfil_arranque.py    # con el modo de arranque rápido
+
+Cada medición arranca un proceso nuevo (sin nada importado de antes). La
+primera corrida después de instalar dependencias incluye compilar los .pyc.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DIRECTORIO_BACKEND = Path(__file__).resolve().parent
+
+REQUEST_CALCULAR = {"sueldo_bruto": 2_500_000, "estado_civil": "casado", "cantidad_hijos": 1}
+
+
+def importaciones(modulo: str = "main", entorno: Optional[Dict[str, str]] = None) -> List[Tuple[str, float, float]]:
+    """
+    Importa `modulo` en un proceso nuevo con -X importtime.
+
+    Returns:
+        (módulo, tiempo propio en s, tiempo acumulado en s) de cada módulo importado
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=DIRECTORIO_BACKEND, env=entorno, capture_output=True, text=True, check=True
+    )
+    filas = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        filas.append((nombre.strip(), int(propio) / 1e6, int(acumulado) / 1e6))
+    return filas
+
+
+def por_paquete(filas: List[Tuple[str, float, float]]) -> List[Tuple[str, float]]:
+    """Tiempo propio sumado por paquete de primer nivel, de mayor a menor."""
+    totales: Dict[str, float] = {}
+    for nombre, propio, _ in filas:
+        paquete = nombre.split(".")[0]
+        totales[paquete] = totales.get(paquete, 0.0) + propio
+    return sorted(totales.items(), key=lambda item: -item[1])
+
+
+def propios(filas: List[Tuple[str, float, float]]) -> float:
+    """Tiempo propio sumado de los módulos del backend (los .py de este directorio)."""
+    modulos = {ruta.stem for ruta in DIRECTORIO_BACKEND.glob("*.py")}
+    return sum(propio for nombre, propio, _ in filas if nombre in modulos)
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def primer_calculo(entorno: Optional[Dict[str, str]] = None, limite: float = 60.0) -> Dict[str, float]:
+    """
+    Lanza uvicorn con main:app y manda POST /calcular hasta que responde 200.
+
+    Returns:
+        segundos hasta la primera respuesta y duración de esa primera request
+    """
+    puerto = _puerto_libre()
+    cuerpo = json.dumps(REQUEST_CALCULAR)
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(puerto),
+         "--log-level", "warning"],
+        cwd=DIRECTORIO_BACKEND, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - inicio < limite:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {proceso.returncode}")
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=limite)
+            try:
+                conexion.connect()
+            except OSError:
+                time.sleep(0.005)
+                continue
+            inicio_request = time.perf_counter()
+            conexion.request("POST", "/calcular", body=cuerpo, headers={"Content-Type": "application/json"})
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            conexion.close()
+            if respuesta.status == 200:
+                fin = time.perf_counter()
+                return {"primer_calculo_s": fin - inicio, "primera_request_s": fin - inicio_request}
+        raise TimeoutError(f"/calcular no respondió en {limite} s")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main(argumentos: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de import por módulo y hasta el primer /calcular.")
+    parser.add_argument("--modulos", type=int, default=15, help="módulos más costosos a mostrar (default: 15)")
+    parser.add_argument("--corridas", type=int, default=3, help="arranques a medir, se informa el mejor (default: 3)")
+    opciones = parser.parse_args(argumentos)
+
+    filas = importaciones()
+    total = max(acumulado for _, _, acumulado in filas)
+    modo = "arranque rápido" if os.environ.get("INICIO_RAPIDO") == "1" else "arranque normal"
+    print(f"Import de main ({modo}): {total * 1000:.0f} ms, de los cuales {propios(filas) * 1000:.0f} ms "
+          f"son módulos del backend")
+    if any(nombre.split(".")[0] in ("pdfplumber", "pdfminer") for nombre, _, _ in filas):
+        print("  (pdfplumber se importa al arrancar)")
+    print("\nPor paquete (tiempo propio):")
+    for paquete, segundos in por_paquete(filas)[:opciones.modulos]:
+        print(f"  {paquete:32s} {segundos * 1000:7.1f} ms")
+    print("\nMódulos más costosos (propio / acumulado):")
+    for nombre, propio, acumulado in sorted(filas, key=lambda fila: -fila[1])[:opciones.modulos]:
+        print(f"  {nombre:48s} {propio * 1000:7.1f} ms {acumulado * 1000:8.1f} ms")
+
+    mediciones = [primer_calculo() for _ in range(opciones.corridas)]
+    mejor = min(mediciones, key=lambda medicion: medicion["primer_calculo_s"])
+    print(f"\nPrimer POST /calcular: {mejor['primer_calculo_s'] * 1000:.0f} ms desde que se lanza uvicorn "
+          f"(la request: {mejor['primera_request_s'] * 1000:.1f} ms; mejor de {opciones.corridas})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
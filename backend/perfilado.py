@@ -0,0 +1,169 @@
+"""
+Perfilado opcional de requests individuales.
+
+Cuando una request puntual es lenta (un PDF en particular, por ejemplo) se la
+puede volver a mandar perfilada: con el perfilado habilitado en el servidor,
+una request con el header `X-Perfilar: 1` (o `?perfilar=1`) se ejecuta bajo
+cProfile y el resumen queda en un buffer circular que se consulta en
+GET /admin/perfiles. La respuesta trae el id del perfil en `X-Perfil-Id`.
+
+El parseo de F.572 corre en el pool de procesos: en una request perfilada el
+worker también perfila su `parse_pdf` y devuelve su resumen, así se ve cuánto
+tiempo va a pdfplumber/pdfminer y cuánto a F572Parser.
+
+Mientras dura una request perfilada se perfila todo el event loop: si hay
+otras requests en curso, sus funciones también aparecen. Se perfila una
+request por vez; si llega otra mientras tanto, se atiende sin perfilar.
+
+Configuración por variables de entorno:
+    PERFILADO_HABILITADO   "1" para aceptar requests perfiladas (default: deshabilitado)
+    PERFILADO_MAX_PERFILES perfiles guardados en el buffer (default: 50)
+    PERFILADO_FUNCIONES    funciones más costosas guardadas por perfil (default: 30)
+"""
+import cProfile
+import os
+import pstats
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DIRECTORIO_BACKEND = str(Path(__file__).resolve().parent)
+
+# Perfil de la request en curso (lo usa el pool de F.572 para perfilar también el worker)
+PERFIL_EN_CURSO: ContextVar[Optional[Dict]] = ContextVar("perfil_en_curso", default=None)
+
+
+def _componente(archivo: str) -> str:
+    """Agrupa el código por origen, para comparar pdfplumber contra el parser propio."""
+    if "/pdfplumber/" in archivo or "/pdfminer/" in archivo:
+        return "pdfplumber"
+    if archivo.endswith("f572_parser.py"):
+        return "f572_parser"
+    if archivo.startswith(DIRECTORIO_BACKEND):
+        return "backend"
+    return "otros"
+
+
+def resumir(perfil: cProfile.Profile, funciones: Optional[int] = None) -> Dict:
+    """
+    Resumen de un perfil: tiempo propio por componente (pdfplumber, f572_parser,
+    backend, otros) y las funciones con más tiempo propio.
+    """
+    funciones = funciones or int(os.environ.get("PERFILADO_FUNCIONES", 30))
+    estadisticas = pstats.Stats(perfil).stats
+
+    por_componente: Dict[str, float] = {}
+    filas = []
+    for (archivo, linea, nombre), (_, llamadas, tiempo_propio, tiempo_acumulado, _) in estadisticas.items():
+        componente = _componente(archivo)
+        por_componente[componente] = por_componente.get(componente, 0.0) + tiempo_propio
+        filas.append({
+            "funcion": nombre,
+            "archivo": archivo,
+            "linea": linea,
+            "componente": componente,
+            "llamadas": llamadas,
+            "tiempo_propio_ms": round(tiempo_propio * 1000, 3),
+            "tiempo_acumulado_ms": round(tiempo_acumulado * 1000, 3)
+        })
+    filas.sort(key=lambda fila: fila["tiempo_propio_ms"], reverse=True)
+
+    return {
+        "tiempo_total_ms": round(sum(por_componente.values()) * 1000, 3),
+        "por_componente_ms": {
+            componente: round(segundos * 1000, 3)
+            for componente, segundos in sorted(por_componente.items(), key=lambda item: -item[1])
+        },
+        "funciones": filas[:funciones]
+    }
+
+
+class BufferPerfiles:
+    """
+    Últimos `max_perfiles` perfiles; al llenarse se descartan los más viejos.
+    `habilitado` indica si el servidor acepta requests perfiladas.
+    """
+
+    def __init__(self, max_perfiles: Optional[int] = None, habilitado: Optional[bool] = None):
+        self.habilitado = (os.environ.get("PERFILADO_HABILITADO") == "1") if habilitado is None else habilitado
+        self.max_perfiles = max_perfiles or int(os.environ.get("PERFILADO_MAX_PERFILES", 50))
+        self._perfiles: deque = deque(maxlen=self.max_perfiles)
+        self._ultimo_id = 0
+
+    def nuevo_id(self) -> int:
+        self._ultimo_id += 1
+        return self._ultimo_id
+
+    def agregar(self, perfil: Dict):
+        self._perfiles.append(perfil)
+
+    def listar(self) -> List[Dict]:
+        """Perfiles guardados, del más nuevo al más viejo, sin el detalle de funciones."""
+        return [
+            {clave: perfil[clave] for clave in ("id", "fecha", "metodo", "ruta", "estado", "duracion_ms")}
+            for perfil in reversed(self._perfiles)
+        ]
+
+    def obtener(self, id_perfil: int) -> Optional[Dict]:
+        for perfil in self._perfiles:
+            if perfil["id"] == id_perfil:
+                return perfil
+        return None
+
+
+class PerfiladoRequests:
+    """Middleware ASGI que perfila las requests que lo piden (si está habilitado)."""
+
+    def __init__(self, app, buffer: BufferPerfiles):
+        self.app = app
+        self.buffer = buffer
+        self._en_curso = False
+
+    @staticmethod
+    def _pedido(scope) -> bool:
+        for nombre, valor in scope["headers"]:
+            if nombre == b"x-perfilar":
+                return valor in (b"1", b"true")
+        return b"perfilar=1" in scope.get("query_string", b"").split(b"&")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.buffer.habilitado or self._en_curso or not self._pedido(scope):
+            await self.app(scope, receive, send)
+            return
+
+        id_perfil = self.buffer.nuevo_id()
+        registro = {
+            "id": id_perfil,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "metodo": scope["method"],
+            "ruta": scope["path"],
+            "estado": 500,
+            "workers": []
+        }
+
+        async def send_con_id(mensaje):
+            if mensaje["type"] == "http.response.start":
+                registro["estado"] = mensaje["status"]
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []),
+                                                  (b"x-perfil-id", str(id_perfil).encode())]}
+            await send(mensaje)
+
+        self._en_curso = True
+        token = PERFIL_EN_CURSO.set(registro)
+        perfil = cProfile.Profile()
+        inicio = time.perf_counter()
+        try:
+            perfil.enable()
+            try:
+                await self.app(scope, receive, send_con_id)
+            finally:
+                perfil.disable()
+        finally:
+            PERFIL_EN_CURSO.reset(token)
+            self._en_curso = False
+            registro["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+            registro["proceso_principal"] = resumir(perfil)
+            self.buffer.agregar(registro)
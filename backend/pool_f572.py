@@ -0,0 +1,235 @@
+"""
+Pool de procesos para parsear formularios F.572 fuera del event loop.
+
+La extracción de texto de pdfplumber es CPU intensiva: si se ejecuta dentro de
+un endpoint `async`, bloquea a uvicorn y todas las demás requests (/calcular,
+/deducciones, ...) quedan esperando. Acá el parseo corre en un
+ProcessPoolExecutor con cantidad acotada de trabajos pendientes y timeout por
+trabajo.
+
+Configuración por variables de entorno:
+    F572_WORKERS          procesos del pool (default: 2)
+    F572_MAX_PENDIENTES   trabajos en curso + en cola antes de rechazar (default: 8)
+    F572_TIMEOUT          segundos máximos por PDF (default: 30)
+"""
+import asyncio
+import cProfile
+import io
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import BinaryIO, Dict, Optional, Set, Tuple
+
+from f572_parser import ETAPAS_PARSE_PDF, F572Parser
+from metricas import EtapasOperacion
+from perfilado import PERFIL_EN_CURSO, resumir
+
+# copia_memoria: del buffer del upload a la memoria compartida;
+# espera: cola del pool y traspaso al worker (todo lo que no es parse_pdf)
+ETAPAS_POOL = EtapasOperacion("pool_f572", ("copia_memoria", "espera"))
+
+
+class PoolSaturadoError(Exception):
+    """Se alcanzó el máximo de trabajos pendientes en el pool."""
+
+
+class TimeoutParseoError(Exception):
+    """El parseo de un PDF superó el tiempo máximo permitido."""
+
+
+# Parser del proceso worker (se crea una vez por proceso en _inicializar_worker)
+_parser_worker: Optional[F572Parser] = None
+
+
+def _inicializar_worker(pids):
+    """
+    Se ejecuta al arrancar cada worker: informa su PID (para poder terminarlo si
+    un trabajo se cuelga) y deja pdfplumber importado y el parser creado.
+    """
+    global _parser_worker
+    pids.put(os.getpid())
+    import pdfplumber  # noqa: F401  (precarga pdfminer en el worker)
+    _parser_worker = F572Parser()
+
+
+def _calentar() -> int:
+    return os.getpid()
+
+
+class _LectorMemoria(io.RawIOBase):
+    """Archivo de solo lectura sobre un memoryview, sin copiar el contenido."""
+
+    def __init__(self, buffer: memoryview):
+        self._buffer = buffer
+        self._posicion = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._posicion, io.SEEK_END: len(self._buffer)}[whence]
+        self._posicion = max(0, base + offset)
+        return self._posicion
+
+    def readinto(self, destino) -> int:
+        leido = self._buffer[self._posicion:self._posicion + len(destino)]
+        cantidad = len(leido)
+        destino[:cantidad] = leido
+        self._posicion += cantidad
+        return cantidad
+
+
+def _parsear_en_worker(nombre_memoria: str, tamanio: int,
+                       perfilar: bool = False) -> Tuple[Dict, Dict[str, float], Optional[Dict]]:
+    # El PDF está en memoria compartida: pdfplumber lo lee de ahí sin copiarlo al worker
+    memoria = SharedMemory(name=nombre_memoria)
+    try:
+        buffer = memoria.buf[:tamanio]
+        try:
+            with io.BufferedReader(_LectorMemoria(buffer)) as archivo:
+                # Las métricas del worker no se exportan: los tiempos vuelven con el resultado
+                tiempos = {}
+                if not perfilar:
+                    return _parser_worker.parse_pdf(archivo, tiempos), tiempos, None
+                perfil = cProfile.Profile()
+                try:
+                    resultado = perfil.runcall(_parser_worker.parse_pdf, archivo, tiempos)
+                finally:
+                    resumen = resumir(perfil)
+                return resultado, tiempos, resumen
+        finally:
+            buffer.release()
+    finally:
+        memoria.close()
+
+
+class PoolParserF572:
+    def __init__(self, workers: Optional[int] = None, max_pendientes: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.workers = workers or int(os.environ.get("F572_WORKERS", 2))
+        self.max_pendientes = max_pendientes or int(os.environ.get("F572_MAX_PENDIENTES", 8))
+        self.timeout = timeout or float(os.environ.get("F572_TIMEOUT", 30))
+        self.pendientes = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Los workers del pool actual informan su PID acá al arrancar (ver _inicializar_worker)
+        self._cola_pids = None
+
+    def iniciar(self, calentar: bool = True):
+        """
+        Crea el pool. Con calentar=True espera a que todos los workers terminen
+        de importar pdfplumber (se usa al arrancar el servidor).
+        """
+        if self._executor is not None:
+            return
+        if calentar:
+            # f572_parser importa pdfplumber recién al parsear: importado acá, los workers
+            # creados con fork ya lo heredan en lugar de importarlo cada uno
+            import pdfplumber  # noqa: F401
+        if os.name == "posix":
+            # Los workers tienen que compartir el resource tracker del proceso principal:
+            # si arrancan antes que él, cada uno crea el suyo y reporta la memoria
+            # compartida de los PDFs como "leaked" aunque el principal ya la liberó
+            resource_tracker.ensure_running()
+        self._cola_pids = multiprocessing.SimpleQueue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_inicializar_worker, initargs=(self._cola_pids,)
+        )
+        if calentar:
+            # El executor crea los procesos a demanda: un trabajo por worker los levanta a todos
+            for futuro in [self._executor.submit(_calentar) for _ in range(self.workers)]:
+                futuro.result()
+
+    def detener(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _reiniciar(self):
+        """
+        Descarta el pool actual. Un trabajo vencido sigue corriendo en su worker
+        y no se puede cancelar, así que se terminan los procesos y se crea otro pool.
+        Los demás trabajos que estaban en ese pool fallan y se informan como error.
+        """
+        executor, cola_pids = self._executor, self._cola_pids
+        self._executor = self._cola_pids = None
+        if executor is not None:
+            for pid in self._pids(cola_pids):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass  # el worker ya había terminado
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.iniciar(calentar=False)
+
+    @staticmethod
+    def _pids(cola_pids) -> Set[int]:
+        """PIDs que informaron los workers de un pool al arrancar."""
+        pids = set()
+        while not cola_pids.empty():
+            pids.add(cola_pids.get())
+        return pids
+
+    async def parsear(self, archivo: BinaryIO, tamanio: int) -> Dict:
+        """
+        Parsea el PDF en el pool sin bloquear el event loop.
+
+        El contenido de `archivo` (el buffer del upload) se copia una sola vez a
+        un segmento de memoria compartida que el worker lee directamente: no hay
+        archivo temporal ni copia de los bytes a través del pipe del pool.
+
+        Raises:
+            PoolSaturadoError: si ya hay `max_pendientes` trabajos en curso o en cola
+            TimeoutParseoError: si el parseo supera `timeout` segundos
+        """
+        if self.pendientes >= self.max_pendientes:
+            raise PoolSaturadoError(f"Hay {self.pendientes} PDFs en proceso, reintentá en unos segundos")
+        if self._executor is None:
+            self.iniciar(calentar=False)
+
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        self.pendientes += 1
+        cronometro = ETAPAS_POOL.iniciar()
+        memoria = SharedMemory(create=True, size=max(tamanio, 1))
+        try:
+            archivo.seek(0)
+            copiados = 0
+            while copiados < tamanio:
+                leidos = archivo.readinto(memoria.buf[copiados:tamanio])
+                if not leidos:
+                    break
+                copiados += leidos
+
+            cronometro.etapa("copia_memoria")
+
+            # En una request perfilada (ver perfilado.py) el worker también perfila el parseo
+            perfil_request = PERFIL_EN_CURSO.get()
+            futuro = loop.run_in_executor(
+                executor, _parsear_en_worker, memoria.name, copiados, perfil_request is not None
+            )
+            resultado, tiempos, perfil_worker = await asyncio.wait_for(futuro, timeout=self.timeout)
+            if perfil_worker is not None:
+                perfil_request["workers"].append(perfil_worker)
+            ETAPAS_PARSE_PDF.registrar(tiempos)
+            # La espera es el tramo hasta la respuesta sin el parseo, que ya midió el worker
+            cronometro.etapa("espera", descontar=tiempos["total"])
+            cronometro.terminar()
+            return resultado
+        except asyncio.TimeoutError:
+            # Si otro trabajo vencido ya reinició el pool, no hace falta reiniciarlo de nuevo
+            if self._executor is executor:
+                self._reiniciar()
+            raise TimeoutParseoError(f"El PDF tardó más de {self.timeout:.0f} segundos en procesarse")
+        finally:
+            self.pendientes -= 1
+            memoria.close()
+            memoria.unlink()
@@ -0,0 +1,365 @@
+"""
+Prueba de carga local: cuántos usuarios concurrentes atiende una instancia.
+
+Levanta uvicorn con main:app en un puerto local (o usa una instancia ya
+levantada con --url) y le manda una mezcla configurable de requests a
+/calcular, /calcular-anual y /upload-f572. Las requests y los PDFs del F.572
+son sintéticos (generador_f572.py) y todo corre en la máquina: funciona sin
+conexión.
+
+Los usuarios virtuales trabajan en lazo cerrado: cada uno manda una request,
+espera la respuesta y manda la siguiente (con --pausa, después de una pausa
+aleatoria de ese promedio). La concurrencia sube por escalones (--usuarios) de
+--duracion segundos cada uno. Por escalón y endpoint se informa:
+
+    - requests por segundo
+    - latencia p50 / p95 / p99
+    - tasa de error (status >= 400 o error de conexión) y los códigos
+    - demora del event loop del servidor durante el escalón (promedio y p99,
+      de ganancias_event_loop_lag_segundos en /metrics)
+
+Al final se informa la mayor concurrencia que cumple --slo-p95 y --max-errores.
+El generador corre en un solo event loop: si su propia demora pasa de 50 ms
+se avisa, porque las latencias de ese escalón incluyen la del generador.
+
+Uso:
+    cd backend
+    python prueba_carga.py                                   # 1, 4, 16 y 64 usuarios, 10 s cada uno
+    python prueba_carga.py --usuarios 1,8,32,128 --duracion 20
+    python prueba_carga.py --mezcla calcular=70,calcular-anual=20,upload-f572=10
+    python prueba_carga.py --sin-cache-f572                  # cada upload se parsea de nuevo
+    python prueba_carga.py --url http://127.0.0.1:8000 --json carga.json
+
+Requiere httpx (requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from generador_f572 import generar_pdf_f572
+from perfil_arranque import DIRECTORIO_BACKEND, _puerto_libre
+
+MEZCLA_DEFAULT = "calcular=80,calcular-anual=15,upload-f572=5"
+USUARIOS_DEFAULT = "1,4,16,64"
+LAG_GENERADOR_MAXIMO = 0.05
+
+CONCEPTOS = (
+    ("Alquiler", "alquiler_inquilino", 150_000, 900_000),
+    ("Prepaga", "medicina_prepaga", 60_000, 400_000),
+    ("Honorarios médicos", "gastos_medicos", 20_000, 200_000),
+    ("Seguro de vida", "seguro_vida", 5_000, 60_000),
+    ("Colegio", "gastos_educativos", 80_000, 500_000),
+    ("Servicio doméstico", "servicio_domestico", 100_000, 450_000),
+    ("Donación", "donaciones", 5_000, 100_000),
+)
+
+
+class Corpus:
+    """Requests sintéticas con la forma de las que manda el frontend."""
+
+    def __init__(self, pdfs: int, semilla: int = 0):
+        rnd = random.Random(semilla)
+        # PDFs de distinto largo: la mayoría de 1 o 2 páginas, algunos con muchas rectificativas
+        self.pdfs = [
+            generar_pdf_f572(secciones_por_concepto=rnd.choice((1, 1, 1, 2, 2, 5)),
+                             items_por_seccion=rnd.randint(1, 6), semilla=semilla + numero)
+            for numero in range(pdfs)
+        ]
+
+    @staticmethod
+    def _empleado(rnd: random.Random) -> Dict:
+        # Sueldos repartidos en escala logarítmica entre 800 mil y 20 millones
+        sueldo = round(math.exp(rnd.uniform(math.log(800_000), math.log(20_000_000))), 2)
+        deducciones = [
+            {"concepto": concepto, "tipo": tipo, "monto": round(rnd.uniform(minimo, maximo), 2)}
+            for concepto, tipo, minimo, maximo in CONCEPTOS if rnd.random() < 0.3
+        ]
+        return {
+            "sueldo_bruto": sueldo,
+            "estado_civil": rnd.choice(("soltero", "casado")),
+            "cantidad_hijos": rnd.choices((0, 1, 2, 3), (4, 3, 2, 1))[0],
+            "deducciones_opcionales": deducciones,
+        }
+
+    def calcular(self, rnd: random.Random) -> Tuple[str, str, Dict]:
+        return "POST", "/calcular", {"json": self._empleado(rnd)}
+
+    def calcular_anual(self, rnd: random.Random) -> Tuple[str, str, Dict]:
+        mes = rnd.randint(1, 12)
+        mes_actual = self._empleado(rnd)
+        anteriores = mes - 1
+        datos_acumulados = {
+            "ingresos_acumulados": round(mes_actual["sueldo_bruto"] * anteriores * rnd.uniform(0.9, 1.0), 2),
+            "deducciones_acumuladas": round(sum(d["monto"] for d in mes_actual["deducciones_opcionales"]) * anteriores, 2),
+            "impuesto_retenido_acumulado": 0,
+        }
+        return "POST", "/calcular-anual", {"json": {
+            "mes_actual": mes_actual, "datos_acumulados": datos_acumulados if anteriores else None,
+            "mes_actual_numero": mes
+        }}
+
+    def upload_f572(self, rnd: random.Random) -> Tuple[str, str, Dict]:
+        return "POST", "/upload-f572", {"files": {"file": ("f572.pdf", rnd.choice(self.pdfs), "application/pdf")}}
+
+
+ENDPOINTS: Dict[str, Callable[[Corpus, random.Random], Tuple[str, str, Dict]]] = {
+    "calcular": Corpus.calcular,
+    "calcular-anual": Corpus.calcular_anual,
+    "upload-f572": Corpus.upload_f572,
+}
+
+
+def leer_mezcla(texto: str) -> Dict[str, float]:
+    """"calcular=80,upload-f572=20" -> {"calcular": 80.0, "upload-f572": 20.0}"""
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconocido en la mezcla: {nombre!r} (opciones: {', '.join(ENDPOINTS)})")
+        mezcla[nombre] = float(peso or 1)
+    if not any(peso > 0 for peso in mezcla.values()):
+        raise ValueError("La mezcla no tiene ningún endpoint con peso positivo")
+    return mezcla
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not valores:
+        return float("nan")
+    return valores[min(len(valores) - 1, max(0, math.ceil(p / 100 * len(valores)) - 1))]
+
+
+def leer_lag(metricas: str) -> Tuple[List[Tuple[float, int]], float, int]:
+    """Buckets acumulados (límite, cuenta), suma y cantidad de ganancias_event_loop_lag_segundos."""
+    buckets, suma, cantidad = [], 0.0, 0
+    for linea in metricas.splitlines():
+        if linea.startswith('ganancias_event_loop_lag_segundos_bucket{le="'):
+            limite = linea.split('"')[1]
+            buckets.append((float("inf") if limite == "+Inf" else float(limite), int(linea.rsplit(" ", 1)[1])))
+        elif linea.startswith("ganancias_event_loop_lag_segundos_sum"):
+            suma = float(linea.rsplit(" ", 1)[1])
+        elif linea.startswith("ganancias_event_loop_lag_segundos_count"):
+            cantidad = int(linea.rsplit(" ", 1)[1])
+    return buckets, suma, cantidad
+
+
+def lag_entre(antes: str, despues: str) -> Optional[Dict[str, float]]:
+    """Demora del event loop entre dos lecturas de /metrics: promedio y p99 (límite del bucket)."""
+    buckets_antes, suma_antes, cantidad_antes = leer_lag(antes)
+    buckets_despues, suma_despues, cantidad_despues = leer_lag(despues)
+    cantidad = cantidad_despues - cantidad_antes
+    if cantidad <= 0:
+        return None
+    previos = dict(buckets_antes)
+    p99 = float("inf")
+    for limite, acumulado in buckets_despues:
+        if acumulado - previos.get(limite, 0) >= 0.99 * cantidad:
+            p99 = limite
+            break
+    return {"muestras": cantidad, "promedio_s": (suma_despues - suma_antes) / cantidad, "p99_s": p99}
+
+
+async def _lag_generador(registro: List[float], intervalo: float = 0.05):
+    while True:
+        esperado = time.perf_counter() + intervalo
+        await asyncio.sleep(intervalo)
+        registro.append(max(0.0, time.perf_counter() - esperado))
+
+
+async def escalon(cliente, corpus: Corpus, mezcla: Dict[str, float], usuarios: int, duracion: float,
+                  pausa: float, semilla: int) -> Dict:
+    """Corre `usuarios` usuarios virtuales durante `duracion` segundos."""
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    latencias: Dict[str, List[float]] = {nombre: [] for nombre in nombres}
+    errores: Dict[str, Counter] = {nombre: Counter() for nombre in nombres}
+    fin = time.perf_counter() + duracion
+
+    async def usuario(rnd: random.Random):
+        while time.perf_counter() < fin:
+            nombre = rnd.choices(nombres, pesos)[0]
+            metodo, ruta, argumentos = ENDPOINTS[nombre](corpus, rnd)
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.request(metodo, ruta, **argumentos)
+                estado = str(respuesta.status_code)
+            except Exception as e:
+                estado = type(e).__name__
+            latencias[nombre].append(time.perf_counter() - inicio)
+            if not estado.isdigit() or int(estado) >= 400:
+                errores[nombre][estado] += 1
+            if pausa > 0:
+                await asyncio.sleep(rnd.expovariate(1 / pausa))
+
+    lag_generador: List[float] = []
+    medicion_lag = asyncio.create_task(_lag_generador(lag_generador))
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario(random.Random(semilla * 100_003 + numero)) for numero in range(usuarios)))
+    transcurrido = time.perf_counter() - inicio
+    medicion_lag.cancel()
+
+    endpoints = {}
+    for nombre in nombres:
+        valores = sorted(latencias[nombre])
+        cantidad_errores = sum(errores[nombre].values())
+        endpoints[nombre] = {
+            "requests": len(valores),
+            "requests_por_segundo": len(valores) / transcurrido,
+            "p50_s": percentil(valores, 50),
+            "p95_s": percentil(valores, 95),
+            "p99_s": percentil(valores, 99),
+            "tasa_error": cantidad_errores / len(valores) if valores else 0.0,
+            "errores": dict(errores[nombre]),
+        }
+    return {
+        "usuarios": usuarios,
+        "duracion_s": transcurrido,
+        "endpoints": endpoints,
+        "lag_generador_max_s": max(lag_generador, default=0.0),
+    }
+
+
+@contextmanager
+def servidor_local(entorno: Dict[str, str], limite: float = 60.0) -> Iterator[str]:
+    """Levanta uvicorn con main:app en un puerto libre y devuelve su URL cuando responde."""
+    import httpx
+
+    puerto = _puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(puerto),
+         "--log-level", "warning"],
+        cwd=DIRECTORIO_BACKEND, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        inicio = time.perf_counter()
+        while True:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {proceso.returncode}")
+            try:
+                if httpx.get(f"{url}/periodos", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() - inicio > limite:
+                raise TimeoutError(f"el servidor no respondió en {limite} s")
+            time.sleep(0.05)
+        yield url
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+async def ejecutar(url: str, corpus: Corpus, mezcla: Dict[str, float], escalones: List[int], duracion: float,
+                   pausa: float, timeout: float) -> List[Dict]:
+    import httpx
+
+    resultados = []
+    limites = httpx.Limits(max_connections=max(escalones), max_keepalive_connections=max(escalones))
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limites) as cliente:
+        for numero, usuarios in enumerate(escalones):
+            antes = (await cliente.get("/metrics")).text
+            resultado = await escalon(cliente, corpus, mezcla, usuarios, duracion, pausa, numero)
+            resultado["lag_servidor"] = lag_entre(antes, (await cliente.get("/metrics")).text)
+            resultados.append(resultado)
+            imprimir_escalon(resultado)
+    return resultados
+
+
+def _ms(segundos: float) -> str:
+    if segundos == float("inf"):
+        return "    > 10 s"
+    return f"{segundos * 1000:8.1f} ms"
+
+
+def imprimir_escalon(resultado: Dict):
+    lag = resultado["lag_servidor"]
+    lag_texto = (f"lag del event loop: promedio {lag['promedio_s'] * 1000:.1f} ms, p99 <= {_ms(lag['p99_s']).strip()}"
+                 if lag else "lag del event loop: sin datos (¿METRICAS_INTERVALO_LAG=0?)")
+    print(f"\n{resultado['usuarios']} usuarios ({resultado['duracion_s']:.1f} s) — {lag_texto}")
+    print(f"  {'endpoint':16s} {'requests':>8s} {'req/s':>8s} {'p50':>11s} {'p95':>11s} {'p99':>11s} {'errores':>8s}")
+    for nombre, datos in resultado["endpoints"].items():
+        print(f"  {nombre:16s} {datos['requests']:8d} {datos['requests_por_segundo']:8.1f} {_ms(datos['p50_s'])} "
+              f"{_ms(datos['p95_s'])} {_ms(datos['p99_s'])} {datos['tasa_error'] * 100:7.1f}%"
+              + (f"  {datos['errores']}" if datos["errores"] else ""))
+    if resultado["lag_generador_max_s"] > LAG_GENERADOR_MAXIMO:
+        print(f"  ⚠ el generador llegó a {resultado['lag_generador_max_s'] * 1000:.0f} ms de demora: las latencias "
+              f"de este escalón incluyen la del generador (probar con menos usuarios o --pausa)")
+
+
+def capacidad(resultados: List[Dict], slo_p95: float, max_errores: float) -> Optional[int]:
+    """Mayor cantidad de usuarios en que todos los endpoints cumplen el p95 y la tasa de error."""
+    cumplen = [
+        resultado["usuarios"] for resultado in resultados
+        if all(datos["p95_s"] <= slo_p95 and datos["tasa_error"] <= max_errores
+               for datos in resultado["endpoints"].values() if datos["requests"])
+    ]
+    return max(cumplen, default=None)
+
+
+def main(argumentos: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga local de /calcular, /calcular-anual y /upload-f572.")
+    parser.add_argument("--url", help="instancia ya levantada (default: levantar uvicorn en un puerto libre)")
+    parser.add_argument("--usuarios", default=USUARIOS_DEFAULT,
+                        help=f"usuarios concurrentes de cada escalón (default: {USUARIOS_DEFAULT})")
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos por escalón (default: 10)")
+    parser.add_argument("--mezcla", default=MEZCLA_DEFAULT, help=f"pesos por endpoint (default: {MEZCLA_DEFAULT})")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="pausa promedio en segundos de cada usuario entre requests (default: 0)")
+    parser.add_argument("--pdfs", type=int, default=40, help="PDFs distintos en el corpus (default: 40)")
+    parser.add_argument("--sin-cache-f572", action="store_true",
+                        help="levantar el servidor sin cache de F.572 (cada upload se parsea)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout por request en segundos (default: 60)")
+    parser.add_argument("--slo-p95", type=float, default=0.5, help="p95 máximo aceptable en segundos (default: 0.5)")
+    parser.add_argument("--max-errores", type=float, default=0.01, help="tasa de error máxima (default: 0.01)")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla del corpus y de los usuarios (default: 0)")
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    opciones = parser.parse_args(argumentos)
+
+    try:
+        mezcla = leer_mezcla(opciones.mezcla)
+        escalones = [int(usuarios) for usuarios in opciones.usuarios.split(",")]
+    except ValueError as e:
+        parser.error(str(e))
+    corpus = Corpus(opciones.pdfs if "upload-f572" in mezcla else 0, opciones.semilla)
+
+    entorno = dict(os.environ)
+    if opciones.sin_cache_f572:
+        entorno["F572_CACHE_MAX_BYTES"] = "1"
+        entorno.pop("F572_CACHE_DIR", None)
+
+    print(f"Mezcla: {', '.join(f'{nombre}={peso:g}' for nombre, peso in mezcla.items())}; "
+          f"escalones de {opciones.duracion:g} s: {', '.join(map(str, escalones))} usuarios")
+    argumentos_ejecucion = (corpus, mezcla, escalones, opciones.duracion, opciones.pausa, opciones.timeout)
+    if opciones.url:
+        resultados = asyncio.run(ejecutar(opciones.url.rstrip("/"), *argumentos_ejecucion))
+    else:
+        with servidor_local(entorno) as url:
+            resultados = asyncio.run(ejecutar(url, *argumentos_ejecucion))
+
+    maximo = capacidad(resultados, opciones.slo_p95, opciones.max_errores)
+    criterio = f"p95 <= {opciones.slo_p95 * 1000:.0f} ms y errores <= {opciones.max_errores * 100:g}%"
+    if maximo is None:
+        print(f"\nNingún escalón cumple {criterio}")
+    else:
+        print(f"\nCapacidad: {maximo} usuarios concurrentes con {criterio}")
+
+    if opciones.json:
+        with open(opciones.json, "w", encoding="utf-8") as archivo:
+            json.dump({"mezcla": mezcla, "slo_p95_s": opciones.slo_p95, "max_errores": opciones.max_errores,
+                       "capacidad_usuarios": maximo, "escalones": resultados}, archivo, indent=2, default=str)
+        print(f"Resultados guardados en {opciones.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,247 @@
+"""
+Resultados del cálculo de ganancias.
+
+`CalculadoraGanancias.calcular` y las proyecciones anuales devuelven estos
+objetos en lugar de dicts anidados: guardan los montos sin redondear (salvo los
+que el cálculo ya usa redondeados: descuentos, deducciones personales e
+impuesto mensual) y arman el desglose recién cuando se pide con `a_dict`.
+Así un cálculo que solo necesita los totales (las proyecciones anuales, el
+cache, las búsquedas por sueldo neto) no construye descuentos por concepto,
+deducciones por concepto ni el detalle de los tramos de la escala.
+
+`a_dict(detalle)` devuelve el mismo JSON que las respuestas de la API (ver
+DETALLES en calculator.py).
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+def _tipo_diferencia(diferencia: float) -> str:
+    return "a_favor" if diferencia > 0 else "en_contra" if diferencia < 0 else "equilibrado"
+
+
+class DetalleEscala:
+    """Un tramo de la escala aplicado a una ganancia anual (base e impuesto sin redondear)."""
+
+    __slots__ = ("desde", "hasta", "porcentaje", "fijo", "base_imponible", "impuesto_tramo")
+
+    def __init__(self, desde: float, hasta, porcentaje: float, fijo: float,
+                 base_imponible: float, impuesto_tramo: float):
+        self.desde = desde
+        self.hasta = hasta
+        self.porcentaje = porcentaje
+        self.fijo = fijo
+        self.base_imponible = base_imponible
+        self.impuesto_tramo = impuesto_tramo
+
+    def a_dict(self) -> Dict:
+        return {
+            "desde": self.desde,
+            "hasta": self.hasta,
+            "porcentaje": self.porcentaje,
+            "fijo": self.fijo,
+            "base_imponible": round(self.base_imponible, 2),
+            "impuesto_tramo": round(self.impuesto_tramo, 2)
+        }
+
+
+class ResultadoCalculo:
+    """
+    Resultado de CalculadoraGanancias.calcular para un mes.
+
+    `calculadora` es la del período con que se calculó (o su MotorCentavos): se
+    usa para armar el desglose de descuentos, deducciones personales y tramos
+    de la escala.
+    """
+
+    __slots__ = ("calculadora", "sueldo_bruto", "estado_civil", "cantidad_hijos", "otras_cargas",
+                 "descuentos_obligatorios", "sueldo_neto", "deducciones_personales", "deducciones_opcionales",
+                 "total_deducciones_opcionales", "ganancia_neta_sujeta", "impuesto_anual", "impuesto_mensual",
+                 "sueldo_neto_final", "_porcentaje_efectivo")
+
+    def __init__(self, calculadora, sueldo_bruto: float, estado_civil: str, cantidad_hijos: int,
+                 otras_cargas: int, descuentos_obligatorios: float, sueldo_neto: float,
+                 deducciones_personales: float, deducciones_opcionales: List[Tuple[str, float]],
+                 total_deducciones_opcionales: float, ganancia_neta_sujeta: float,
+                 impuesto_anual: float, impuesto_mensual: float, sueldo_neto_final: float,
+                 porcentaje_efectivo: Optional[float] = None):
+        self.calculadora = calculadora
+        self.sueldo_bruto = sueldo_bruto
+        self.estado_civil = estado_civil
+        self.cantidad_hijos = cantidad_hijos
+        self.otras_cargas = otras_cargas
+        self.descuentos_obligatorios = descuentos_obligatorios  # total, redondeado
+        self.sueldo_neto = sueldo_neto
+        self.deducciones_personales = deducciones_personales  # total mensual, redondeado
+        self.deducciones_opcionales = deducciones_opcionales  # (concepto, monto deducible)
+        self.total_deducciones_opcionales = total_deducciones_opcionales
+        self.ganancia_neta_sujeta = ganancia_neta_sujeta
+        self.impuesto_anual = impuesto_anual
+        self.impuesto_mensual = impuesto_mensual  # redondeado (0 si no alcanza el mínimo)
+        self.sueldo_neto_final = sueldo_neto_final
+        self._porcentaje_efectivo = porcentaje_efectivo  # si el motor ya lo calculó
+
+    @property
+    def sujeto_a_impuesto(self) -> bool:
+        return self.ganancia_neta_sujeta > 0
+
+    @property
+    def ganancia_neta_sujeta_mensual(self) -> float:
+        """Ganancia neta sujeta redondeada (0 si no alcanza el mínimo no imponible)."""
+        return round(self.ganancia_neta_sujeta, 2) if self.ganancia_neta_sujeta > 0 else 0
+
+    @property
+    def porcentaje_efectivo(self) -> float:
+        if self._porcentaje_efectivo is not None:
+            return self._porcentaje_efectivo
+        if self.ganancia_neta_sujeta <= 0:
+            return 0
+        return round((self.impuesto_mensual / self.sueldo_bruto) * 100, 2)
+
+    def a_dict(self, detalle: str = "completo") -> Dict:
+        """
+        Resultado como en la respuesta de /calcular:
+            "completo": descuentos, deducciones y tramos de la escala uno por uno
+            "resumen": solo los totales, en una fila plana como las de calcular_lote
+            "none": sueldo_bruto, impuesto_mensual, sueldo_neto_final y porcentaje_efectivo
+        """
+        if detalle == "completo":
+            return self._completo()
+        sueldo_neto_final = round(self.sueldo_neto_final, 2)
+        if detalle == "none":
+            return {
+                "sueldo_bruto": round(self.sueldo_bruto, 2),
+                "impuesto_mensual": self.impuesto_mensual,
+                "sueldo_neto_final": sueldo_neto_final,
+                "porcentaje_efectivo": self.porcentaje_efectivo
+            }
+        if detalle == "resumen":
+            return {
+                "sueldo_bruto": round(self.sueldo_bruto, 2),
+                "descuentos_obligatorios": self.descuentos_obligatorios,
+                "sueldo_neto": round(self.sueldo_neto, 2),
+                "deducciones_personales": self.deducciones_personales,
+                "total_deducciones_opcionales": round(self.total_deducciones_opcionales, 2),
+                "ganancia_neta_sujeta_mensual": self.ganancia_neta_sujeta_mensual,
+                "impuesto_mensual": self.impuesto_mensual,
+                "impuesto_anual": round(self.impuesto_anual, 2),
+                "sueldo_neto_final": sueldo_neto_final,
+                "porcentaje_efectivo": self.porcentaje_efectivo
+            }
+        raise ValueError(f"Detalle desconocido: {detalle}")
+
+    def _completo(self) -> Dict:
+        calculadora = self.calculadora
+        resultado = {
+            "sueldo_bruto": round(self.sueldo_bruto, 2),
+            "descuentos_obligatorios": calculadora.calcular_descuentos_obligatorios(self.sueldo_bruto),
+            "sueldo_neto": round(self.sueldo_neto, 2),
+            "deducciones_personales": calculadora.calcular_deducciones_personales(
+                self.estado_civil, self.cantidad_hijos, otras_cargas=self.otras_cargas
+            ),
+            "deducciones_opcionales": [
+                {"concepto": concepto, "monto": round(monto, 2)} for concepto, monto in self.deducciones_opcionales
+            ],
+            "total_deducciones_opcionales": round(self.total_deducciones_opcionales, 2),
+            "ganancia_neta_sujeta_mensual": self.ganancia_neta_sujeta_mensual
+        }
+        if self.ganancia_neta_sujeta <= 0:
+            resultado["impuesto"] = {"impuesto_mensual": 0, "impuesto_anual": 0, "detalle_escalas": []}
+            resultado["sueldo_neto_final"] = round(self.sueldo_neto_final, 2)
+            resultado["mensaje"] = "No alcanza el mínimo no imponible"
+            return resultado
+
+        ganancia_anual = self.ganancia_neta_sujeta * 12
+        _, detalle_escalas = calculadora.escala_compilada.calcular(ganancia_anual)
+        resultado["impuesto"] = {
+            "ganancia_anual": round(ganancia_anual, 2),
+            "impuesto_anual": round(self.impuesto_anual, 2),
+            "impuesto_mensual": self.impuesto_mensual,
+            "detalle_escalas": [tramo.a_dict() for tramo in detalle_escalas]
+        }
+        resultado["sueldo_neto_final"] = round(self.sueldo_neto_final, 2)
+        resultado["porcentaje_efectivo"] = self.porcentaje_efectivo
+        return resultado
+
+
+class ResumenMensual:
+    """Una fila de resumen_mensual de la proyección anual (montos sin redondear)."""
+
+    __slots__ = ("mes", "ganancia_neta_sujeta", "impuesto_estimado", "tipo")
+
+    def __init__(self, mes: str, ganancia_neta_sujeta: float, impuesto_estimado: float, tipo: str):
+        self.mes = mes
+        self.ganancia_neta_sujeta = ganancia_neta_sujeta
+        self.impuesto_estimado = impuesto_estimado
+        self.tipo = tipo
+
+    def a_dict(self) -> Dict:
+        return {
+            "mes": self.mes,
+            "ganancia_neta_sujeta": round(self.ganancia_neta_sujeta, 2),
+            "impuesto_estimado": round(self.impuesto_estimado, 2),
+            "tipo": self.tipo
+        }
+
+
+class ResultadoAnual:
+    """Proyección anual de calcular_anual_con_acumulados / calcular_anual_con_historia."""
+
+    __slots__ = ("impuesto_anual_real", "impuesto_ya_retenido_estimado", "diferencia", "diferencia_porcentual",
+                 "retencion_mensual_sugerida", "retencion_mensual_actual", "meses_restantes",
+                 "ganancia_neta_anual_total", "resumen_mensual", "calculo_mes_actual")
+
+    def __init__(self, impuesto_anual_real: float, impuesto_ya_retenido_estimado: float, diferencia: float,
+                 diferencia_porcentual: float, retencion_mensual_sugerida: float, retencion_mensual_actual: float,
+                 meses_restantes: int, ganancia_neta_anual_total: float, resumen_mensual: List[ResumenMensual],
+                 calculo_mes_actual: ResultadoCalculo):
+        self.impuesto_anual_real = impuesto_anual_real
+        self.impuesto_ya_retenido_estimado = impuesto_ya_retenido_estimado
+        self.diferencia = diferencia
+        self.diferencia_porcentual = diferencia_porcentual
+        self.retencion_mensual_sugerida = retencion_mensual_sugerida
+        self.retencion_mensual_actual = retencion_mensual_actual
+        self.meses_restantes = meses_restantes
+        self.ganancia_neta_anual_total = ganancia_neta_anual_total
+        self.resumen_mensual = resumen_mensual
+        self.calculo_mes_actual = calculo_mes_actual
+
+    def detalle_escalas(self) -> List[Dict]:
+        """Tramos de la escala aplicados a la ganancia neta anual total."""
+        _, detalle = self.calculo_mes_actual.calculadora.escala_compilada.calcular(self.ganancia_neta_anual_total)
+        return [tramo.a_dict() for tramo in detalle]
+
+    def a_dict(self, detalle: str = "completo") -> Dict:
+        """
+        Resultado como en la respuesta de /calcular-anual:
+            "completo": con resumen_mensual, tramos de la escala y el cálculo completo del mes actual
+            "resumen": sin tramos y con calculo_mes_actual como fila plana
+            "none": solo el impuesto anual, lo retenido, la diferencia y la retención sugerida
+        """
+        if detalle == "none":
+            return {
+                "impuesto_anual_real": round(self.impuesto_anual_real, 2),
+                "impuesto_ya_retenido_estimado": round(self.impuesto_ya_retenido_estimado, 2),
+                "diferencia": round(self.diferencia, 2),
+                "diferencia_tipo": _tipo_diferencia(self.diferencia),
+                "retencion_mensual_sugerida": round(self.retencion_mensual_sugerida, 2),
+                "retencion_mensual_actual": round(self.retencion_mensual_actual, 2),
+                "meses_restantes": self.meses_restantes
+            }
+        if detalle not in ("resumen", "completo"):
+            raise ValueError(f"Detalle desconocido: {detalle}")
+        resultado = {
+            "impuesto_anual_real": round(self.impuesto_anual_real, 2),
+            "impuesto_ya_retenido_estimado": round(self.impuesto_ya_retenido_estimado, 2),
+            "diferencia": round(self.diferencia, 2),
+            "diferencia_porcentual": round(self.diferencia_porcentual, 2),
+            "diferencia_tipo": _tipo_diferencia(self.diferencia),
+            "retencion_mensual_sugerida": round(self.retencion_mensual_sugerida, 2),
+            "retencion_mensual_actual": round(self.retencion_mensual_actual, 2),
+            "meses_restantes": self.meses_restantes,
+            "ganancia_neta_anual_total": round(self.ganancia_neta_anual_total, 2),
+            "resumen_mensual": [fila.a_dict() for fila in self.resumen_mensual]
+        }
+        if detalle == "completo":
+            resultado["detalle_escalas"] = self.detalle_escalas()
+        resultado["calculo_mes_actual"] = self.calculo_mes_actual.a_dict(detalle)
+        return resultado
@@ -0,0 +1,171 @@
+"""
+Simulación mes a mes de la retención anual (régimen de retención de 4ta categoría).
+
+A diferencia de `calcular_anual_con_acumulados` (que proyecta el mes actual
+constante) y `calcular_anual_con_historia` (que estima cada mes por separado),
+acá la retención de cada mes sale de lo acumulado en el año:
+
+    1. ganancia neta del mes = bruto (sueldo + SAC) - descuentos obligatorios
+                               - deducciones personales - deducciones opcionales
+    2. ganancia neta acumulada = suma de las ganancias netas de enero al mes
+    3. impuesto acumulado = escala del mes prorrateada (desde, hasta y fijo × mes / 12)
+                            aplicada a la ganancia neta acumulada
+    4. retención del mes = impuesto acumulado - lo ya retenido en el año. Si da
+       negativo es una devolución. La retención no puede superar el 35% del
+       bruto del mes; lo que no se retiene queda pendiente para los meses siguientes.
+
+Con `deducciones_por_tipo` (montos pagados por concepto) las deducciones
+opcionales de cada mes salen del motor de topes (topes.py): porcentaje
+deducible, topes fijos y del 5% de la ganancia neta sobre lo acumulado.
+
+Cada mes usa las tablas del período vigente en ese mes (RegistroTablas), así
+que un año con actualización en julio usa las tablas de enero hasta junio y las
+nuevas desde julio.
+
+Todo se calcula para N empleados a la vez: un solo recorrido de 12 meses con
+operaciones sobre arrays de N elementos.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculator import _redondear
+from tablas import RegistroTablas
+from topes import MotorTopes
+
+# Tope de la retención mensual sobre el bruto del mes
+TOPE_RETENCION_MENSUAL = 0.35
+
+
+def calcular_sac(sueldos: np.ndarray) -> np.ndarray:
+    """
+    Aguinaldo por mes (N × 12): en junio y diciembre, la mitad del mayor sueldo
+    del semestre; cero el resto de los meses.
+    """
+    sac = np.zeros_like(sueldos)
+    sac[:, 5] = _redondear(sueldos[:, :6].max(axis=1) / 2)
+    sac[:, 11] = _redondear(sueldos[:, 6:].max(axis=1) / 2)
+    return sac
+
+
+class SimuladorAnual:
+    def __init__(self, registro: RegistroTablas):
+        self.registro = registro
+        # (versiones de las tablas de cada mes, motor): el último motor de topes armado
+        self._motor_topes: Optional[Tuple[Tuple, MotorTopes]] = None
+
+    def simular(self, anio: int, sueldos: Sequence[Sequence[float]], estados_civiles: Sequence[str],
+                cantidad_hijos: Sequence[int], otras_cargas: Optional[Sequence[int]] = None,
+                sac: Optional[Sequence[Sequence[float]]] = None,
+                deducciones_opcionales: Optional[Sequence[Sequence[float]]] = None,
+                deducciones_por_tipo: Optional[Dict[str, Sequence[Sequence[float]]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Simula el año completo de N empleados.
+
+        Args:
+            anio: año fiscal (define las tablas de cada mes)
+            sueldos: sueldo bruto de cada mes, N × 12
+            estados_civiles: "soltero" / "casado" de cada empleado
+            cantidad_hijos: hijos a cargo de cada empleado
+            otras_cargas: otras personas a cargo de cada empleado (default 0)
+            sac: aguinaldo de cada mes, N × 12 (default: calculado con calcular_sac)
+            deducciones_opcionales: monto deducible de cada mes, N × 12 (ya con su
+                porcentaje deducible aplicado; default 0)
+            deducciones_por_tipo: monto pagado de cada mes por concepto (tipo -> N × 12);
+                se les aplica el porcentaje deducible y los topes acumulados y se suman
+                a deducciones_opcionales
+
+        Returns:
+            Dict de arrays. Por mes (N × 12): bruto, descuentos_obligatorios,
+            deducciones_personales, deducciones_opcionales, ganancia_neta_mes,
+            ganancia_neta_acumulada, impuesto_acumulado, retencion_mensual,
+            retenido_acumulado. Por empleado (N): impuesto_anual, retenido_anual,
+            saldo_pendiente (impuesto que no se llegó a retener por el tope del 35%).
+
+        Raises:
+            PeriodoDesconocidoError: si algún mes del año no tiene tablas cargadas
+            ValueError: si las series (o las de deducciones_por_tipo) no tienen 12 meses
+        """
+        sueldos = np.asarray(sueldos, dtype=np.float64)
+        if sueldos.ndim != 2 or sueldos.shape[1] != 12:
+            raise ValueError("sueldos debe tener 12 meses por empleado")
+        n = sueldos.shape[0]
+        casado = np.asarray(estados_civiles, dtype=object) == "casado"
+        hijos = np.asarray(cantidad_hijos, dtype=np.int64)
+        cargas = np.zeros(n, dtype=np.int64) if otras_cargas is None else np.asarray(otras_cargas, dtype=np.int64)
+        sac = calcular_sac(sueldos) if sac is None else np.asarray(sac, dtype=np.float64)
+        opcionales = (np.zeros((n, 12)) if deducciones_opcionales is None
+                      else np.asarray(deducciones_opcionales, dtype=np.float64))
+        if sac.shape != (n, 12) or opcionales.shape != (n, 12):
+            raise ValueError("sac y deducciones_opcionales deben tener 12 meses por empleado")
+
+        bruto = sueldos + sac
+        calculadoras = [self.registro.calculadora(f"{anio}-{mes + 1:02d}") for mes in range(12)]
+        tasas = np.array([calculadora.deducciones["descuentos_obligatorios"]["total"] for calculadora in calculadoras])
+        descuentos = _redondear(bruto * tasas)
+        if deducciones_por_tipo:
+            topes = self._motor(calculadoras).aplicar_lote(deducciones_por_tipo, bruto - descuentos)
+            opcionales = opcionales + topes["deducciones_opcionales"]
+        campos_mensuales = ("descuentos_obligatorios", "deducciones_personales", "ganancia_neta_mes",
+                            "ganancia_neta_acumulada", "impuesto_acumulado", "retencion_mensual",
+                            "retenido_acumulado")
+        resultado = {campo: np.zeros((n, 12)) for campo in campos_mensuales}
+
+        ganancia_acumulada = np.zeros(n)
+        retenido = np.zeros(n)
+        impuesto_acumulado = np.zeros(n)
+        for mes in range(12):
+            calculadora = calculadoras[mes]
+
+            personales = calculadora.deducciones_personales_lote(casado, hijos, cargas)
+            ganancia_mes = bruto[:, mes] - descuentos[:, mes] - personales - opcionales[:, mes]
+            ganancia_acumulada = ganancia_acumulada + ganancia_mes
+
+            # Escala prorrateada al mes: impuesto(g) = (mes/12) × escala_anual(g × 12/mes)
+            impuesto_acumulado = self._impuesto_prorrateado(calculadora, np.maximum(ganancia_acumulada, 0), mes + 1)
+
+            # Retención: lo que falta para llegar al impuesto acumulado, con tope del 35% del bruto
+            pendiente = impuesto_acumulado - retenido
+            tope = bruto[:, mes] * TOPE_RETENCION_MENSUAL
+            retencion = _redondear(np.where(pendiente > 0, np.minimum(pendiente, tope), pendiente))
+            retenido = retenido + retencion
+
+            resultado["descuentos_obligatorios"][:, mes] = descuentos[:, mes]
+            resultado["deducciones_personales"][:, mes] = personales
+            resultado["ganancia_neta_mes"][:, mes] = ganancia_mes
+            resultado["ganancia_neta_acumulada"][:, mes] = ganancia_acumulada
+            resultado["impuesto_acumulado"][:, mes] = impuesto_acumulado
+            resultado["retencion_mensual"][:, mes] = retencion
+            resultado["retenido_acumulado"][:, mes] = retenido
+
+        for campo in ("ganancia_neta_mes", "ganancia_neta_acumulada", "impuesto_acumulado", "retenido_acumulado"):
+            resultado[campo] = _redondear(resultado[campo])
+        resultado["bruto"] = _redondear(bruto)
+        resultado["deducciones_opcionales"] = _redondear(opcionales)
+        resultado["impuesto_anual"] = _redondear(impuesto_acumulado)
+        resultado["retenido_anual"] = _redondear(retenido)
+        resultado["saldo_pendiente"] = _redondear(impuesto_acumulado - retenido)
+        return resultado
+
+    def _motor(self, calculadoras) -> MotorTopes:
+        # El motor solo cambia si se recargan las tablas de algún mes del año
+        clave = tuple(calculadora.version_tablas for calculadora in calculadoras)
+        if self._motor_topes is None or self._motor_topes[0] != clave:
+            self._motor_topes = (clave, MotorTopes([calculadora.deducciones for calculadora in calculadoras]))
+        return self._motor_topes[1]
+
+    @staticmethod
+    def _impuesto_prorrateado(calculadora, ganancia_acumulada: np.ndarray, mes: int) -> np.ndarray:
+        escala = calculadora.escala_compilada
+        desde = np.array(escala.desde, dtype=np.float64)
+        porcentaje = np.array(escala.porcentaje, dtype=np.float64)
+        fijo = np.array(escala.fijo, dtype=np.float64)
+
+        ganancia_anualizada = ganancia_acumulada * 12 / mes
+        tramo = np.clip(np.searchsorted(desde, ganancia_anualizada, side="left") - 1, 0, len(desde) - 1)
+        impuesto_anual = np.where(
+            ganancia_anualizada > desde[0],
+            (ganancia_anualizada - desde[tramo]) * porcentaje[tramo] + fijo[tramo],
+            0.0
+        )
+        return impuesto_anual * mes / 12
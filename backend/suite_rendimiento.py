@@ -0,0 +1,323 @@
+"""
+Suite de rendimiento con líneas base en JSON.
+
+A diferencia de benchmarks.py (que verifica objetivos fijos, por ejemplo
+"100.000 filas en menos de 0,5 s"), esta suite mide el tiempo por operación
+de las piezas principales y lo compara contra una medición anterior guardada,
+para detectar si un cambio de tablas o del parser hizo todo más lento.
+
+Uso:
+    cd backend
+    python suite_rendimiento.py                                   # mide e imprime
+    python suite_rendimiento.py --guardar base.json               # guarda la línea base
+    python suite_rendimiento.py --comparar base.json              # falla si algo es >25% más lento
+    python suite_rendimiento.py --comparar base.json --tolerancia 0.1
+    python suite_rendimiento.py calcular parse_pdf_5_paginas      # solo las indicadas
+
+Todo corre en el mismo proceso y sin red (los endpoints se llaman con un
+cliente ASGI en memoria). Los datos de entrada son fijos, así que dos
+corridas en la misma máquina son comparables. Cada medición es el mejor de
+varias repeticiones (timeit, con el GC desactivado).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from datetime import datetime
+from typing import Dict, List
+
+from calculator import CalculadoraGanancias
+from f572_parser import F572Parser
+from generador_f572 import generar_pdf_f572
+
+MEDICIONES = {}
+
+TOLERANCIA_DEFAULT = 0.25
+
+
+def medicion(nombre: str, repeticiones: int = 5):
+    """
+    Registra una medición. La función decorada prepara los datos, hace `yield`
+    de la operación a medir (sin argumentos) y después libera lo que haga falta.
+    """
+    def registrar(preparar):
+        MEDICIONES[nombre] = (contextlib.contextmanager(preparar), repeticiones)
+        return preparar
+    return registrar
+
+
+# ---------------------------------------------------------------------------
+# Calculadora
+# ---------------------------------------------------------------------------
+
+DEDUCCIONES = [
+    {"concepto": "Alquiler", "monto": 350_000, "tipo": "alquiler_inquilino"},
+    {"concepto": "Prepaga", "monto": 180_000, "tipo": "medicina_prepaga"},
+]
+
+
+@medicion("calcular")
+def medir_calcular():
+    calculadora = CalculadoraGanancias()
+    yield lambda: calculadora.calcular(4_500_000, "casado", 2, DEDUCCIONES)
+
+
+@medicion("calcular_desglose_completo")
+def medir_calcular_desglose_completo():
+    calculadora = CalculadoraGanancias()
+    yield lambda: calculadora.calcular(4_500_000, "casado", 2, DEDUCCIONES).a_dict("completo")
+
+
+@medicion("aplicar_escala_progresiva")
+def medir_aplicar_escala_progresiva():
+    calculadora = CalculadoraGanancias()
+    yield lambda: calculadora.aplicar_escala_progresiva(2_750_000)
+
+
+@medicion("calcular_anual_con_acumulados")
+def medir_calcular_anual_con_acumulados():
+    calculadora = CalculadoraGanancias()
+    mes_actual = {"sueldo_bruto": 4_500_000, "estado_civil": "casado", "cantidad_hijos": 2,
+                  "deducciones_opcionales": DEDUCCIONES}
+    acumulados = {"ingresos_acumulados": 18_000_000, "deducciones_acumuladas": 1_200_000,
+                  "impuesto_retenido_acumulado": 0}
+    yield lambda: calculadora.calcular_anual_con_acumulados(mes_actual, acumulados, 5)
+
+
+@medicion("calcular_anual_con_historia")
+def medir_calcular_anual_con_historia():
+    calculadora = CalculadoraGanancias()
+    mes_actual = {"sueldo_bruto": 4_500_000, "estado_civil": "casado", "cantidad_hijos": 2,
+                  "deducciones_opcionales": DEDUCCIONES}
+    meses = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto"]
+    historia = [{"mes": mes, "sueldo_bruto": 4_000_000 + 50_000 * i, "deducciones_opcionales_total": 300_000}
+                for i, mes in enumerate(meses)]
+    yield lambda: calculadora.calcular_anual_con_historia(mes_actual, historia, 9)
+
+
+# ---------------------------------------------------------------------------
+# Parser F.572 (PDFs generados: ~1, ~5 y ~20 páginas)
+# ---------------------------------------------------------------------------
+
+def _medir_parse_pdf(secciones_por_concepto: int):
+    parser = F572Parser()
+    pdf = generar_pdf_f572(secciones_por_concepto)
+    yield lambda: parser.parse_pdf(io.BytesIO(pdf))
+
+
+@medicion("parse_pdf_1_pagina", repeticiones=3)
+def medir_parse_pdf_1_pagina():
+    yield from _medir_parse_pdf(1)
+
+
+@medicion("parse_pdf_5_paginas", repeticiones=3)
+def medir_parse_pdf_5_paginas():
+    yield from _medir_parse_pdf(8)
+
+
+@medicion("parse_pdf_20_paginas", repeticiones=3)
+def medir_parse_pdf_20_paginas():
+    yield from _medir_parse_pdf(34)
+
+
+# ---------------------------------------------------------------------------
+# Endpoints (cliente ASGI en memoria, sin red)
+# ---------------------------------------------------------------------------
+
+@contextlib.contextmanager
+def _cliente_api():
+    """Devuelve `pedir(metodo, ruta, **kwargs)` que llama a la app en el mismo proceso."""
+    import httpx
+    import main as api
+
+    loop = asyncio.new_event_loop()
+    cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test")
+
+    def pedir(metodo, ruta, **kwargs):
+        respuesta = loop.run_until_complete(cliente.request(metodo, ruta, **kwargs))
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"{metodo} {ruta} respondió {respuesta.status_code}: {respuesta.text[:200]}")
+        return respuesta
+
+    try:
+        yield api, pedir
+    finally:
+        loop.run_until_complete(cliente.aclose())
+        loop.close()
+
+
+@medicion("endpoint_calcular")
+def medir_endpoint_calcular():
+    with _cliente_api() as (_, pedir):
+        # Un sueldo distinto por request, para medir el cálculo y no el cache
+        sueldos = itertools.count(3_000_000)
+        yield lambda: pedir("POST", "/calcular", json={
+            "sueldo_bruto": next(sueldos), "estado_civil": "casado", "cantidad_hijos": 2,
+            "deducciones_opcionales": DEDUCCIONES
+        })
+
+
+@medicion("endpoint_calcular_anual")
+def medir_endpoint_calcular_anual():
+    with _cliente_api() as (_, pedir):
+        sueldos = itertools.count(3_000_000)
+        yield lambda: pedir("POST", "/calcular-anual", json={
+            "mes_actual": {"sueldo_bruto": next(sueldos), "estado_civil": "soltero", "cantidad_hijos": 0},
+            "datos_acumulados": {"ingresos_acumulados": 15_000_000, "deducciones_acumuladas": 500_000},
+            "mes_actual_numero": 6
+        })
+
+
+@medicion("endpoint_calcular_lote_1000")
+def medir_endpoint_calcular_lote():
+    with _cliente_api() as (_, pedir):
+        empleados = [{"sueldo_bruto": 1_000_000 + 10_000 * i, "estado_civil": "casado", "cantidad_hijos": i % 3}
+                     for i in range(1000)]
+        yield lambda: pedir("POST", "/calcular-lote", json={"empleados": empleados})
+
+
+@medicion("endpoint_curva_1000")
+def medir_endpoint_curva():
+    with _cliente_api() as (_, pedir):
+        yield lambda: pedir("POST", "/curva", json={
+            "estado_civil": "casado", "cantidad_hijos": 1, "desde": 500_000, "hasta": 10_490_000, "paso": 10_000
+        })
+
+
+@medicion("endpoint_deducciones")
+def medir_endpoint_deducciones():
+    with _cliente_api() as (_, pedir):
+        yield lambda: pedir("GET", "/deducciones")
+
+
+@medicion("endpoint_upload_f572", repeticiones=3)
+def medir_endpoint_upload_f572():
+    from cache_f572 import CacheF572
+
+    with _cliente_api() as (api, pedir):
+        # Sin cache de resultados: se mide el parseo en el pool
+        cache_original = api.cache_f572
+        api.cache_f572 = CacheF572(max_bytes=1, directorio=None)
+        api.pool_f572.iniciar()
+        pdf = generar_pdf_f572(1)
+        try:
+            yield lambda: pedir("POST", "/upload-f572", files={"file": ("f572.pdf", pdf, "application/pdf")})
+        finally:
+            api.pool_f572.detener()
+            api.cache_f572 = cache_original
+
+
+# ---------------------------------------------------------------------------
+# Ejecución, líneas base y comparación
+# ---------------------------------------------------------------------------
+
+def ejecutar(nombres: List[str]) -> Dict[str, float]:
+    """Corre las mediciones y devuelve segundos por operación."""
+    resultados = {}
+    with open(os.devnull, "w") as nulo:
+        for nombre in nombres:
+            preparar, repeticiones = MEDICIONES[nombre]
+            # Los prints de debug del parser y de los endpoints no se miden
+            with contextlib.redirect_stdout(nulo), preparar() as operacion:
+                temporizador = timeit.Timer(operacion)
+                loops, _ = temporizador.autorange()
+                resultados[nombre] = min(temporizador.repeat(repeat=repeticiones, number=loops)) / loops
+            print(f"  {nombre:32s} {_formatear(resultados[nombre])}")
+    return resultados
+
+
+def _formatear(segundos: float) -> str:
+    if segundos >= 1:
+        return f"{segundos:9.3f} s "
+    if segundos >= 1e-3:
+        return f"{segundos * 1e3:9.3f} ms"
+    return f"{segundos * 1e6:9.3f} us"
+
+
+def _entorno() -> Dict:
+    import numpy
+    import pdfplumber
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pdfplumber": pdfplumber.__version__,
+        "commit": commit,
+    }
+
+
+def guardar(resultados: Dict[str, float], ruta: str):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "entorno": _entorno(),
+            "resultados": resultados
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nLínea base guardada en {ruta}")
+
+
+def comparar(resultados: Dict[str, float], ruta: str, tolerancia: float) -> List[str]:
+    """Imprime la comparación contra la línea base y devuelve las mediciones que empeoraron."""
+    with open(ruta, encoding="utf-8") as f:
+        base = json.load(f)
+
+    print(f"\nComparación contra {ruta} ({base.get('fecha', '?')}, commit {base['entorno'].get('commit') or '?'}), "
+          f"tolerancia {tolerancia:.0%}:")
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base["resultados"].get(nombre)
+        if anterior is None:
+            print(f"  {nombre:32s} {_formatear(actual)}   (nueva, sin línea base)")
+            continue
+        cociente = actual / anterior
+        empeoro = cociente > 1 + tolerancia
+        if empeoro:
+            regresiones.append(nombre)
+        print(f"  {nombre:32s} {_formatear(anterior)} -> {_formatear(actual)}  {cociente:5.2f}x"
+              f"{'  ✗ REGRESIÓN' if empeoro else ''}")
+    return regresiones
+
+
+def main(argumentos: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Suite de rendimiento con líneas base en JSON.")
+    parser.add_argument("mediciones", nargs="*", help=f"mediciones a correr (default: todas): {', '.join(MEDICIONES)}")
+    parser.add_argument("--guardar", metavar="RUTA", help="guardar los resultados como línea base JSON")
+    parser.add_argument("--comparar", metavar="RUTA", help="comparar contra una línea base JSON")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_DEFAULT,
+                        help=f"empeoramiento máximo aceptado, como fracción (default: {TOLERANCIA_DEFAULT})")
+    opciones = parser.parse_args(argumentos)
+
+    desconocidas = [nombre for nombre in opciones.mediciones if nombre not in MEDICIONES]
+    if desconocidas:
+        parser.error(f"mediciones desconocidas: {', '.join(desconocidas)}")
+
+    print("Midiendo (mejor tiempo por operación):")
+    resultados = ejecutar(opciones.mediciones or list(MEDICIONES))
+
+    if opciones.guardar:
+        guardar(resultados, opciones.guardar)
+    if opciones.comparar:
+        regresiones = comparar(resultados, opciones.comparar, opciones.tolerancia)
+        if regresiones:
+            print(f"\n✗ Más lentas que la línea base: {', '.join(regresiones)}")
+            return 1
+        print("\n✓ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
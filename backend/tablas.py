@@ -0,0 +1,195 @@
+"""
+Registro de tablas de deducciones y escalas por período fiscal.
+
+Cada período es un par de archivos en data/:
+
+    deducciones_2026.json      escalas_2026.json       -> período "2026" (desde enero)
+    deducciones_2026-07.json   escalas_2026-07.json    -> período "2026-07" (desde julio)
+
+Al iniciar se cargan todos los períodos y cada uno queda compilado en su propia
+CalculadoraGanancias. Un período rige desde su mes de inicio hasta el mes
+anterior al siguiente período del mismo año (o hasta diciembre).
+
+La actualización semestral por IPC es entonces agregar los dos JSON del nuevo
+período: `recargar()` (que main.py llama periódicamente) lo carga sin reiniciar.
+La recarga arma un índice nuevo aparte y lo reemplaza en una sola asignación,
+así que las requests en curso terminan con las tablas con las que empezaron.
+"""
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from calculator import CalculadoraGanancias
+
+RE_ARCHIVO_DEDUCCIONES = re.compile(r"^deducciones_(\d{4})(?:-(\d{2}))?\.json$")
+
+
+class PeriodoDesconocidoError(Exception):
+    """No hay tablas cargadas para el período pedido."""
+
+
+def _a_json(datos: Dict) -> bytes:
+    # Mismo formato que JSONResponse de Starlette (y que cache_calculo.a_json)
+    return json.dumps(datos, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class TablasPeriodo:
+    """Tablas de un período ya compiladas en una calculadora."""
+
+    __slots__ = ("id", "anio", "mes_desde", "calculadora", "firma", "json_deducciones", "json_escalas")
+
+    def __init__(self, id: str, anio: int, mes_desde: int, calculadora: CalculadoraGanancias,
+                 firma: Tuple):
+        self.id = id
+        self.anio = anio
+        self.mes_desde = mes_desde
+        self.calculadora = calculadora
+        # (mtime, tamaño) de los dos archivos: si no cambian, no se vuelven a leer
+        self.firma = firma
+        # Respuestas de /deducciones y /escalas, serializadas una sola vez al cargar el período
+        self.json_deducciones = _a_json(calculadora.obtener_deducciones())
+        self.json_escalas = _a_json(calculadora.obtener_escalas())
+
+    def resumen(self, mes_hasta: int) -> Dict:
+        return {
+            "id": self.id,
+            "periodo": self.calculadora.deducciones.get("periodo"),
+            "desde": f"{self.anio}-{self.mes_desde:02d}",
+            "hasta": f"{self.anio}-{mes_hasta:02d}",
+            "version_tablas": self.calculadora.version_tablas
+        }
+
+
+class _Indice:
+    """Foto inmutable del registro: se reemplaza entera en cada recarga."""
+
+    __slots__ = ("periodos", "por_clave", "vigentes", "resumen", "version")
+
+    def __init__(self, periodos: List[TablasPeriodo]):
+        self.periodos = sorted(periodos, key=lambda p: (p.anio, p.mes_desde))
+
+        # Clave -> período, tanto por id ("2026-07") como por mes ("2026-09")
+        self.por_clave: Dict[str, TablasPeriodo] = {}
+        self.resumen = []
+        for i, periodo in enumerate(self.periodos):
+            siguiente = self.periodos[i + 1] if i + 1 < len(self.periodos) else None
+            mes_hasta = siguiente.mes_desde - 1 if siguiente and siguiente.anio == periodo.anio else 12
+            for mes in range(periodo.mes_desde, mes_hasta + 1):
+                self.por_clave[f"{periodo.anio}-{mes:02d}"] = periodo
+            self.por_clave[periodo.id] = periodo
+            self.resumen.append(periodo.resumen(mes_hasta))
+
+        self.version = "-".join(p.calculadora.version_tablas for p in self.periodos)
+        # Mes sin tablas propias -> período que rige (se completa a medida que se consulta)
+        self.vigentes: Dict[str, TablasPeriodo] = {}
+
+
+class RegistroTablas:
+    def __init__(self, directorio: Optional[str] = None):
+        self.directorio = Path(directorio) if directorio else Path(__file__).parent / "data"
+        self._indice = _Indice([])
+        self.ultima_recarga: Dict = {}
+        self.recargar()
+        if not self._indice.periodos:
+            raise FileNotFoundError(f"No hay tablas de deducciones y escalas en {self.directorio}")
+
+    @property
+    def version(self) -> str:
+        """Cambia cada vez que se agrega, quita o modifica algún período."""
+        return self._indice.version
+
+    def calculadora(self, periodo: Optional[str] = None) -> CalculadoraGanancias:
+        """
+        Calculadora del período pedido: un id ("2026", "2026-07") o un mes
+        ("2026-09"). Sin período, la del mes actual (o la más cercana si el mes
+        actual no tiene tablas).
+
+        Raises:
+            PeriodoDesconocidoError: si se pidió un período que no está cargado
+        """
+        return self.tablas(periodo).calculadora
+
+    def tablas(self, periodo: Optional[str] = None) -> TablasPeriodo:
+        """Como `calculadora`, pero devuelve el período entero (con sus tablas ya serializadas)."""
+        indice = self._indice
+        if periodo is None:
+            return self._periodo_vigente(indice)
+        tablas = indice.por_clave.get(periodo)
+        if tablas is None:
+            raise PeriodoDesconocidoError(f"No hay tablas cargadas para el período '{periodo}'")
+        return tablas
+
+    def periodos(self) -> List[Dict]:
+        return self._indice.resumen
+
+    def id_vigente(self) -> str:
+        """Id del período que se usa cuando la request no indica ninguno."""
+        return self._periodo_vigente(self._indice).id
+
+    @staticmethod
+    def _periodo_vigente(indice: _Indice) -> TablasPeriodo:
+        hoy = date.today()
+        clave = f"{hoy.year}-{hoy.month:02d}"
+        tablas = indice.por_clave.get(clave) or indice.vigentes.get(clave)
+        if tablas is None:
+            # Mes sin tablas: el último período anterior a hoy, o el primero si todos son futuros
+            anteriores = [p for p in indice.periodos if (p.anio, p.mes_desde) <= (hoy.year, hoy.month)]
+            tablas = indice.vigentes[clave] = anteriores[-1] if anteriores else indice.periodos[0]
+        return tablas
+
+    def recargar(self) -> Dict:
+        """
+        Vuelve a leer el directorio: agrega períodos nuevos, actualiza los que
+        cambiaron y quita los que ya no están. Los períodos sin cambios se
+        reutilizan tal cual. Si un archivo no se puede cargar, ese período
+        mantiene las tablas anteriores (si las tenía).
+
+        Returns:
+            {"agregados": [...], "actualizados": [...], "eliminados": [...], "errores": {id: mensaje}}
+        """
+        anteriores = {p.id: p for p in self._indice.periodos}
+        periodos = []
+        cambios = {"agregados": [], "actualizados": [], "eliminados": [], "errores": {}}
+
+        for ruta_deducciones in sorted(self.directorio.glob("deducciones_*.json")):
+            coincidencia = RE_ARCHIVO_DEDUCCIONES.match(ruta_deducciones.name)
+            if not coincidencia:
+                continue
+            id_periodo = ruta_deducciones.name[len("deducciones_"):-len(".json")]
+            ruta_escalas = self.directorio / f"escalas_{id_periodo}.json"
+            anterior = anteriores.get(id_periodo)
+            anio, mes = int(coincidencia.group(1)), int(coincidencia.group(2) or 1)
+            if not 1 <= mes <= 12:
+                cambios["errores"][id_periodo] = f"Mes inválido en {ruta_deducciones.name}"
+                continue
+            try:
+                firma = tuple(
+                    (estado.st_mtime_ns, estado.st_size)
+                    for estado in (os.stat(ruta_deducciones), os.stat(ruta_escalas))
+                )
+                if anterior is not None and anterior.firma == firma:
+                    periodos.append(anterior)
+                    continue
+                calculadora = CalculadoraGanancias(
+                    deducciones=CalculadoraGanancias.leer_tabla(ruta_deducciones),
+                    escalas=CalculadoraGanancias.leer_tabla(ruta_escalas)
+                )
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                cambios["errores"][id_periodo] = str(e)
+                if anterior is not None:
+                    periodos.append(anterior)
+                continue
+
+            periodos.append(TablasPeriodo(id_periodo, anio, mes, calculadora, firma))
+            cambios["actualizados" if anterior is not None else "agregados"].append(id_periodo)
+
+        ids = {p.id for p in periodos}
+        cambios["eliminados"] = [id_periodo for id_periodo in anteriores if id_periodo not in ids]
+
+        if cambios["agregados"] or cambios["actualizados"] or cambios["eliminados"]:
+            self._indice = _Indice(periodos)
+        self.ultima_recarga = cambios
+        return cambios
@@ -0,0 +1,251 @@
+"""
+Topes de las deducciones opcionales sobre lo acumulado en el año.
+
+`calcular` toma la deducción de cada mes tal cual (solo con su porcentaje
+deducible): los topes se verifican sobre lo acumulado. Acá se aplican para el
+año completo de N empleados:
+
+    - cada deducción pertenece a un grupo de tope; las que declaran
+      `comparte_tope_con` (medicina prepaga y gastos médicos) comparten uno
+    - tope fijo (`tope_anual`): lo deducido en el año hasta el mes no puede
+      superar el tope anual proporcional a los meses transcurridos (tope / 12 × mes)
+    - tope porcentual (`tope_porcentaje_ganancia_neta`): lo deducido hasta el mes
+      no puede superar ese porcentaje de la ganancia neta acumulada antes de
+      deducir los conceptos con tope porcentual (y antes de las deducciones
+      personales)
+
+La base de los topes porcentuales no incluye a los propios conceptos con tope
+porcentual: primero se resuelven los grupos con tope fijo o sin tope, con eso
+queda la base y después los grupos porcentuales, sin iterar hasta un punto
+fijo. Todo sale de sumas acumuladas sobre los 12 meses: una sola pasada por
+empleado-año, con operaciones sobre arrays de N × 12.
+
+Lo deducible en un mes es lo permitido acumulado hasta ese mes menos lo
+permitido hasta el mes anterior. Si la ganancia neta acumulada baja, baja el
+tope porcentual y el mes puede dar negativo (se reajusta lo deducido de más),
+igual que la retención en el régimen acumulado.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from calculator import _redondear
+from tablas import RegistroTablas
+
+MESES = np.arange(1, 13)
+
+
+class GrupoTope:
+    """Conceptos que comparten un tope, con el tope de cada mes."""
+    __slots__ = ("tipos", "tope_acumulado", "porcentaje", "tope_anual")
+
+    def __init__(self, tipos: List[str], tope_acumulado: np.ndarray, porcentaje: Optional[np.ndarray],
+                 tope_anual: Optional[float] = None):
+        self.tipos = tipos
+        # Tope fijo acumulado hasta cada mes (12 valores; inf si no tiene)
+        self.tope_acumulado = tope_acumulado
+        # Tope anual tal cual figura en las tablas, si es el mismo todo el año (None si no)
+        self.tope_anual = tope_anual
+        # Porcentaje de la ganancia neta de cada mes (12 valores; nan los meses sin tope
+        # porcentual), o None si el grupo no tiene tope porcentual
+        self.porcentaje = porcentaje
+
+
+class MotorTopes:
+    def __init__(self, tablas_por_mes: Sequence[Dict]):
+        """
+        Args:
+            tablas_por_mes: tablas de deducciones (`CalculadoraGanancias.deducciones`)
+                de enero a diciembre; con una sola, rige para todo el año
+        """
+        if len(tablas_por_mes) == 1:
+            tablas_por_mes = list(tablas_por_mes) * 12
+        configuraciones = [tablas["deducciones_opcionales"] for tablas in tablas_por_mes]
+
+        # Grupos por tope compartido (comparte_tope_con puede encadenar más de dos conceptos)
+        grupo_de: Dict[str, str] = {}
+
+        def raiz(tipo: str) -> str:
+            while grupo_de.setdefault(tipo, tipo) != tipo:
+                tipo = grupo_de[tipo]
+            return tipo
+
+        for configuracion in configuraciones:
+            for tipo, deduccion in configuracion.items():
+                raiz(tipo)
+                if deduccion.get("comparte_tope_con"):
+                    grupo_de[raiz(deduccion["comparte_tope_con"])] = raiz(tipo)
+
+        miembros: Dict[str, List[str]] = {}
+        for tipo in grupo_de:
+            miembros.setdefault(raiz(tipo), []).append(tipo)
+
+        # Porcentaje deducible de cada concepto en cada mes
+        self.porcentaje_deducible: Dict[str, np.ndarray] = {
+            tipo: np.array([configuracion.get(tipo, {}).get("porcentaje_deducible", 1.0)
+                            for configuracion in configuraciones])
+            for tipo in grupo_de
+        }
+        self.grupos: List[GrupoTope] = [self._grupo(tipos, configuraciones) for tipos in miembros.values()]
+        self._grupo_de_tipo = {tipo: grupo for grupo in self.grupos for tipo in grupo.tipos}
+
+    @classmethod
+    def del_anio(cls, registro: RegistroTablas, anio: int) -> "MotorTopes":
+        """Motor con las tablas vigentes en cada mes del año."""
+        return cls([registro.calculadora(f"{anio}-{mes:02d}").deducciones for mes in MESES])
+
+    @staticmethod
+    def _grupo(tipos: List[str], configuraciones: List[Dict]) -> GrupoTope:
+        # Si los conceptos de un grupo declaran topes distintos, rige el menor
+        topes_mensuales = np.full(12, np.inf)
+        topes_anuales = [None] * 12
+        porcentajes = np.full(12, np.nan)
+        for mes, configuracion in enumerate(configuraciones):
+            for tipo in tipos:
+                deduccion = configuracion.get(tipo, {})
+                if deduccion.get("tope_anual") is not None:
+                    topes_mensuales[mes] = min(topes_mensuales[mes], deduccion["tope_anual"] / 12)
+                    if topes_anuales[mes] is None or deduccion["tope_anual"] < topes_anuales[mes]:
+                        topes_anuales[mes] = deduccion["tope_anual"]
+                if deduccion.get("tope_porcentaje_ganancia_neta") is not None:
+                    porcentajes[mes] = np.fmin(porcentajes[mes], deduccion["tope_porcentaje_ganancia_neta"])
+        porcentaje = None if np.isnan(porcentajes).all() else porcentajes
+        tope_anual = topes_anuales[0] if len(set(topes_anuales)) == 1 else None
+        return GrupoTope(tipos, np.cumsum(topes_mensuales), porcentaje, tope_anual)
+
+    def _grupos_de(self, tipos) -> List[GrupoTope]:
+        grupos = {}
+        for tipo in tipos:
+            # Un concepto que no está en las tablas no tiene tope ni porcentaje deducible
+            grupo = self._grupo_de_tipo.get(tipo) or GrupoTope([tipo], np.full(12, np.inf), None)
+            grupos[id(grupo)] = grupo
+        return list(grupos.values())
+
+    def aplicar_lote(self, montos: Dict[str, Sequence[Sequence[float]]], ganancia_neta: Sequence[Sequence[float]],
+                     aplicar_porcentaje: bool = True) -> Dict:
+        """
+        Aplica los topes al año completo de N empleados.
+
+        Args:
+            montos: monto pagado de cada mes por concepto (tipo -> N × 12)
+            ganancia_neta: ganancia neta de cada mes antes de las deducciones
+                opcionales y personales (bruto - descuentos obligatorios), N × 12
+            aplicar_porcentaje: multiplicar los montos por su porcentaje deducible
+                (con False los montos ya son deducibles)
+
+        Returns:
+            {
+                "deducciones_opcionales": N × 12, total deducible de cada mes,
+                "por_tipo": {tipo: N × 12}, deducible de cada mes por concepto (sin
+                    redondear, como el monto deducible de `calcular`),
+                "excedente": {tipo: N}, lo que quedó afuera por los topes en el año
+            }
+        """
+        base = np.asarray(ganancia_neta, dtype=np.float64)
+        if base.ndim != 2 or base.shape[1] != 12:
+            raise ValueError("ganancia_neta debe tener 12 meses por empleado")
+        deducible, declarado_acumulado = {}, {}
+        for tipo, monto in montos.items():
+            monto = np.asarray(monto, dtype=np.float64)
+            if monto.shape != base.shape:
+                raise ValueError(f"{tipo}: los montos deben tener 12 meses por empleado")
+            if aplicar_porcentaje and tipo in self.porcentaje_deducible:
+                monto = monto * self.porcentaje_deducible[tipo]
+            deducible[tipo] = monto
+            declarado_acumulado[tipo] = np.cumsum(monto, axis=1)
+
+        # Primero los grupos con tope fijo o sin tope: lo que permiten define la base de los porcentuales
+        grupos = sorted(self._grupos_de(montos), key=lambda grupo: grupo.porcentaje is not None)
+        base_acumulada = np.cumsum(base, axis=1)
+        por_tipo, excedente = {}, {}
+        for grupo in grupos:
+            tipos = [tipo for tipo in grupo.tipos if tipo in montos]
+            declarado = sum(declarado_acumulado[tipo] for tipo in tipos)
+            tope = np.broadcast_to(grupo.tope_acumulado, declarado.shape)
+            if grupo.porcentaje is not None:
+                tope = np.fmin(tope, np.maximum(base_acumulada, 0) * grupo.porcentaje)
+            permitido = np.minimum(declarado, tope)
+            if grupo.porcentaje is None:
+                base_acumulada = base_acumulada - permitido
+
+            for tipo in tipos:
+                por_tipo[tipo] = deducible[tipo]
+                excedente[tipo] = np.zeros(base.shape[0])
+            limitado = declarado > permitido
+            filas = np.flatnonzero(limitado.any(axis=1))
+            if not len(filas):
+                continue
+
+            # En los empleados que llegaron al tope, lo permitido al grupo se reparte en
+            # proporción a lo declarado de cada concepto. Los meses en que no hubo tope
+            # (ni en el mes anterior) conservan el monto tal cual.
+            limitado = limitado[filas]
+            proporcion = np.where(limitado, permitido[filas] / np.where(limitado, declarado[filas], 1.0), 1.0)
+            sin_tope = ~(limitado | np.pad(limitado[:, :-1], ((0, 0), (1, 0))))
+            for tipo in tipos:
+                acumulado = declarado_acumulado[tipo][filas] * proporcion
+                por_tipo[tipo] = por_tipo[tipo].copy()
+                por_tipo[tipo][filas] = np.where(sin_tope, deducible[tipo][filas],
+                                                 np.diff(acumulado, axis=1, prepend=0.0))
+                excedente[tipo][filas] = _redondear(declarado_acumulado[tipo][filas, -1] - acumulado[:, -1])
+
+        total = sum(por_tipo.values()) if por_tipo else np.zeros_like(base)
+        return {"deducciones_opcionales": _redondear(total), "por_tipo": por_tipo, "excedente": excedente}
+
+    def aplicar(self, montos: Dict[str, Sequence[float]], ganancia_neta: Sequence[float],
+                aplicar_porcentaje: bool = True) -> Dict:
+        """
+        `aplicar_lote` para un solo empleado (12 valores por concepto).
+
+        Returns:
+            {
+                "deducciones_opcionales": [12], "por_tipo": {tipo: [12]},
+                "topes_aplicados": [{"tipo", "monto_original", "monto_con_tope", "diferencia"}]
+            }
+        """
+        resultado = self.aplicar_lote(
+            {tipo: [monto] for tipo, monto in montos.items()}, [ganancia_neta], aplicar_porcentaje
+        )
+        por_tipo = {tipo: valores[0] for tipo, valores in resultado["por_tipo"].items()}
+        topes_aplicados = []
+        for tipo, valores in resultado["excedente"].items():
+            if valores[0] > 0:
+                con_tope = round(float(por_tipo[tipo].sum()), 2)
+                topes_aplicados.append({"tipo": tipo, "monto_original": round(con_tope + float(valores[0]), 2),
+                                        "monto_con_tope": con_tope, "diferencia": float(valores[0])})
+        return {
+            "deducciones_opcionales": resultado["deducciones_opcionales"][0].tolist(),
+            "por_tipo": {tipo: [round(valor, 2) for valor in valores.tolist()] for tipo, valores in por_tipo.items()},
+            "topes_aplicados": topes_aplicados,
+        }
+
+    def aplicar_anual(self, totales: Dict[str, float],
+                      ganancia_neta_anual: Optional[float] = None) -> Dict[str, float]:
+        """
+        Topes sobre los totales deducibles del año (como los del F.572): concepto -> monto
+        con tope. Sin `ganancia_neta_anual` no se aplican los topes porcentuales.
+        """
+        # Todo el año en diciembre: lo acumulado a diciembre se compara con el tope anual completo
+        diciembre = np.zeros((1, 12))
+        montos = {}
+        for tipo, total in totales.items():
+            montos[tipo] = diciembre.copy()
+            montos[tipo][0, 11] = total
+        base = diciembre.copy()
+        base[0, 11] = np.inf if ganancia_neta_anual is None else ganancia_neta_anual
+        resultado = self.aplicar_lote(montos, base, aplicar_porcentaje=False)
+        con_tope = {}
+        for tipo, total in totales.items():
+            # Los conceptos que no llegan al tope conservan su monto tal cual
+            if resultado["excedente"][tipo][0] <= 0:
+                con_tope[tipo] = total
+                continue
+            # Lo permitido sale de prorratear y acumular: se redondea al centavo, y si es el
+            # tope fijo de un concepto solo en su grupo, se devuelve el tope de las tablas
+            permitido = round(float(resultado["por_tipo"][tipo][0, 11]), 2)
+            grupo = self._grupo_de_tipo.get(tipo)
+            if (grupo is not None and grupo.tope_anual is not None and permitido == round(grupo.tope_anual, 2)
+                    and sum(otro in totales for otro in grupo.tipos) == 1):
+                permitido = grupo.tope_anual
+            con_tope[tipo] = permitido
+        return con_tope
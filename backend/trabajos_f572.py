@@ -0,0 +1,183 @@
+"""
+Cola de trabajos para parsear F.572 en segundo plano.
+
+Con `/upload-f572?asincronico=true` la request no queda abierta mientras se
+parsea el PDF: se encola un trabajo, se responde `202` con su id y el cliente
+consulta `/jobs/{id}` hasta que el trabajo termina. La cola tiene profundidad
+acotada (si está llena se rechaza con `ColaLlenaError`, que el endpoint
+responde como `429` con `Retry-After`) y los trabajos terminados se descartan
+después de un TTL, así la memoria no crece con uploads sostenidos.
+
+No hay tareas de fondo permanentes: cada trabajo encolado arranca una tarea
+si hay menos de `concurrencia` en curso, y al terminar una tarea toma el
+siguiente de la cola.
+
+Configuración por variables de entorno:
+    F572_TRABAJOS_MAX_EN_COLA   trabajos esperando antes de rechazar (default: 16)
+    F572_TRABAJOS_CONCURRENCIA  trabajos procesándose a la vez (default: F572_WORKERS o 2)
+    F572_TRABAJOS_TTL           segundos que se guarda un trabajo terminado (default: 600)
+"""
+import asyncio
+import math
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set
+
+EN_COLA = "en_cola"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+
+class ColaLlenaError(Exception):
+    """La cola de trabajos alcanzó su profundidad máxima."""
+
+    def __init__(self, mensaje: str, reintentar_en: int):
+        super().__init__(mensaje)
+        self.reintentar_en = reintentar_en
+
+
+def _sin_frames(error: BaseException) -> BaseException:
+    """
+    La excepción sin tracebacks ni excepciones encadenadas: sus frames (por ejemplo
+    el de `PoolParserF572.parsear`, cuando el timeout se levanta dentro de un
+    `except`) retendrían el PDF hasta que el trabajo expire.
+    """
+    error.__traceback__ = None
+    error.__cause__ = None
+    error.__context__ = None
+    return error
+
+
+class TrabajoF572:
+    __slots__ = ("id", "estado", "creado", "terminado", "argumentos", "resultado", "error")
+
+    def __init__(self, id: str, argumentos: tuple):
+        self.id = id
+        self.estado = EN_COLA
+        self.creado = time.time()
+        self.terminado: Optional[float] = None
+        # El PDF se guarda solo hasta que se procesa
+        self.argumentos: Optional[tuple] = argumentos
+        self.resultado: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class ColaTrabajosF572:
+    def __init__(self, procesar: Callable[..., Awaitable[Dict]], max_en_cola: Optional[int] = None,
+                 concurrencia: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            procesar: corrutina que recibe los argumentos de `encolar` y devuelve el resultado
+        """
+        self.procesar = procesar
+        self.max_en_cola = max_en_cola or int(os.environ.get("F572_TRABAJOS_MAX_EN_COLA", 16))
+        self.concurrencia = concurrencia or int(
+            os.environ.get("F572_TRABAJOS_CONCURRENCIA", os.environ.get("F572_WORKERS", 2))
+        )
+        self.ttl = ttl or float(os.environ.get("F572_TRABAJOS_TTL", 600))
+
+        self._trabajos: Dict[str, TrabajoF572] = {}
+        self._cola: Deque[TrabajoF572] = deque()
+        # id -> trabajo, en orden de terminación (para expirar por TTL)
+        self._terminados: "OrderedDict[str, TrabajoF572]" = OrderedDict()
+        self._tareas: Set[asyncio.Task] = set()
+        # Duración media de un trabajo, para estimar el Retry-After
+        self._duracion_media = 1.0
+
+    @property
+    def en_cola(self) -> int:
+        return len(self._cola)
+
+    @property
+    def procesando(self) -> int:
+        return len(self._tareas)
+
+    def encolar(self, *argumentos) -> TrabajoF572:
+        """
+        Encola un trabajo y lo arranca si hay lugar.
+
+        Raises:
+            ColaLlenaError: si ya hay `max_en_cola` trabajos esperando
+        """
+        self._expirar()
+        if len(self._cola) >= self.max_en_cola:
+            # Tiempo aproximado hasta que se libere un lugar en la cola
+            reintentar_en = max(1, math.ceil(self._duracion_media * len(self._cola) / self.concurrencia))
+            raise ColaLlenaError(
+                f"Hay {len(self._cola)} PDFs esperando, reintentá en unos segundos", reintentar_en
+            )
+        trabajo = TrabajoF572(secrets.token_urlsafe(12), argumentos)
+        self._trabajos[trabajo.id] = trabajo
+        self._cola.append(trabajo)
+        self._despachar()
+        return trabajo
+
+    def obtener(self, id_trabajo: str) -> Optional[TrabajoF572]:
+        """El trabajo con ese id, o None si no existe o ya expiró."""
+        self._expirar()
+        return self._trabajos.get(id_trabajo)
+
+    def posicion(self, trabajo: TrabajoF572) -> Optional[int]:
+        """Posición en la cola (0: es el próximo), o None si no está esperando."""
+        if trabajo.estado != EN_COLA:
+            return None
+        for indice, otro in enumerate(self._cola):
+            if otro is trabajo:
+                return indice
+        return None
+
+    def estadisticas(self) -> Dict:
+        self._expirar()
+        return {
+            "en_cola": len(self._cola),
+            "procesando": len(self._tareas),
+            "terminados": len(self._terminados),
+            "max_en_cola": self.max_en_cola,
+            "concurrencia": self.concurrencia,
+            "ttl_segundos": self.ttl,
+        }
+
+    def detener(self):
+        """Cancela los trabajos en curso y descarta los que esperan."""
+        for tarea in list(self._tareas):
+            tarea.cancel()
+        self._cola.clear()
+
+    def _despachar(self):
+        while self._cola and len(self._tareas) < self.concurrencia:
+            trabajo = self._cola.popleft()
+            tarea = asyncio.get_running_loop().create_task(self._ejecutar(trabajo))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tarea_terminada)
+
+    def _tarea_terminada(self, tarea: asyncio.Task):
+        self._tareas.discard(tarea)
+        if not tarea.cancelled():
+            self._despachar()
+
+    async def _ejecutar(self, trabajo: TrabajoF572):
+        trabajo.estado = PROCESANDO
+        argumentos, trabajo.argumentos = trabajo.argumentos, None
+        inicio = time.perf_counter()
+        try:
+            trabajo.resultado = await self.procesar(*argumentos)
+            trabajo.estado = COMPLETADO
+        except Exception as e:
+            trabajo.error = _sin_frames(e)
+            trabajo.estado = ERROR
+        del argumentos
+        self._duracion_media = 0.8 * self._duracion_media + 0.2 * (time.perf_counter() - inicio)
+        trabajo.terminado = time.time()
+        self._terminados[trabajo.id] = trabajo
+
+    def _expirar(self):
+        limite = time.time() - self.ttl
+        while self._terminados:
+            id_trabajo, trabajo = next(iter(self._terminados.items()))
+            if trabajo.terminado > limite:
+                break
+            del self._terminados[id_trabajo]
+            del self._trabajos[id_trabajo]
@@ -618,17 +618,16 @@ async function handleF572Upload(event) {
         const formData = new FormData();
         formData.append('file', file);
 
-        const response = await fetch('http://localhost:8000/upload-f572', {
-            method: 'POST',
-            body: formData
-        });
+        // El PDF se parsea en segundo plano: el backend devuelve un trabajo y se consulta hasta que termina
+        const response = await encolarF572(formData, uploadStatus);
 
         if (!response.ok) {
             const errorData = await response.json();
             throw new Error(errorData.detail || 'Error al procesar el PDF');
         }
 
-        const data = await response.json();
+        const trabajo = await response.json();
+        const data = await esperarTrabajoF572(trabajo.id);
 
         // Cargar las deducciones totales en el campo acumulado
         cargarDeduccionesAcumuladas(data.deducciones_con_topes);
@@ -650,6 +649,62 @@ async function handleF572Upload(event) {
     }
 }
 
+// Reintentos del upload cuando la cola de trabajos está llena (429)
+const MAX_REINTENTOS_COLA_F572 = 3;
+// Tiempo máximo de parseo de un PDF en el backend (F572_TIMEOUT) más un margen
+const TIMEOUT_PARSEO_F572_MS = 30000 + 5000;
+// Espera máxima total, contando el tiempo en la cola
+const MAX_ESPERA_TRABAJO_F572_MS = 5 * 60 * 1000;
+
+const esperar = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+async function encolarF572(formData, uploadStatus) {
+    for (let intento = 0; ; intento++) {
+        const response = await fetch('http://localhost:8000/upload-f572?asincronico=true', {
+            method: 'POST',
+            body: formData
+        });
+        if (response.status !== 429 || intento >= MAX_REINTENTOS_COLA_F572) {
+            return response;
+        }
+        // Cola llena: esperar lo que indica el backend antes de reintentar
+        const segundos = parseInt(response.headers.get('Retry-After'), 10) || 5;
+        uploadStatus.textContent = `Servidor ocupado, reintentando en ${segundos} s...`;
+        await esperar(segundos * 1000);
+        uploadStatus.textContent = 'Procesando PDF...';
+    }
+}
+
+async function esperarTrabajoF572(idTrabajo) {
+    const inicio = Date.now();
+    let inicioProceso = null;
+    while (true) {
+        await esperar(500);
+        const response = await fetch(`http://localhost:8000/jobs/${idTrabajo}`);
+        const trabajo = await response.json();
+
+        if (!response.ok) {
+            throw new Error(trabajo.detail || 'Error al procesar el PDF');
+        }
+        if (trabajo.estado === 'completado') {
+            return trabajo.resultado;
+        }
+        if (trabajo.estado === 'error') {
+            throw new Error(trabajo.error.detail || 'Error al procesar el PDF');
+        }
+
+        // Una vez que el worker toma el trabajo, el backend lo corta a los F572_TIMEOUT segundos
+        const ahora = Date.now();
+        if (trabajo.estado === 'procesando' && inicioProceso === null) {
+            inicioProceso = ahora;
+        }
+        if ((inicioProceso !== null && ahora - inicioProceso > TIMEOUT_PARSEO_F572_MS)
+            || ahora - inicio > MAX_ESPERA_TRABAJO_F572_MS) {
+            throw new Error('El PDF tardó demasiado en procesarse, intente nuevamente');
+        }
+    }
+}
+
 function cargarDeduccionesAcumuladas(deduccionesConTopes) {
     // Sumar todas las deducciones del F.572
     const totalDeducciones = Object.values(deduccionesConTopes).reduce((sum, val) => sum + val, 0);
@@ -1,14 +1,179 @@
+"""
+Servidor de archivos estáticos del frontend.
+
+Atiende cada conexión en su propio thread (un cliente lento no frena al resto
+de la red local) y sirve index.html, app.js, style.css y config.js desde
+memoria:
+
+    - versiones comprimidas calculadas una sola vez: gzip siempre y brotli si
+      está instalado el paquete `brotli`
+    - ETag fuerte por archivo y codificación: si no cambió se responde 304
+    - index.html referencia los assets por un nombre con el hash del contenido
+      (app.3f9a1c2b7d.js) que se cachea un año; index.html y los nombres sin
+      hash se revalidan en cada carga (Cache-Control: no-cache)
+
+Si un archivo cambia en disco se vuelve a cargar en la próxima request.
+Cualquier otro path se sirve como antes con SimpleHTTPRequestHandler.
+"""
+import gzip
+import hashlib
 import http.server
-import socketserver
 import os
 import socket
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin el paquete se sirve gzip
+    brotli = None
 
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
+# Archivos servidos desde memoria
+ARCHIVOS = ("index.html", "app.js", "style.css", "config.js")
+# Assets que index.html referencia con el hash del contenido en el nombre
+ASSETS_CON_HASH = ("app.js", "style.css", "config.js")
+
+TIPOS = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+}
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+
+class Recurso:
+    """Un archivo en memoria con sus versiones comprimidas: codificación -> (contenido, etag)."""
+    __slots__ = ("tipo", "variantes")
+
+    def __init__(self, nombre: str, contenido: bytes):
+        self.tipo = TIPOS.get(os.path.splitext(nombre)[1], "application/octet-stream")
+        digest = hashlib.sha256(contenido).hexdigest()[:20]
+        self.variantes: Dict[str, Tuple[bytes, str]] = {"identity": (contenido, f'"{digest}"')}
+        # Solo se guarda la versión comprimida si efectivamente es más chica
+        comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+        if len(comprimido) < len(contenido):
+            self.variantes["gzip"] = (comprimido, f'"{digest}-gzip"')
+        if brotli is not None:
+            comprimido = brotli.compress(contenido, quality=11)
+            if len(comprimido) < len(contenido):
+                self.variantes["br"] = (comprimido, f'"{digest}-br"')
+
+    def variante(self, accept_encoding: str) -> Tuple[str, bytes, str]:
+        """Elige la codificación más chica que acepta el cliente: (codificación, contenido, etag)."""
+        aceptadas = set()
+        for parte in accept_encoding.split(","):
+            codificacion, _, parametros = parte.partition(";")
+            parametros = parametros.replace(" ", "")
+            try:
+                calidad = float(parametros[2:]) if parametros.startswith("q=") else 1.0
+            except ValueError:
+                calidad = 1.0
+            if calidad > 0:
+                aceptadas.add(codificacion.strip().lower())
+        for codificacion in ("br", "gzip"):
+            if codificacion in self.variantes and codificacion in aceptadas:
+                return (codificacion,) + self.variantes[codificacion]
+        return ("identity",) + self.variantes["identity"]
+
+
+class CacheFrontend:
+    """Archivos del frontend en memoria, indexados por el path de la request."""
+
+    def __init__(self, directorio: str = DIRECTORY):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._mtimes: Optional[Tuple] = None
+        # path -> (recurso, cache-control)
+        self._rutas: Dict[str, Tuple[Recurso, str]] = {}
+
+    def buscar(self, ruta: str) -> Optional[Tuple[Recurso, str]]:
+        """(recurso, Cache-Control) del path, o None si no es uno de los archivos en memoria."""
+        try:
+            mtimes = tuple(os.stat(os.path.join(self.directorio, nombre)).st_mtime_ns for nombre in ARCHIVOS)
+        except OSError:
+            return None
+        if mtimes != self._mtimes:
+            with self._lock:
+                if mtimes != self._mtimes:
+                    self._rutas = self._cargar()
+                    self._mtimes = mtimes
+        return self._rutas.get(ruta)
+
+    def _cargar(self) -> Dict[str, Tuple[Recurso, str]]:
+        contenidos = {}
+        for nombre in ARCHIVOS:
+            with open(os.path.join(self.directorio, nombre), "rb") as archivo:
+                contenidos[nombre] = archivo.read()
+
+        rutas = {}
+        index = contenidos["index.html"]
+        for nombre in ASSETS_CON_HASH:
+            base, extension = os.path.splitext(nombre)
+            con_hash = f"{base}.{hashlib.sha256(contenidos[nombre]).hexdigest()[:10]}{extension}"
+            index = index.replace(f'"{nombre}"'.encode(), f'"{con_hash}"'.encode())
+            recurso = Recurso(nombre, contenidos[nombre])
+            rutas[con_hash] = (recurso, CACHE_INMUTABLE)
+            rutas[nombre] = (recurso, CACHE_REVALIDAR)
+
+        recurso_index = Recurso("index.html", index)
+        rutas[""] = rutas["index.html"] = (recurso_index, CACHE_REVALIDAR)
+        return rutas
+
+
+cache_frontend = CacheFrontend()
+
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Conexiones persistentes: el navegador pide index.html y los assets por la misma conexión
+    protocol_version = "HTTP/1.1"
+    # Los headers y el cuerpo salen en dos writes: con Nagle, en una conexión persistente
+    # la segunda escritura espera el ACK demorado del cliente (~40 ms por request)
+    disable_nagle_algorithm = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=DIRECTORY, **kwargs)
 
+    def do_GET(self):
+        if not self._servir_desde_cache(enviar_cuerpo=True):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._servir_desde_cache(enviar_cuerpo=False):
+            super().do_HEAD()
+
+    def _servir_desde_cache(self, enviar_cuerpo: bool) -> bool:
+        entrada = cache_frontend.buscar(urlsplit(self.path).path.lstrip("/"))
+        if entrada is None:
+            return False
+        recurso, cache_control = entrada
+        codificacion, contenido, etag = recurso.variante(self.headers.get("Accept-Encoding", ""))
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self._headers_cache(etag, cache_control)
+            self.end_headers()
+            return True
+
+        self.send_response(200)
+        self.send_header("Content-Type", recurso.tipo)
+        self.send_header("Content-Length", str(len(contenido)))
+        if codificacion != "identity":
+            self.send_header("Content-Encoding", codificacion)
+        self._headers_cache(etag, cache_control)
+        self.end_headers()
+        if enviar_cuerpo:
+            self.wfile.write(contenido)
+        return True
+
+    def _headers_cache(self, etag: str, cache_control: str):
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+
     def end_headers(self):
         # Agregar headers CORS para desarrollo
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -16,6 +181,12 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
 
+
+class ServidorFrontend(http.server.ThreadingHTTPServer):
+    # Un thread por conexión; al cortar con Ctrl+C no se espera a las conexiones abiertas
+    daemon_threads = True
+
+
 def find_free_port(start_port=8080, max_attempts=10):
     """Encuentra un puerto libre comenzando desde start_port"""
     for port in range(start_port, start_port + max_attempts):
@@ -30,7 +201,7 @@ def find_free_port(start_port=8080, max_attempts=10):
 if __name__ == "__main__":
     PORT = find_free_port()
 
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+    with ServidorFrontend(("", PORT), MyHTTPRequestHandler) as httpd:
         print(f"✓ Servidor frontend ejecutándose en http://localhost:{PORT}")
         print(f"✓ Sirviendo archivos desde: {DIRECTORY}")
         print("\nPresiona Ctrl+C para detener el servidor")